@@ -0,0 +1,189 @@
+"""
+bench_anchor_dates.py
+
+Micro-benchmark of the anchor date derivation in lib/utils/get_anchor_dates.py:
+the previous row-wise implementation (SAMPLE_ID apply, two groupby().nunique()
+checks, sort + groupby().min() on datetimes) against the vectorized
+derive_anchor_dates(). Also checks that both produce identical anchor dates and
+error reports.
+
+Usage:
+  python pipeline/bench/bench_anchor_dates.py --n_samples=1000000
+"""
+import argparse
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pandas as pd
+
+from lib.utils.get_anchor_dates import derive_anchor_dates
+from lib.utils.pathology_snapshot import COL_SEQ_DATE
+
+
+def make_pathology(n_samples, samples_per_patient=1.6, frac_error=0.002, seed=0):
+    """Pathology rows like the sample mapping table: tumor and normal samples, a few mapping errors."""
+    rng = np.random.default_rng(seed)
+    n_patients = max(int(n_samples / samples_per_patient), 1)
+    patient = rng.integers(0, n_patients, n_samples)
+
+    mrn = pd.Series(patient + 10000000).astype(str)
+    dmp_id = pd.Series(patient).map(lambda i: f"P-{i:07d}")
+    sample_type = np.where(rng.random(n_samples) < 0.8, 'T', 'N')
+    sample_id = dmp_id + '-' + pd.Series(sample_type) + pd.Series(rng.integers(1, 10, n_samples)).map(lambda i: f"{i:02d}") + '-IM6'
+
+    days = rng.integers(0, 365 * 12, n_samples)
+    dates = pd.Series(pd.Timestamp('2014-01-01') + pd.to_timedelta(days, unit='D')).dt.strftime('%Y-%m-%d')
+
+    df_path = pd.DataFrame({
+        'MRN': mrn,
+        'DATE_TUMOR_SEQUENCING': dates,
+        'SAMPLE_ID': sample_id,
+        'DMP_ID': dmp_id
+    })
+
+    # Mapping errors: samples filed under another patient's DMP_ID or MRN
+    n_error = int(n_samples * frac_error)
+    rows = rng.choice(n_samples, size=2 * n_error, replace=False)
+    df_path.loc[rows[:n_error], 'DMP_ID'] = dmp_id.iloc[rng.integers(0, n_samples, n_error)].to_numpy()
+    df_path.loc[rows[n_error:], 'MRN'] = mrn.iloc[rng.integers(0, n_samples, n_error)].to_numpy()
+
+    # Missing and unparseable values
+    df_path.loc[rng.random(n_samples) < 0.01, 'DATE_TUMOR_SEQUENCING'] = None
+    df_path.loc[rng.random(n_samples) < 0.001, 'DATE_TUMOR_SEQUENCING'] = 'unknown'
+
+    return df_path
+
+
+def get_anchor_dates_previous(df_path):
+    """
+    Previous get_anchor_dates(), verbatim from the query onwards.
+
+    The Databricks query and mrn_zero_pad() are left out (df_path is the queried
+    table with zero-padded MRNs), and the mapping errors are returned instead of
+    printed, so both implementations can be compared.
+    """
+    df_path = df_path.dropna().copy()
+    df_path[COL_SEQ_DATE] = pd.to_datetime(
+        df_path[COL_SEQ_DATE],
+        errors='coerce'
+    )
+
+    logic_filt1 = df_path['SAMPLE_ID'].notnull()
+    logic_filt2 = df_path['SAMPLE_ID'].str.contains('T')
+    logic_filt3 = df_path[COL_SEQ_DATE].notnull()
+    logic_filt = logic_filt1 & logic_filt2 & logic_filt3
+
+    df_path_filt = df_path[logic_filt].copy()
+    df_path_filt['DMP_ID_DERIVED'] = df_path_filt['SAMPLE_ID'].apply(lambda x: x[:9])
+
+    # Find DMP_IDs that do not match DMP_ID Derived
+    mrn_test1 = df_path_filt.groupby(['MRN'])['DMP_ID'].nunique()
+    list_id_prob1 = list(mrn_test1[mrn_test1 > 1].index)
+
+    mrn_test2 = df_path_filt.groupby(['DMP_ID'])['MRN'].nunique()
+    list_id_prob2 = list(mrn_test2[mrn_test2 > 1].index)
+
+    df_prob1 = df_path_filt[df_path_filt['DMP_ID_DERIVED'] != df_path_filt['DMP_ID']]
+    df_prob2 = df_path_filt[df_path_filt['DMP_ID'].isin(list_id_prob2) | df_path_filt['MRN'].isin(list_id_prob1)]
+    df_path_sample_id_error = pd.concat([df_prob1, df_prob2], axis=0).drop_duplicates()
+
+    df_path_filt_clean1 = df_path_filt[df_path_filt['DMP_ID_DERIVED'] == df_path_filt['DMP_ID']]
+    df_path_filt_clean1 = df_path_filt_clean1.sort_values(by=['MRN', COL_SEQ_DATE])
+
+    df_path_g = df_path_filt_clean1.groupby(['MRN', 'DMP_ID'])[COL_SEQ_DATE].min().reset_index()
+    # Keep only the date portion to drop time and timezone information
+    df_path_g[COL_SEQ_DATE] = df_path_g[COL_SEQ_DATE].dt.date
+
+    # Remove any MRN or DMP-ID in df_path_g_error
+    filt_rmv_patients = df_path_g['DMP_ID'].isin(df_path_sample_id_error['DMP_ID']) | \
+                        df_path_g['MRN'].isin(list(set(df_path_sample_id_error['MRN']))) | \
+                        df_path_g['DMP_ID'].isin(list(set(df_path_sample_id_error['DMP_ID_DERIVED'])))
+
+    df_path_g_f = df_path_g[~filt_rmv_patients]
+
+    return df_path_g_f, df_path_sample_id_error
+
+
+def time_best(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def frames_identical(df1, df2):
+    return df1.equals(df2) and df1.index.equals(df2.index) and (df1.dtypes == df2.dtypes).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark row-wise vs vectorized anchor date derivation"
+    )
+    parser.add_argument(
+        "--n_samples",
+        action="store",
+        dest="n_samples",
+        type=int,
+        default=1000000,
+        help="Number of pathology rows (default: 1000000)"
+    )
+    parser.add_argument(
+        "--repeat",
+        action="store",
+        dest="repeat",
+        type=int,
+        default=3,
+        help="Number of timed runs; the best is reported (default: 3)"
+    )
+    parser.add_argument(
+        "--seed",
+        action="store",
+        dest="seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    df_path = make_pathology(n_samples=args.n_samples, seed=args.seed)
+
+    print("=" * 80)
+    print("ANCHOR DATE DERIVATION BENCHMARK")
+    print("=" * 80)
+    print(f"Pathology rows: {args.n_samples}")
+
+    t_reference, (df_anchor_reference, df_error_reference) = time_best(
+        lambda: get_anchor_dates_previous(df_path),
+        args.repeat
+    )
+    t_vectorized, (df_anchor_vectorized, df_error_vectorized) = time_best(
+        lambda: derive_anchor_dates(df_path),
+        args.repeat
+    )
+
+    identical = frames_identical(df_anchor_reference, df_anchor_vectorized) and \
+        frames_identical(df_error_reference, df_error_vectorized)
+
+    print(f"Anchor dates:   {df_anchor_vectorized.shape[0]}")
+    print(f"Mapping errors: {df_error_vectorized.shape[0]}")
+    print(f"Row-wise:   {t_reference:.3f}s")
+    print(f"Vectorized: {t_vectorized:.3f}s")
+    print(f"Speedup:    {t_reference / t_vectorized:.1f}x")
+    print(f"Identical output: {identical}")
+    print("=" * 80)
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+bench_days_to_readable.py
+
+Micro-benchmark of the START_DATE_READABLE / STOP_DATE_READABLE formatting in
+cbioportal_timeline_deidentify.py: the row-wise Series.apply(days_to_readable_compact)
+against the vectorized days_to_readable_compact_series(). Also checks that both
+produce identical strings.
+
+Usage:
+  python pipeline/bench/bench_days_to_readable.py --n_rows=5000000
+"""
+import argparse
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'timeline'))
+
+import numpy as np
+import pandas as pd
+
+from cbioportal_timeline_deidentify import (
+    days_to_readable_compact,
+    days_to_readable_compact_series
+)
+
+
+def make_days(n_rows, frac_missing=0.1, seed=0):
+    """Day offsets like a lab timeline: mostly within +/- 10 years of the anchor, some missing."""
+    rng = np.random.default_rng(seed)
+    days = pd.Series(rng.integers(-3650, 3650, n_rows), dtype='float64')
+    days[rng.random(n_rows) < frac_missing] = np.nan
+    # Include the zero and boundary cases explicitly
+    edge_cases = [0, -0.0, 1, -1, 29, 30, 364, 365, 366, -365, 395, -395]
+    days.iloc[:len(edge_cases)] = edge_cases[:n_rows]
+
+    return days
+
+
+def time_best(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark row-wise vs vectorized days_to_readable_compact"
+    )
+    parser.add_argument(
+        "--n_rows",
+        action="store",
+        dest="n_rows",
+        type=int,
+        default=1000000,
+        help="Number of day offsets to format (default: 1000000)"
+    )
+    parser.add_argument(
+        "--repeat",
+        action="store",
+        dest="repeat",
+        type=int,
+        default=3,
+        help="Number of timed runs; the best is reported (default: 3)"
+    )
+    parser.add_argument(
+        "--seed",
+        action="store",
+        dest="seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    days = make_days(n_rows=args.n_rows, seed=args.seed)
+
+    print("=" * 80)
+    print("DAYS_TO_READABLE_COMPACT BENCHMARK")
+    print("=" * 80)
+    print(f"Rows: {args.n_rows}")
+    print(f"Distinct values: {days.nunique()}")
+
+    t_apply, result_apply = time_best(lambda: days.apply(days_to_readable_compact), args.repeat)
+    t_vector, result_vector = time_best(lambda: days_to_readable_compact_series(days), args.repeat)
+
+    identical = result_apply.tolist() == result_vector.tolist()
+
+    print(f"Series.apply:  {t_apply:.3f}s")
+    print(f"Vectorized:    {t_vector:.3f}s")
+    print(f"Speedup:       {t_apply / t_vector:.1f}x")
+    print(f"Identical output: {identical}")
+    print("=" * 80)
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+bench_dtype_policy.py
+
+Memory of a wide sample summary merged from object-dtype intermediates (as read
+from TSV) against the same intermediates converted with
+dtype_policy.apply_dtype_policy() (string[pyarrow] and categoricals), as done in
+merge_intermediate_summaries.py. Also checks that both write identical rows.
+
+Usage:
+  python pipeline/bench/bench_dtype_policy.py --n_samples=600000 --n_summaries=40
+"""
+import argparse
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pandas as pd
+
+from lib.summary.aligned_merge import left_merge_all
+from lib.summary.final_file_writer import format_rows
+from lib.utils.dtype_policy import STRING_DTYPE, CATEGORICAL_COLUMNS, apply_dtype_policy
+
+
+def make_intermediates(n_samples, n_summaries, frac_present=0.8, frac_missing=0.1, seed=0):
+    """
+    Template of sample IDs plus text intermediates, as read_csv returns them.
+
+    Columns alternate between short codes, free text, numbers stored as text and
+    the low-cardinality fields of the policy.
+    """
+    rng = np.random.default_rng(seed)
+    ids = pd.Series([f"P-{i:07d}-T01-IM6" for i in range(n_samples)], dtype=object)
+    df_template = pd.DataFrame({'SAMPLE_ID': ids})
+
+    values_code = np.array(['Yes', 'No', 'Unknown', 'NA'], dtype=object)
+    values_text = np.array([f"Adenocarcinoma, subtype {i}" for i in range(500)], dtype=object)
+    values_categorical = np.array(['Female', 'Male', 'LIVING', 'DECEASED'], dtype=object)
+
+    list_df = []
+    for k in range(n_summaries):
+        logic_present = rng.random(n_samples) < frac_present
+        n_present = int(logic_present.sum())
+        df = pd.DataFrame({'SAMPLE_ID': ids[logic_present].to_numpy()})
+        if k < len(CATEGORICAL_COLUMNS):
+            col = CATEGORICAL_COLUMNS[k]
+            values = values_categorical[rng.integers(0, len(values_categorical), n_present)]
+        else:
+            col = f"S{k}"
+            if k % 3 == 0:
+                values = values_code[rng.integers(0, len(values_code), n_present)]
+            elif k % 3 == 1:
+                values = values_text[rng.integers(0, len(values_text), n_present)]
+            else:
+                values = rng.integers(0, 10000, n_present).astype(str).astype(object)
+        # One str object per cell, as read_csv creates them
+        values = np.array([str(x) for x in values], dtype=object)
+        values[rng.random(n_present) < frac_missing] = np.nan
+        df[col] = values
+        list_df.append(df)
+
+    return df_template, list_df
+
+
+def time_best(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark memory of the wide summary with object vs policy dtypes"
+    )
+    parser.add_argument(
+        "--n_samples",
+        action="store",
+        dest="n_samples",
+        type=int,
+        default=200000,
+        help="Number of template rows (default: 200000)"
+    )
+    parser.add_argument(
+        "--n_summaries",
+        action="store",
+        dest="n_summaries",
+        type=int,
+        default=40,
+        help="Number of intermediates to merge (default: 40)"
+    )
+    parser.add_argument(
+        "--repeat",
+        action="store",
+        dest="repeat",
+        type=int,
+        default=3,
+        help="Number of timed runs; the best is reported (default: 3)"
+    )
+    parser.add_argument(
+        "--seed",
+        action="store",
+        dest="seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    df_template, list_df = make_intermediates(
+        n_samples=args.n_samples,
+        n_summaries=args.n_summaries,
+        seed=args.seed
+    )
+
+    print("=" * 80)
+    print("DTYPE POLICY BENCHMARK")
+    print("=" * 80)
+    print(f"Template rows: {args.n_samples}")
+    print(f"Intermediates: {args.n_summaries}")
+    print(f"String dtype:  {STRING_DTYPE}")
+
+    t_object, result_object = time_best(
+        lambda: left_merge_all(df_template=df_template, list_df=list_df, merge_key='SAMPLE_ID'),
+        args.repeat
+    )
+    t_policy, result_policy = time_best(
+        lambda: left_merge_all(
+            df_template=df_template,
+            list_df=[apply_dtype_policy(df) for df in list_df],
+            merge_key='SAMPLE_ID'
+        ),
+        args.repeat
+    )
+
+    mb_object = result_object.memory_usage(deep=True).sum() / 1e6
+    mb_policy = result_policy.memory_usage(deep=True).sum() / 1e6
+
+    # Same bytes as written by final_file_writer
+    identical = format_rows(result_object) == format_rows(result_policy)
+
+    print(f"Object columns: {mb_object:9.1f} MB, merged in {t_object:.3f}s")
+    print(f"Policy dtypes:  {mb_policy:9.1f} MB, converted and merged in {t_policy:.3f}s")
+    print(f"Reduction:      {mb_object / mb_policy:.1f}x")
+    print(f"Identical output: {identical}")
+    print("=" * 80)
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
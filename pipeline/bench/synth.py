@@ -0,0 +1,635 @@
+"""
+synth.py
+
+Synthetic cohort for running and benchmarking the pipeline without the Databricks
+PHI tables. Writes one Parquet file per source table, named
+<catalog>.<schema>.<table>.parquet, plus a cohort sample list and patient template:
+
+- t01_epic_ddp_demographics: birth, death, last contact and MRN creation dates
+- timeline_anchor_dates: MRN, DMP_ID and first tumor sequencing date per patient
+- t03_id_mapping_pathology_sample_xml_parsed: tumor and normal samples
+- the source table of each config/timelines/*.yaml, with the merge keys, raw
+  dates and the cBioPortal columns of its `columns` block
+- the source table of each config/summaries/*.yaml, one row per key with the
+  columns of its `columns` list
+
+IDs follow the production formats: MRNs are zero-padded digit strings, but a
+fraction are written without leading zeros (as in the source tables), so
+mrn_zero_pad() has work to do. DMP_IDs are 'P-' plus zero-padded digits (9
+characters by default, so SAMPLE_ID[:9] is the DMP_ID) and SAMPLE_IDs are
+like '<DMP_ID>-T01-IM6' for tumor samples and '<DMP_ID>-N01-IM6' for normals, so
+'-T' filters drop the normals. Row counts, null rates and date ranges are arguments.
+Values of other columns are placeholders: numbers for numeric fields, a few
+levels per text field.
+
+The same seed gives the same tables.
+
+Usage:
+  python pipeline/bench/synth.py --n_patients=100000 --output_dir=/tmp/synth
+"""
+import argparse
+import glob
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lib.utils.pathology_snapshot import TABLE_PATHOLOGY
+from lib.utils.vital_status import TABLE_DEMO
+
+TABLE_ANCHOR_DATES = 'cdsi_prod.cdm_idbw_impact_pipeline_prod.timeline_anchor_dates'
+DIR_CONFIG = os.path.join(os.path.dirname(__file__), '..', '..', 'config')
+
+# Numeric fields of the timeline and summary source tables
+COLS_INTEGER = [
+    'LR_ABNORMALITY_CD',
+    'ECOG_KPS',
+    'GLEASON_SCORE',
+    'PLANNED_FRACTIONS',
+    'CURRENT_AGE_DEID',
+    'NUM_ICDO_DX'
+]
+COLS_FLOAT = [
+    'RESULT',
+    'LR_TEST_UP_LIMIT',
+    'LR_TEST_LOW_LIMIT',
+    'DELIVERED_DOSE',
+    'PROGRESSION_PROBABILITY',
+    'OS_MONTHS'
+]
+# Levels of text fields that the pipeline or cBioPortal interprets
+DICT_LEVELS = {
+    'GENDER': ['Female', 'Male'],
+    'OS_STATUS': ['0:LIVING', '1:DECEASED'],
+    'PDL1_POSITIVE': ['Yes', 'No'],
+    'HISTORY_OF_PDL1': ['Yes', 'No'],
+    'PRIOR_MED_TO_MSK': ['Yes', 'No', 'Unknown'],
+    'CANCER_PRESENT': ['Yes', 'No', 'Indeterminate'],
+    'PROGRESSION': ['Y', 'N', 'Indeterminate']
+}
+N_LEVELS = 12
+
+
+def _format_dates(days, start):
+    """Format day offsets from a start date as 'YYYY-MM-DD' strings."""
+    # Few distinct days: format each once
+    days_unique, inverse = np.unique(days, return_inverse=True)
+    dates = np.datetime64(start, 'D') + days_unique.astype('timedelta64[D]')
+
+    return np.datetime_as_string(dates, unit='D').astype(object)[inverse]
+
+
+def _days_since_epoch(dates):
+    """Days since 1970-01-01 of 'YYYY-MM-DD' strings."""
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _null_out(values, frac, rng):
+    """Set a random fraction of an object array to None, in place."""
+    if frac > 0:
+        values[rng.random(len(values)) < frac] = None
+
+    return values
+
+
+def _unpad_mrns(mrn, frac, rng):
+    """Strip the leading zeros of a random fraction of MRNs, as some source tables store them."""
+    mrn = np.array(mrn, dtype=object)
+    rows = np.flatnonzero(rng.random(len(mrn)) < frac)
+    mrn[rows] = [x.lstrip('0') or '0' for x in mrn[rows]]
+
+    return mrn
+
+
+def _fake_values(col, n, rng, datatype=None, frac_null=0.0):
+    """Placeholder values of a non-key column: numbers for numeric fields, a few levels otherwise."""
+    if col in COLS_INTEGER:
+        values = rng.integers(0, 100, n).astype(float)
+    elif col in COLS_FLOAT or datatype == 'NUMBER':
+        values = np.round(rng.gamma(2.0, 20.0, n), 2)
+    else:
+        levels = DICT_LEVELS.get(col, [f"{col}_{k}" for k in range(N_LEVELS)])
+        values = np.array(levels, dtype=object)[rng.integers(0, len(levels), n)]
+        return _null_out(values, frac_null, rng)
+
+    values[rng.random(n) < frac_null] = np.nan
+
+    return values
+
+
+def make_cohort(
+    n_patients,
+    samples_per_patient=1.2,
+    frac_normal=0.5,
+    mrn_digits=8,
+    dmp_digits=7,
+    seq_start='2014-01-01',
+    seq_end='2025-12-31',
+    seed=0
+):
+    """
+    Patients and samples of the synthetic cohort, the basis of every table.
+
+    Parameters
+    ----------
+    n_patients : int
+        Number of patients
+    samples_per_patient : float, optional
+        Mean number of tumor samples per patient (at least one each)
+    frac_normal : float, optional
+        Fraction of patients with a normal sample
+    mrn_digits : int, optional
+        Digits of zero-padded MRNs
+    dmp_digits : int, optional
+        Digits of DMP_IDs after 'P-'
+    seq_start, seq_end : str, optional
+        Range of tumor sequencing dates
+    seed : int, optional
+        Random seed
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per sample with MRN (zero-padded), DMP_ID, SAMPLE_ID,
+        IS_TUMOR and DATE_TUMOR_SEQUENCING ('YYYY-MM-DD') columns, ordered by
+        patient
+    """
+    rng = np.random.default_rng(seed)
+
+    # Unique MRNs spread over the whole range, many with leading zeros
+    mrn_int = (np.arange(n_patients, dtype=np.int64) * 7919 + 104729) % (10 ** mrn_digits)
+    mrn = pd.Series(mrn_int).astype(str).str.zfill(mrn_digits)
+    dmp_id = 'P-' + pd.Series(np.arange(n_patients)).astype(str).str.zfill(dmp_digits)
+
+    n_tumor = 1 + rng.poisson(max(samples_per_patient - 1, 0), n_patients)
+    has_normal = rng.random(n_patients) < frac_normal
+    n_samples = n_tumor + has_normal
+    patient = np.repeat(np.arange(n_patients), n_samples)
+
+    # Position of each sample within its patient: tumors first, then the normal
+    rank = np.arange(len(patient)) - np.repeat(np.cumsum(n_samples) - n_samples, n_samples)
+    is_tumor = rank < n_tumor[patient]
+    suffix = np.where(is_tumor, '-T', '-N') + pd.Series(np.where(is_tumor, rank + 1, 1)).astype(str).str.zfill(2)
+    panel = np.array(['-IM5', '-IM6', '-IM7', '-IH3'], dtype=object)[rng.integers(0, 4, len(patient))]
+
+    n_days = int((pd.Timestamp(seq_end) - pd.Timestamp(seq_start)).days)
+    days_first = rng.integers(0, n_days, n_patients)
+    days = days_first[patient] + np.where(rank > 0, rng.integers(0, 1500, len(patient)), 0)
+    days = np.minimum(days, n_days)
+
+    df_cohort = pd.DataFrame({
+        'MRN': mrn.to_numpy()[patient],
+        'DMP_ID': dmp_id.to_numpy()[patient],
+        'SAMPLE_ID': (dmp_id.iloc[patient].reset_index(drop=True) + suffix + panel).to_numpy(),
+        'IS_TUMOR': is_tumor,
+        'DATE_TUMOR_SEQUENCING': _format_dates(days, seq_start)
+    })
+
+    return df_cohort
+
+
+def make_demographics(df_cohort, frac_deceased=0.3, frac_null=0.02, frac_unpadded_mrn=0.5, seed=0):
+    """
+    Demographics table (t01_epic_ddp_demographics), one row per patient.
+
+    Birth dates are 20 to 90 years before the first sequencing date, MRN creation
+    dates up to 2 years before it, and last contact and death dates up to 8 years
+    after it, but not after the last sequencing date of the cohort. frac_null of
+    birth, last contact and MRN creation dates are missing.
+    """
+    rng = np.random.default_rng(seed + 1)
+    df_patient = df_cohort.drop_duplicates(subset='DMP_ID')
+    n = len(df_patient)
+
+    days_seq = _days_since_epoch(df_patient['DATE_TUMOR_SEQUENCING'])
+    days_max = _days_since_epoch(df_cohort['DATE_TUMOR_SEQUENCING']).max()
+    days_follow_up = np.minimum(rng.integers(0, 365 * 8, n), days_max - days_seq)
+
+    dict_dates = {
+        'PT_BIRTH_DTE': days_seq - rng.integers(365 * 20, 365 * 90, n),
+        'PT_DEATH_DTE': days_seq + days_follow_up,
+        'PLA_LAST_CONTACT_DTE': days_seq + np.maximum(days_follow_up - rng.integers(0, 90, n), 0),
+        'MRN_CREATE_DTE': days_seq - rng.integers(0, 365 * 2, n)
+    }
+    df_demo = pd.DataFrame({'MRN': _unpad_mrns(df_patient['MRN'], frac_unpadded_mrn, rng)})
+    for col, days in dict_dates.items():
+        values = _format_dates(days, '1970-01-01')
+        if col == 'PT_DEATH_DTE':
+            values[rng.random(n) >= frac_deceased] = None
+        else:
+            _null_out(values, frac_null, rng)
+        df_demo[col] = values
+
+    return df_demo
+
+
+def make_anchor_dates(df_cohort):
+    """Anchor dates table: MRN, DMP_ID and the first tumor sequencing date of each patient."""
+    df_tumor = df_cohort[df_cohort['IS_TUMOR']]
+    df_anchor = (
+        df_tumor.sort_values(by=['DMP_ID', 'DATE_TUMOR_SEQUENCING'], kind='stable')
+        .drop_duplicates(subset='DMP_ID')[['MRN', 'DMP_ID', 'DATE_TUMOR_SEQUENCING']]
+        .reset_index(drop=True)
+    )
+
+    return df_anchor
+
+
+def make_pathology(df_cohort, frac_null=0.01, frac_unpadded_mrn=0.5, seed=0):
+    """
+    Pathology sample mapping table, tumor and normal samples.
+
+    frac_null of sequencing dates are missing, as for samples not yet sequenced.
+    """
+    rng = np.random.default_rng(seed + 2)
+    df_path = pd.DataFrame({
+        'MRN': _unpad_mrns(df_cohort['MRN'], frac_unpadded_mrn, rng),
+        'DATE_TUMOR_SEQUENCING': _null_out(df_cohort['DATE_TUMOR_SEQUENCING'].to_numpy().copy(), frac_null, rng),
+        'SAMPLE_ID': df_cohort['SAMPLE_ID'].to_numpy(),
+        'DMP_ID': df_cohort['DMP_ID'].to_numpy()
+    })
+
+    return df_path
+
+
+def make_timeline_table(
+    config,
+    df_cohort,
+    rows_per_patient=8.0,
+    frac_null=0.05,
+    frac_stop_date=0.5,
+    frac_invalid_date=0.001,
+    frac_unpadded_mrn=0.5,
+    seed=0
+):
+    """
+    Source table of a timeline config.
+
+    Patient-level timelines get a Poisson number of rows per patient (some
+    patients none), sample-level timelines one row per tumor sample. START_DATE
+    is 2 years before to 5 years after the sequencing date (at most the last
+    sequencing date of the cohort), frac_stop_date of
+    the rows have a STOP_DATE, and frac_invalid_date of the start dates are not
+    parseable.
+
+    Parameters
+    ----------
+    config : dict
+        Timeline config (config/timelines/*.yaml)
+    df_cohort : pd.DataFrame
+        Cohort from make_cohort()
+    rows_per_patient : float, optional
+        Mean number of rows per patient (patient-level timelines)
+    frac_null : float, optional
+        Fraction of missing values of the other columns
+    frac_stop_date, frac_invalid_date, frac_unpadded_mrn : float, optional
+        See above
+    seed : int, optional
+        Random seed
+
+    Returns
+    -------
+    pd.DataFrame
+        MRN, START_DATE, STOP_DATE, SAMPLE_ID (sample level) and the columns
+        of the config's `columns` block, except PATIENT_ID
+    """
+    rng = np.random.default_rng([seed, sum(map(ord, config['timeline_id']))])
+
+    if config['patient_or_sample'] == 'sample':
+        df_rows = df_cohort[df_cohort['IS_TUMOR']].reset_index(drop=True)
+    else:
+        df_patient = df_cohort.drop_duplicates(subset='DMP_ID')
+        n_rows = rng.poisson(rows_per_patient, len(df_patient))
+        df_rows = df_patient.iloc[np.repeat(np.arange(len(df_patient)), n_rows)].reset_index(drop=True)
+    n = len(df_rows)
+
+    days_max = _days_since_epoch(df_cohort['DATE_TUMOR_SEQUENCING']).max()
+    days_start = _days_since_epoch(df_rows['DATE_TUMOR_SEQUENCING']) + rng.integers(-730, 1825, n)
+    days_start = np.minimum(days_start, days_max)
+    start_date = _format_dates(days_start, '1970-01-01')
+    start_date[rng.random(n) < frac_invalid_date] = 'unknown'
+    stop_date = _format_dates(np.minimum(days_start + rng.integers(0, 180, n), days_max), '1970-01-01')
+    stop_date[rng.random(n) >= frac_stop_date] = None
+
+    df = pd.DataFrame({
+        'MRN': _unpad_mrns(df_rows['MRN'], frac_unpadded_mrn, rng),
+        'START_DATE': start_date,
+        'STOP_DATE': stop_date
+    })
+    if config['patient_or_sample'] == 'sample':
+        df['SAMPLE_ID'] = df_rows['SAMPLE_ID'].to_numpy()
+
+    for col in config['columns']:
+        if col in df.columns or col == 'PATIENT_ID':
+            continue
+        if col == 'EVENT_TYPE':
+            df[col] = config['timeline_id'].upper()
+        else:
+            df[col] = _fake_values(col, n, rng, frac_null=frac_null)
+
+    return df
+
+
+def _add_summary_columns(df, config, rng, frac_null=0.05):
+    """Add the columns of a summary config that df does not have yet, in place."""
+    dict_metadata = config.get('column_metadata') or {}
+    n = len(df)
+    for col in config['columns']:
+        if col not in df.columns:
+            datatype = (dict_metadata.get(col) or {}).get('datatype')
+            df[col] = _fake_values(col, n, rng, datatype=datatype, frac_null=frac_null)
+    for col in config.get('date_columns') or []:
+        if col not in df.columns:
+            df[col] = _null_out(_format_dates(rng.integers(16000, 20000, n), '1970-01-01'), frac_null, rng)
+
+    return df
+
+
+def make_summary_table(config, df_cohort, frac_present=0.8, frac_null=0.05, frac_unpadded_mrn=0.5, seed=0):
+    """
+    Source table of a summary config, one row per key value.
+
+    Keys are MRNs or DMP_IDs of frac_present of the patients, or SAMPLE_IDs of
+    frac_present of the tumor samples, depending on the config's key_column.
+
+    Parameters
+    ----------
+    config : dict
+        Summary config (config/summaries/*.yaml)
+    df_cohort : pd.DataFrame
+        Cohort from make_cohort()
+    frac_present : float, optional
+        Fraction of patients or samples with a row
+    frac_null : float, optional
+        Fraction of missing values of the other columns
+    frac_unpadded_mrn : float, optional
+        Fraction of MRN keys without leading zeros
+    seed : int, optional
+        Random seed
+
+    Returns
+    -------
+    pd.DataFrame
+        The config's `columns`, plus its date_columns as 'YYYY-MM-DD' strings
+    """
+    rng = np.random.default_rng([seed, sum(map(ord, config['summary_id']))])
+    key_column = config['key_column']
+
+    if key_column == 'SAMPLE_ID':
+        keys = df_cohort.loc[df_cohort['IS_TUMOR'], 'SAMPLE_ID'].to_numpy()
+    else:
+        keys = df_cohort.drop_duplicates(subset='DMP_ID')[key_column].to_numpy()
+    keys = keys[rng.random(len(keys)) < frac_present]
+    if key_column == 'MRN':
+        keys = _unpad_mrns(keys, frac_unpadded_mrn, rng)
+    df = pd.DataFrame({key_column: keys})
+
+    return _add_summary_columns(df, config, rng, frac_null=frac_null)
+
+
+def load_configs(config_dir):
+    """Load the YAML configs of a directory, sorted by file name."""
+    list_configs = []
+    for fname in sorted(glob.glob(os.path.join(config_dir, '*.yaml'))):
+        with open(fname, 'r') as f:
+            list_configs.append(yaml.safe_load(f))
+
+    return list_configs
+
+
+def generate(
+    output_dir,
+    n_patients,
+    config_dir=DIR_CONFIG,
+    production_or_test='production',
+    samples_per_patient=1.2,
+    rows_per_patient=8.0,
+    frac_null=0.05,
+    frac_deceased=0.3,
+    frac_unpadded_mrn=0.5,
+    mrn_digits=8,
+    dmp_digits=7,
+    seq_start='2014-01-01',
+    seq_end='2025-12-31',
+    seed=0
+):
+    """
+    Write the synthetic source tables, sample list and patient template to a directory.
+
+    Returns
+    -------
+    dict
+        Table name to number of rows written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    col_source = 'source_table_prod' if production_or_test == 'production' else 'source_table_dev'
+
+    df_cohort = make_cohort(
+        n_patients=n_patients,
+        samples_per_patient=samples_per_patient,
+        mrn_digits=mrn_digits,
+        dmp_digits=dmp_digits,
+        seq_start=seq_start,
+        seq_end=seq_end,
+        seed=seed
+    )
+
+    dict_tables = {
+        TABLE_DEMO: make_demographics(
+            df_cohort, frac_deceased=frac_deceased, frac_null=frac_null, frac_unpadded_mrn=frac_unpadded_mrn, seed=seed
+        ),
+        TABLE_ANCHOR_DATES: make_anchor_dates(df_cohort),
+        TABLE_PATHOLOGY: make_pathology(df_cohort, frac_unpadded_mrn=frac_unpadded_mrn, seed=seed)
+    }
+
+    for config in load_configs(os.path.join(config_dir, 'timelines')):
+        if not config.get(col_source):
+            print(f"  ⚠ No {col_source} in timeline config {config['timeline_id']}, skipped")
+            continue
+        dict_tables[config[col_source]] = make_timeline_table(
+            config,
+            df_cohort,
+            rows_per_patient=rows_per_patient,
+            frac_null=frac_null,
+            frac_unpadded_mrn=frac_unpadded_mrn,
+            seed=seed
+        )
+
+    for config in load_configs(os.path.join(config_dir, 'summaries')):
+        table_name = config.get(col_source)
+        if not table_name:
+            print(f"  ⚠ No {col_source} in summary config {config['summary_id']}, skipped")
+            continue
+        if table_name in dict_tables:
+            # e.g. the demographics summary reads the demographics table
+            rng = np.random.default_rng([seed, sum(map(ord, config['summary_id']))])
+            _add_summary_columns(dict_tables[table_name], config, rng, frac_null=frac_null)
+        else:
+            dict_tables[table_name] = make_summary_table(
+                config, df_cohort, frac_null=frac_null, frac_unpadded_mrn=frac_unpadded_mrn, seed=seed
+            )
+
+    dict_counts = {}
+    for table_name, df in dict_tables.items():
+        df.to_parquet(os.path.join(output_dir, f"{table_name}.parquet"), index=False)
+        dict_counts[table_name] = len(df)
+
+    # Cohort files passed to the timeline and summary scripts
+    df_samples = df_cohort.loc[df_cohort['IS_TUMOR'], ['SAMPLE_ID', 'DMP_ID']].rename(columns={'DMP_ID': 'PATIENT_ID'})
+    df_samples.to_csv(os.path.join(output_dir, 'data_clinical_sample.txt'), sep='\t', index=False)
+    df_samples[['PATIENT_ID']].drop_duplicates().to_csv(
+        os.path.join(output_dir, 'data_clinical_patient.txt'), sep='\t', index=False
+    )
+
+    return dict_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write synthetic source tables for running the pipeline offline"
+    )
+    parser.add_argument(
+        "--output_dir",
+        action="store",
+        dest="output_dir",
+        required=True,
+        help="Directory for the Parquet tables and cohort files"
+    )
+    parser.add_argument(
+        "--n_patients",
+        action="store",
+        dest="n_patients",
+        type=int,
+        default=10000,
+        help="Number of patients (default: 10000)"
+    )
+    parser.add_argument(
+        "--config_dir",
+        action="store",
+        dest="config_dir",
+        default=DIR_CONFIG,
+        help="Directory with timelines/ and summaries/ YAML configs (default: repo config/)"
+    )
+    parser.add_argument(
+        "--production_or_test",
+        action="store",
+        dest="production_or_test",
+        default="production",
+        choices=["production", "test"],
+        help="Use the configs' prod or dev source table names (default: production)"
+    )
+    parser.add_argument(
+        "--samples_per_patient",
+        action="store",
+        dest="samples_per_patient",
+        type=float,
+        default=1.2,
+        help="Mean number of tumor samples per patient (default: 1.2)"
+    )
+    parser.add_argument(
+        "--rows_per_patient",
+        action="store",
+        dest="rows_per_patient",
+        type=float,
+        default=8.0,
+        help="Mean rows per patient of patient-level timeline tables (default: 8)"
+    )
+    parser.add_argument(
+        "--frac_null",
+        action="store",
+        dest="frac_null",
+        type=float,
+        default=0.05,
+        help="Fraction of missing values in non-key columns (default: 0.05)"
+    )
+    parser.add_argument(
+        "--frac_deceased",
+        action="store",
+        dest="frac_deceased",
+        type=float,
+        default=0.3,
+        help="Fraction of patients with a date of death (default: 0.3)"
+    )
+    parser.add_argument(
+        "--frac_unpadded_mrn",
+        action="store",
+        dest="frac_unpadded_mrn",
+        type=float,
+        default=0.5,
+        help="Fraction of source MRNs stored without leading zeros (default: 0.5)"
+    )
+    parser.add_argument(
+        "--mrn_digits",
+        action="store",
+        dest="mrn_digits",
+        type=int,
+        default=8,
+        help="Digits of zero-padded MRNs (default: 8)"
+    )
+    parser.add_argument(
+        "--dmp_digits",
+        action="store",
+        dest="dmp_digits",
+        type=int,
+        default=7,
+        help="Digits of DMP_IDs after 'P-' (default: 7)"
+    )
+    parser.add_argument(
+        "--seq_start",
+        action="store",
+        dest="seq_start",
+        default="2014-01-01",
+        help="First tumor sequencing date (default: 2014-01-01)"
+    )
+    parser.add_argument(
+        "--seq_end",
+        action="store",
+        dest="seq_end",
+        default="2025-12-31",
+        help="Last tumor sequencing date (default: 2025-12-31)"
+    )
+    parser.add_argument(
+        "--seed",
+        action="store",
+        dest="seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("SYNTHETIC COHORT")
+    print("=" * 80)
+    print(f"Patients: {args.n_patients}")
+    print(f"Output:   {args.output_dir}")
+
+    dict_counts = generate(
+        output_dir=args.output_dir,
+        n_patients=args.n_patients,
+        config_dir=args.config_dir,
+        production_or_test=args.production_or_test,
+        samples_per_patient=args.samples_per_patient,
+        rows_per_patient=args.rows_per_patient,
+        frac_null=args.frac_null,
+        frac_deceased=args.frac_deceased,
+        frac_unpadded_mrn=args.frac_unpadded_mrn,
+        mrn_digits=args.mrn_digits,
+        dmp_digits=args.dmp_digits,
+        seq_start=args.seq_start,
+        seq_end=args.seq_end,
+        seed=args.seed
+    )
+
+    for table_name, n_rows in dict_counts.items():
+        print(f"  ✓ {table_name}: {n_rows} rows")
+    print("=" * 80)
+
+
+if __name__ == '__main__':
+    main()
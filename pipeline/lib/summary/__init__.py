@@ -1,10 +1,14 @@
 from .create_summary_from_yaml_configs import YamlConfigToCbioportalFormat
 from .summary_config_processor import SummaryConfigProcessor
 from .summary_merger import SummaryMerger, merge_summaries_from_yaml_configs
+from .aligned_merge import left_merge_all
+from .final_file_writer import write_final_file
 
 __all__ = [
     "YamlConfigToCbioportalFormat",
     "SummaryConfigProcessor",
     "SummaryMerger",
-    "merge_summaries_from_yaml_configs"
+    "merge_summaries_from_yaml_configs",
+    "left_merge_all",
+    "write_final_file"
 ]
@@ -0,0 +1,211 @@
+"""
+aligned_merge.py
+
+Multi-way left join of summary intermediates onto a template.
+
+Merging k intermediates with k chained DataFrame.merge(how='left') calls copies the
+accumulated frame every time, so time and peak memory grow with k x cells.
+left_merge_all() instead indexes each intermediate by the merge key once, reindexes
+it to the template's key order and concatenates everything in one pd.concat(axis=1),
+which touches every cell once.
+
+The single pass gives the same result as the chained merges (row order, column
+order and dtypes, including int -> float upcasts for unmatched keys) as long as
+every intermediate has unique, non-null keys of the template's key dtype and no
+column name is added twice. Otherwise it falls back to the chained merges.
+
+With the run's IdCodec (lib/utils/id_codec.py), the template keys are not hashed
+again for every intermediate: each intermediate's keys are looked up in the codec
+once and the template rows are matched on the integer codes.
+"""
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utils.id_codec import IdCodec
+
+
+def _columns_to_keep(list_df: List[pd.DataFrame], merge_key: str) -> List[List[str]]:
+    """
+    Return the non-key columns each frame contributes when later frames replace
+    earlier columns of the same name.
+    """
+    list_cols = [[col for col in df.columns if col != merge_key] for df in list_df]
+    seen_later = set()
+    list_keep = []
+    for cols in reversed(list_cols):
+        list_keep.append([col for col in cols if col not in seen_later])
+        seen_later.update(cols)
+
+    return list_keep[::-1]
+
+
+def can_align(
+    df_template: pd.DataFrame,
+    list_df: List[pd.DataFrame],
+    merge_key: str,
+    replace_duplicates: bool = False
+) -> Optional[str]:
+    """
+    Check whether the single-pass merge matches the chained merges.
+
+    Parameters
+    ----------
+    df_template : pd.DataFrame
+        Template with the merge key column
+    list_df : List[pd.DataFrame]
+        Frames to left-join onto the template, in order
+    merge_key : str
+        Key column
+    replace_duplicates : bool, optional
+        Whether columns already present are replaced by later frames
+
+    Returns
+    -------
+    Optional[str]
+        None if the single pass can be used, otherwise the reason it cannot
+    """
+    if df_template.empty:
+        # pandas orders the columns of merges onto an empty frame differently
+        return "template is empty"
+
+    dtype_key = df_template[merge_key].dtype
+    for idx, df in enumerate(list_df):
+        if merge_key not in df.columns:
+            return f"frame {idx} has no {merge_key} column"
+        if not df.columns.is_unique:
+            return f"frame {idx} has duplicate column names"
+        if df[merge_key].dtype != dtype_key:
+            return f"frame {idx} has {merge_key} dtype {df[merge_key].dtype}, template has {dtype_key}"
+        if df[merge_key].isnull().any():
+            return f"frame {idx} has missing {merge_key} values"
+        if not df[merge_key].is_unique:
+            return f"frame {idx} has duplicate {merge_key} values"
+
+    if not replace_duplicates:
+        cols_all = list(df_template.columns) + [
+            col for df in list_df for col in df.columns if col != merge_key
+        ]
+        if len(cols_all) != len(set(cols_all)):
+            return "column names overlap between frames"
+
+    return None
+
+
+def _merge_sequential(
+    df_template: pd.DataFrame,
+    list_df: List[pd.DataFrame],
+    merge_key: str,
+    replace_duplicates: bool = False
+) -> pd.DataFrame:
+    """Chained left merges, one per frame. Frames that fail to merge are skipped."""
+    df_merged = df_template.copy()
+    for idx, df in enumerate(list_df):
+        try:
+            if replace_duplicates:
+                duplicate_cols = [col for col in df.columns if col != merge_key and col in df_merged.columns]
+                df_merged = df_merged.drop(columns=duplicate_cols)
+            df_merged = df_merged.merge(right=df, how='left', on=merge_key)
+        except Exception as e:
+            print(f"  ✗ ERROR merging frame {idx}: {str(e)}")
+            continue
+
+    return df_merged
+
+
+def _template_indexer(codec: IdCodec, df_template: pd.DataFrame, merge_key: str):
+    """
+    Return a function giving, for a frame, the row matching each template key
+    (-1 if none), or None if the template has keys that are missing or not in the codec.
+    """
+    codes_template = codec.codes(df_template, merge_key)
+    if (codes_template < 0).any():
+        return None
+
+    def indexer(df: pd.DataFrame) -> np.ndarray:
+        codes = codec.codes(df, merge_key)
+        logic_known = codes >= 0
+        # Keys not in the codec cannot match a template key
+        position_of_code = np.full(len(codec), -1, dtype=np.int64)
+        position_of_code[codes[logic_known]] = np.flatnonzero(logic_known)
+        return position_of_code[codes_template]
+
+    return indexer
+
+
+def left_merge_all(
+    df_template: pd.DataFrame,
+    list_df: List[pd.DataFrame],
+    merge_key: str,
+    replace_duplicates: bool = False,
+    codec: Optional[IdCodec] = None
+) -> pd.DataFrame:
+    """
+    Left-join several frames onto a template on one key column.
+
+    Equivalent to calling df_merged = df_merged.merge(right=df, how='left', on=merge_key)
+    for each frame in order, starting from the template.
+
+    Parameters
+    ----------
+    df_template : pd.DataFrame
+        Template with the merge key column. Its rows (and their order) define the output rows.
+    list_df : List[pd.DataFrame]
+        Frames to left-join onto the template, in order
+    merge_key : str
+        Key column
+    replace_duplicates : bool, optional
+        If True, a column that is already present is dropped and added again from
+        the later frame (SummaryMerger semantics). If False, overlapping columns get
+        the pandas merge suffixes, as with chained merges.
+    codec : IdCodec, optional
+        ID codec of the run, to match keys on integer codes
+
+    Returns
+    -------
+    pd.DataFrame
+        Merged frame with a RangeIndex
+    """
+    if not list_df:
+        return df_template.copy()
+
+    reason = can_align(
+        df_template=df_template,
+        list_df=list_df,
+        merge_key=merge_key,
+        replace_duplicates=replace_duplicates
+    )
+    if reason is not None:
+        print(f"  Single-pass merge not possible ({reason}), merging one frame at a time")
+        return _merge_sequential(
+            df_template=df_template,
+            list_df=list_df,
+            merge_key=merge_key,
+            replace_duplicates=replace_duplicates
+        )
+
+    indexer = None
+    if codec is not None and df_template[merge_key].dtype == object:
+        indexer = _template_indexer(codec=codec, df_template=df_template, merge_key=merge_key)
+    keys = pd.Index(df_template[merge_key]) if indexer is None else None
+    if replace_duplicates:
+        list_keep = _columns_to_keep(list_df=list_df, merge_key=merge_key)
+        cols_replaced = {col for cols_keep in list_keep for col in cols_keep}
+        cols_template = [col for col in df_template.columns if col == merge_key or col not in cols_replaced]
+    else:
+        list_keep = [[col for col in df.columns if col != merge_key] for df in list_df]
+        cols_template = list(df_template.columns)
+
+    list_parts = [df_template[cols_template].reset_index(drop=True)]
+    for df, cols_keep in zip(list_df, list_keep):
+        if not cols_keep:
+            continue
+        if indexer is None:
+            df_part = df[cols_keep].set_axis(pd.Index(df[merge_key]), axis=0).reindex(keys)
+        else:
+            # Reindexing by position gives missing values (with merge's upcasts) for -1
+            df_part = df[cols_keep].reset_index(drop=True).reindex(indexer(df))
+        list_parts.append(df_part.reset_index(drop=True))
+
+    return pd.concat(list_parts, axis=1)
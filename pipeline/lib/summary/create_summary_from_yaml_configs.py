@@ -28,13 +28,14 @@ import os
 import glob
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 from msk_cdm.databricks import DatabricksAPI
 from msk_cdm.data_processing import set_debug_console, mrn_zero_pad
 
 from .summary_config_processor import SummaryConfigProcessor
-from ..utils import constants
+from ..utils import constants, table_cache
+from ..utils.anchor_date_index import AnchorDateIndex
 
 set_debug_console()
 
@@ -87,6 +88,7 @@ class YamlConfigToCbioportalFormat(object):
 
         # DataFrames
         self._df_anchor = None
+        self._anchor_index = None
 
         # Initialize
         self._init()
@@ -100,8 +102,11 @@ class YamlConfigToCbioportalFormat(object):
 
         # Load anchor dates for deidentification
         print(f'Loading anchor dates: {TABLE_ANCHOR_DATES}')
-        sql = f"SELECT * FROM {TABLE_ANCHOR_DATES}"
-        self._df_anchor = self._obj_db.query_from_sql(sql=sql)
+        self._df_anchor = table_cache.query_table(
+            obj_db=self._obj_db,
+            table_name=TABLE_ANCHOR_DATES,
+            columns=constants.COLS_ANCHOR_DATES
+        )
 
         # Zero-pad MRN
         self._df_anchor = mrn_zero_pad(df=self._df_anchor, col_mrn='MRN')
@@ -113,6 +118,9 @@ class YamlConfigToCbioportalFormat(object):
 
         print(f'  Loaded {self._df_anchor.shape[0]} anchor dates')
 
+        # Index once; shared read-only by every summary processor
+        self._anchor_index = AnchorDateIndex(self._df_anchor, normalized=True)
+
         return None
 
     def return_anchor_dates(self):
@@ -266,7 +274,7 @@ class YamlConfigToCbioportalFormat(object):
     def process_single_summary(
         self,
         yaml_file: str,
-        df_anchor: pd.DataFrame,
+        df_anchor: Union[AnchorDateIndex, pd.DataFrame],
         df_template: pd.DataFrame,
         patient_or_sample: str,
         save_to_table: bool = False
@@ -278,8 +286,8 @@ class YamlConfigToCbioportalFormat(object):
         ----------
         yaml_file : str
             Path to YAML configuration file
-        df_anchor : pd.DataFrame
-            Anchor dates dataframe
+        df_anchor : AnchorDateIndex or pd.DataFrame
+            Anchor dates (indexed or as a dataframe)
         df_template : pd.DataFrame
             Template dataframe
         patient_or_sample : str
@@ -377,8 +385,8 @@ class YamlConfigToCbioportalFormat(object):
         print(f"CREATING {patient_or_sample.upper()} SUMMARIES")
         print(f"{'='*80}\n")
 
-        # Load anchor dates
-        df_anchor = self._df_anchor
+        # Load anchor dates (indexed once in _init)
+        df_anchor = self._anchor_index
 
         # Load template (subset to relevant ID column and deduplicate)
         df_template = self._load_template(table_template, patient_or_sample)
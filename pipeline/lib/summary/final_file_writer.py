@@ -0,0 +1,219 @@
+"""
+final_file_writer.py
+
+Write a final cBioPortal file (header rows + data) without stacking the header on
+top of the data.
+
+Stacking the 4-5 header rows on the data with pd.concat turns every column into
+object dtype and holds a second full copy of the data before anything is written.
+write_final_file() writes the header rows directly and then formats the data in
+row chunks, so only one chunk is held as object at a time. Each chunk is
+converted with astype(object) before formatting, which is what pd.concat does to
+the data columns, so the bytes written are identical to the concat + to_csv
+output.
+
+DatabricksAPI.write_db_obj() only accepts a DataFrame, so the volume copy is
+streamed when the volume is mounted on this machine (e.g. /Volumes on a
+Databricks cluster). Otherwise it falls back to one stacked DataFrame written
+through write_db_obj(): that path (the usual one when running off-cluster)
+keeps the peak memory of the old concat + write, and only the local copy is
+streamed.
+"""
+import os
+from typing import Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from msk_cdm.databricks import DatabricksAPI
+
+DEFAULT_CHUNK_SIZE = 100000
+
+DataOrChunks = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+
+def iter_data_chunks(data: DataOrChunks, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield row chunks of a DataFrame, or pass through an iterable of chunks.
+
+    Parameters
+    ----------
+    data : pd.DataFrame or Iterable[pd.DataFrame]
+        Data rows
+    chunk_size : int, optional
+        Rows per chunk when data is a DataFrame
+
+    Yields
+    ------
+    pd.DataFrame
+        Chunk of data rows
+    """
+    if not isinstance(data, pd.DataFrame):
+        yield from data
+        return
+
+    if data.shape[0] == 0:
+        yield data
+        return
+
+    for start in range(0, data.shape[0], chunk_size):
+        yield data.iloc[start:start + chunk_size]
+
+
+def align_header(df_header_wide: pd.DataFrame, columns: List) -> pd.DataFrame:
+    """Reorder the header columns to the data column order."""
+    if list(df_header_wide.columns) != list(columns):
+        print("\n⚠ WARNING: Column order mismatch. Reordering header to match data...")
+        df_header_wide = df_header_wide[columns]
+        print(f"  Header reordered: {list(df_header_wide.columns)}")
+
+    return df_header_wide
+
+
+def format_rows(df: pd.DataFrame, sep: str = '\t', column_names: Optional[List] = None) -> str:
+    """
+    Format rows as they appear in the stacked header + data file.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Header rows or a chunk of data rows
+    sep : str, optional
+        Delimiter
+    column_names : list, optional
+        If given, a line with these column names is written first
+
+    Returns
+    -------
+    str
+        Delimited text, one line per row
+    """
+    df = df.astype(object)
+    if column_names is not None:
+        df = df.set_axis(column_names, axis=1)
+
+    return df.to_csv(sep=sep, index=False, header=column_names is not None)
+
+
+def is_volume_mounted(volume_path: str) -> bool:
+    """Return True if the directory of a volume path is writable on this machine."""
+    volume_dir = os.path.dirname(volume_path)
+    return os.path.isdir(volume_dir) and os.access(volume_dir, os.W_OK)
+
+
+def write_final_file(
+    df_header_wide: pd.DataFrame,
+    data: DataOrChunks,
+    output_local_path: Optional[str] = None,
+    output_volume_path: Optional[str] = None,
+    obj_db: Optional[DatabricksAPI] = None,
+    column_names: Optional[List] = None,
+    sep: str = '\t',
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Write header rows followed by data rows to a local path and/or a volume path.
+
+    The local file has no column-name line (cBioPortal format). The volume file
+    starts with a column-name line, as written by write_db_obj().
+
+    The volume file is streamed only if the volume is mounted here (see
+    is_volume_mounted). Otherwise the header and all data rows are stacked into
+    one object DataFrame for write_db_obj(), which holds a full copy of the data
+    as before this writer existed.
+
+    Parameters
+    ----------
+    df_header_wide : pd.DataFrame
+        Header rows, one column per data column
+    data : pd.DataFrame or Iterable[pd.DataFrame]
+        Data rows, or chunks of data rows with the same columns. Chunks are only
+        iterated once.
+    output_local_path : str, optional
+        Local filesystem path
+    output_volume_path : str, optional
+        Databricks volume path
+    obj_db : DatabricksAPI, optional
+        Databricks API object, required for output_volume_path
+    column_names : list, optional
+        Column names for the volume file's column-name line (default: data columns)
+    sep : str, optional
+        Delimiter
+    chunk_size : int, optional
+        Rows formatted at a time when data is a DataFrame
+
+    Returns
+    -------
+    int
+        Number of data rows written
+    """
+    if output_volume_path is not None and obj_db is None:
+        raise ValueError("obj_db is required when output_volume_path is given")
+
+    stream_volume = output_volume_path is not None and is_volume_mounted(output_volume_path)
+    list_chunks_volume = [] if output_volume_path is not None and not stream_volume else None
+
+    if output_local_path is not None:
+        output_dir = os.path.dirname(output_local_path)
+        if output_dir and not os.path.exists(output_dir):
+            print(f"  Creating directory: {output_dir}")
+            os.makedirs(output_dir, exist_ok=True)
+
+    fh_local = None
+    fh_volume = None
+    try:
+        if output_local_path is not None:
+            fh_local = open(output_local_path, 'w', newline='', encoding='utf-8')
+        if stream_volume:
+            fh_volume = open(output_volume_path, 'w', newline='', encoding='utf-8')
+
+        n_rows = 0
+        header_written = False
+        for chunk in iter_data_chunks(data, chunk_size=chunk_size):
+            if not header_written:
+                df_header_wide = align_header(df_header_wide, columns=list(chunk.columns))
+                if column_names is None:
+                    column_names = list(chunk.columns)
+                if fh_local is not None:
+                    fh_local.write(format_rows(df_header_wide, sep=sep))
+                if fh_volume is not None:
+                    fh_volume.write(format_rows(df_header_wide, sep=sep, column_names=column_names))
+                header_written = True
+
+            # Format each chunk once for both files
+            if fh_local is not None or fh_volume is not None:
+                text_chunk = format_rows(chunk, sep=sep)
+                if fh_local is not None:
+                    fh_local.write(text_chunk)
+                if fh_volume is not None:
+                    fh_volume.write(text_chunk)
+            if list_chunks_volume is not None:
+                list_chunks_volume.append(chunk)
+            n_rows += chunk.shape[0]
+    finally:
+        if fh_local is not None:
+            fh_local.close()
+        if fh_volume is not None:
+            fh_volume.close()
+
+    if not header_written:
+        raise ValueError("No data chunks to write")
+
+    if list_chunks_volume is not None:
+        # Volume not mounted: write_db_obj needs the stacked frame, so this copy
+        # keeps the memory peak of stacking header and data
+        print(f"  ⚠ Volume not mounted: stacking header and data for {output_volume_path}")
+        df_combined = pd.concat(
+            [df_header_wide] + list_chunks_volume,
+            axis=0,
+            ignore_index=True
+        )
+        df_combined.columns = column_names
+        obj_db.write_db_obj(
+            df=df_combined,
+            volume_path=output_volume_path,
+            sep=sep,
+            overwrite=True,
+            dict_database_table_info=None
+        )
+
+    return n_rows
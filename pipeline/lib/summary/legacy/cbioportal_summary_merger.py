@@ -8,6 +8,7 @@ import pandas as pd
 
 from msk_cdm.databricks import DatabricksAPI
 from pipeline.lib.utils import constants
+from pipeline.lib.utils.dtype_policy import as_text
 
 COLS_PRODUCTION = constants.COLS_PRODUCTION
 NROWS_HEADER = 4
@@ -101,8 +102,8 @@ class cBioPortalSummaryMergeTool(object):
         df_header = df_full.iloc[:NROWS_HEADER].copy()
         df_data = df_full.iloc[NROWS_HEADER:].reset_index(drop=True).copy()
 
-        # Ensure data is string type
-        df_data = df_data.astype(str)
+        # Text columns as astype(str) writes them (no categoricals: backfill adds new values)
+        df_data = as_text(df_data, categorical_columns=(), missing_as_text=True)
 
         return df_header, df_data
 
@@ -114,7 +115,7 @@ class cBioPortalSummaryMergeTool(object):
         print('Loading %s' % fname_data)
         # Load from Databricks volume path using DatabricksAPI
         df_data = self._obj_db.read_db_obj(volume_path=fname_data, sep=',')
-        df_data = df_data.astype(str)
+        df_data = as_text(df_data, categorical_columns=(), missing_as_text=True)
         print(df_data.sample(1))
         print('Loading %s' % fname_header)
         # Load from Databricks volume path using DatabricksAPI
@@ -0,0 +1,163 @@
+"""
+source_table_reader.py
+
+Read each summary source table once, however many YAML configs use it.
+
+SummaryConfigProcessor issues one SELECT per config. When several configs point
+at the same source table (e.g. summaries derived from one upstream table, or a
+patient and a sample summary of the same table), plan_source_queries() groups the
+configs by source table and collects the union of their columns.
+SourceTableReader then runs one query per table and hands each config its
+columns. A table is dropped once every config that uses it has been served.
+
+The plan can span both levels: the in-process wrapper builds one reader for the
+patient and the sample pass.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import yaml
+
+from msk_cdm.databricks import DatabricksAPI
+
+
+def get_config_source_table(config: Dict, production_or_test: str) -> str:
+    """Return the source table of a summary config (same rule as SummaryConfigProcessor)."""
+    if production_or_test == 'production':
+        return config['source_table_prod']
+    else:
+        return config['source_table_dev']
+
+
+def plan_source_queries(
+    yaml_files: Iterable[str],
+    production_or_test: str,
+    levels: Optional[Iterable[str]] = None
+) -> Dict[str, Dict]:
+    """
+    Group summary configs by source table.
+
+    Parameters
+    ----------
+    yaml_files : Iterable[str]
+        Summary YAML config paths
+    production_or_test : str
+        'production' or 'test' to determine which source tables are used
+    levels : Iterable[str], optional
+        Only plan configs of these levels ('patient', 'sample'). All levels if not given.
+
+    Returns
+    -------
+    Dict[str, Dict]
+        Per source table: 'columns' (union of the configs' columns, in first-seen
+        order) and 'summary_ids' (configs reading the table). Configs that cannot
+        be loaded are left out; they fail later in their own processor.
+    """
+    plan = {}
+    for yaml_file in yaml_files:
+        try:
+            with open(yaml_file, 'r') as f:
+                config = yaml.safe_load(f)
+            if levels is not None and config.get('patient_or_sample', '') not in levels:
+                continue
+            source_table = get_config_source_table(config=config, production_or_test=production_or_test)
+            columns = list(config['columns'])
+            summary_id = config['summary_id']
+        except Exception:
+            continue
+
+        entry = plan.setdefault(source_table, {'columns': [], 'summary_ids': []})
+        entry['columns'] += [col for col in columns if col not in entry['columns']]
+        entry['summary_ids'].append(summary_id)
+
+    return plan
+
+
+class SourceTableReader:
+    """
+    Serves column subsets of source tables, querying each planned table once.
+
+    Safe to share between the threads of process_all_configs(): a table is
+    queried by the first config that needs it while the others wait.
+    """
+
+    def __init__(self, obj_db: DatabricksAPI, plan: Dict[str, Dict], tables: Optional[Dict[str, pd.DataFrame]] = None):
+        """
+        Parameters
+        ----------
+        obj_db : DatabricksAPI
+            Databricks API object used for the queries
+        plan : Dict[str, Dict]
+            Output of plan_source_queries()
+        tables : Dict[str, pd.DataFrame], optional
+            Planned tables already queried (see loaded_tables), e.g. by the parent
+            of a forked process. Each must hold the planned columns.
+        """
+        self.obj_db = obj_db
+        self.plan = plan
+        self._tables = {table: df for table, df in (tables or {}).items() if table in plan}
+        self._remaining = {table: len(entry['summary_ids']) for table, entry in plan.items()}
+        self._locks = {table: threading.Lock() for table in plan}
+        self._lock = threading.Lock()
+
+    def shared_tables(self) -> List[str]:
+        """Return the planned tables read by more than one config."""
+        return [table for table, entry in self.plan.items() if len(entry['summary_ids']) > 1]
+
+    def _load(self, table_name: str) -> pd.DataFrame:
+        """Query a planned table with the union of its columns (once)."""
+        with self._locks[table_name]:
+            if table_name not in self._tables:
+                columns = self.plan[table_name]['columns']
+                n_configs = len(self.plan[table_name]['summary_ids'])
+                if n_configs > 1:
+                    print(f"  Querying {table_name} once for {n_configs} configs ({len(columns)} columns)")
+                sql = f"SELECT {', '.join(columns)} FROM {table_name}"
+                self._tables[table_name] = self.obj_db.query_from_sql(sql=sql)
+
+            return self._tables[table_name]
+
+    def prefetch(self, tables: Iterable[str]):
+        """Query planned tables now, e.g. before forking one process per level."""
+        for table_name in tables:
+            if table_name in self.plan:
+                self._load(table_name)
+
+    def loaded_tables(self) -> Dict[str, pd.DataFrame]:
+        """Return the tables queried and not yet dropped, e.g. to seed the reader of a forked process."""
+        with self._lock:
+            return dict(self._tables)
+
+    def read(self, table_name: str, columns: List[str]) -> pd.DataFrame:
+        """
+        Return the given columns of a source table.
+
+        Tables that are not in the plan, or columns that were not planned, are
+        queried directly.
+
+        Parameters
+        ----------
+        table_name : str
+            Source table name
+        columns : List[str]
+            Columns to return
+
+        Returns
+        -------
+        pd.DataFrame
+            New DataFrame with the requested columns, in the requested order
+        """
+        if table_name not in self.plan or any(col not in self.plan[table_name]['columns'] for col in columns):
+            sql = f"SELECT {', '.join(columns)} FROM {table_name}"
+            return self.obj_db.query_from_sql(sql=sql)
+
+        df = self._load(table_name)[columns].copy()
+
+        # Drop the table once every planned config has taken its columns
+        with self._lock:
+            self._remaining[table_name] -= 1
+            if self._remaining[table_name] <= 0:
+                self._tables.pop(table_name, None)
+
+        return df
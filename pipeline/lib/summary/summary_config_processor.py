@@ -17,10 +17,14 @@ import os
 import yaml
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 from msk_cdm.databricks import DatabricksAPI
 from msk_cdm.data_processing import mrn_zero_pad
+from ..utils import intermediate_io
+from ..utils.anchor_date_index import AnchorDateIndex
+from ..utils.id_codec import IdCodec
+from .source_table_reader import SourceTableReader, get_config_source_table
 
 
 class SummaryConfigProcessor:
@@ -36,7 +40,9 @@ class SummaryConfigProcessor:
         fname_yaml_config: str,
         fname_databricks_env: str,
         production_or_test: str = 'production',
-        cohort: str = 'mskimpact'
+        cohort: str = 'mskimpact',
+        obj_db: Optional[DatabricksAPI] = None,
+        source_reader: Optional[SourceTableReader] = None
     ):
         """
         Initialize the summary processor.
@@ -51,6 +57,12 @@ class SummaryConfigProcessor:
             'production' or 'test' to determine which tables/destinations to use
         cohort : str, optional
             Cohort name for volume path construction (e.g., 'mskimpact', 'mskaccess')
+        obj_db : DatabricksAPI, optional
+            Existing Databricks API object to share between processors.
+            A new one is created from fname_databricks_env if not given.
+        source_reader : SourceTableReader, optional
+            Shared reader that queries each source table once for all configs.
+            The source table is queried directly if not given.
         """
         self.fname_yaml_config = fname_yaml_config
         self.fname_databricks_env = fname_databricks_env
@@ -61,7 +73,10 @@ class SummaryConfigProcessor:
         self.config = self._load_config()
 
         # Initialize Databricks API
-        self.obj_db = DatabricksAPI(fname_databricks_env=fname_databricks_env)
+        if obj_db is None:
+            obj_db = DatabricksAPI(fname_databricks_env=fname_databricks_env)
+        self.obj_db = obj_db
+        self.source_reader = source_reader
 
         # Determine source table and destination
         self.source_table = self._get_source_table()
@@ -79,10 +94,7 @@ class SummaryConfigProcessor:
 
     def _get_source_table(self) -> str:
         """Get the appropriate source table based on production/test setting."""
-        if self.production_or_test == 'production':
-            return self.config['source_table_prod']
-        else:
-            return self.config['source_table_dev']
+        return get_config_source_table(config=self.config, production_or_test=self.production_or_test)
 
     def _get_dest_config(self) -> Dict:
         """Get the appropriate destination config based on production/test setting."""
@@ -109,18 +121,22 @@ class SummaryConfigProcessor:
 
     def process_summary(
         self,
-        df_anchor: pd.DataFrame,
-        df_template: pd.DataFrame
+        df_anchor: Union[AnchorDateIndex, pd.DataFrame],
+        df_template: pd.DataFrame,
+        codec: Optional[IdCodec] = None
     ) -> pd.DataFrame:
         """
         Process the summary file through the complete pipeline.
 
         Parameters
         ----------
-        df_anchor : pd.DataFrame
-            Anchor dates dataframe with columns: MRN, DMP_ID, DATE_TUMOR_SEQUENCING
+        df_anchor : AnchorDateIndex or pd.DataFrame
+            Anchor dates with columns: MRN, DMP_ID, DATE_TUMOR_SEQUENCING. Pass an
+            AnchorDateIndex to share one normalized, indexed copy across summaries.
         df_template : pd.DataFrame
             Template dataframe with PATIENT_ID or SAMPLE_ID column
+        codec : IdCodec, optional
+            ID codec of the run, built from the template, to join on integer codes
 
         Returns
         -------
@@ -135,13 +151,14 @@ class SummaryConfigProcessor:
         df_data = self._load_and_subset_data()
 
         # Step 2: Merge with anchor dates and deidentify
+        df_anchor = AnchorDateIndex.from_frame(df_anchor)
         df_merged = self._merge_with_anchor_dates(df_data, df_anchor)
 
         # Step 3: Convert date columns to intervals
         df_with_intervals = self._convert_dates_to_intervals(df_merged, df_anchor)
 
         # Step 4: Merge with template
-        df_final = self._merge_with_template(df_with_intervals, df_template)
+        df_final = self._merge_with_template(df_with_intervals, df_template, codec=codec)
 
         # Step 5: Backfill missing data
         df_backfilled = self._backfill_missing_data(df_final)
@@ -156,10 +173,12 @@ class SummaryConfigProcessor:
         print(f"Loading source table: {self.source_table}")
 
         columns = self.config['columns']
-        columns_str = ', '.join(columns)
-        sql = f"SELECT {columns_str} FROM {self.source_table}"
-
-        df = self.obj_db.query_from_sql(sql=sql)
+        if self.source_reader is not None:
+            df = self.source_reader.read(table_name=self.source_table, columns=columns)
+        else:
+            columns_str = ', '.join(columns)
+            sql = f"SELECT {columns_str} FROM {self.source_table}"
+            df = self.obj_db.query_from_sql(sql=sql)
         print(f"  Loaded {df.shape[0]} rows, {df.shape[1]} columns")
 
         return df
@@ -167,7 +186,7 @@ class SummaryConfigProcessor:
     def _merge_with_anchor_dates(
         self,
         df_data: pd.DataFrame,
-        df_anchor: pd.DataFrame
+        df_anchor: AnchorDateIndex
     ) -> pd.DataFrame:
         """
         Merge data with anchor dates for deidentification.
@@ -176,8 +195,8 @@ class SummaryConfigProcessor:
         ----------
         df_data : pd.DataFrame
             Source data
-        df_anchor : pd.DataFrame
-            Anchor dates with MRN, DMP_ID, DATE_TUMOR_SEQUENCING
+        df_anchor : AnchorDateIndex
+            Anchor dates with MRN, DMP_ID, DATE_TUMOR_SEQUENCING (MRN already zero-padded)
 
         Returns
         -------
@@ -188,11 +207,10 @@ class SummaryConfigProcessor:
 
         key_column = self.config['key_column']
 
-        # Handle MRN key - zero pad and merge
+        # Handle MRN key - zero pad and merge (anchor MRNs are padded once by AnchorDateIndex)
         if key_column == 'MRN':
             df_data = mrn_zero_pad(df=df_data, col_mrn='MRN')
-            df_anchor = mrn_zero_pad(df=df_anchor, col_mrn='MRN')
-            df_merged = df_anchor.merge(right=df_data, how='inner', on='MRN')
+            df_merged = df_anchor.join_on_mrn(df_data)
             df_merged = df_merged.drop(columns=['MRN'])
         elif (key_column == 'SAMPLE_ID') or (key_column == 'DMP_ID') or (key_column == 'PATIENT_ID'):
             # For SAMPLE_ID
@@ -209,7 +227,7 @@ class SummaryConfigProcessor:
     def _convert_dates_to_intervals(
         self,
         df_data: pd.DataFrame,
-        df_anchor: pd.DataFrame
+        df_anchor: AnchorDateIndex
     ) -> pd.DataFrame:
         """
         Convert date columns to intervals (days from anchor date).
@@ -218,8 +236,8 @@ class SummaryConfigProcessor:
         ----------
         df_data : pd.DataFrame
             Data with date columns
-        df_anchor : pd.DataFrame
-            Anchor dates dataframe
+        df_anchor : AnchorDateIndex
+            Anchor dates
 
         Returns
         -------
@@ -256,7 +274,8 @@ class SummaryConfigProcessor:
     def _merge_with_template(
         self,
         df_data: pd.DataFrame,
-        df_template: pd.DataFrame
+        df_template: pd.DataFrame,
+        codec: Optional[IdCodec] = None
     ) -> pd.DataFrame:
         """
         Merge with template to ensure all patients/samples are included.
@@ -267,6 +286,9 @@ class SummaryConfigProcessor:
             Processed data
         df_template : pd.DataFrame
             Template with all PATIENT_ID or SAMPLE_ID values
+        codec : IdCodec, optional
+            ID codec of the run. Template codes are reused instead of hashing the
+            template IDs again (same result as DataFrame.merge).
 
         Returns
         -------
@@ -317,11 +339,14 @@ class SummaryConfigProcessor:
         print(f"  Template shape: {df_template.shape}")
         print(f"  Data shape: {df_data.shape}")
 
-        df_merged = df_template.merge(
-            right=df_data,
-            how='left',
-            on=id_column_template
-        )
+        if codec is not None:
+            df_merged = codec.left_join(df_template, df_data, on=id_column_template)
+        else:
+            df_merged = df_template.merge(
+                right=df_data,
+                how='left',
+                on=id_column_template
+            )
 
         # Rename to standard cBioPortal column names if needed
         standard_id_column = 'PATIENT_ID' if patient_or_sample == 'patient' else 'SAMPLE_ID'
@@ -373,7 +398,8 @@ class SummaryConfigProcessor:
     def save_intermediate(
         self,
         df_data: pd.DataFrame,
-        save_to_table: bool = False
+        save_to_table: bool = False,
+        intermediate_format: str = 'tsv'
     ) -> str:
         """
         Save the intermediate file to Databricks volume.
@@ -385,12 +411,28 @@ class SummaryConfigProcessor:
             Data dataframe with column names
         save_to_table : bool, optional
             Whether to also save to a Databricks table
+        intermediate_format : str, optional
+            'tsv' for a volume TSV, or 'parquet' for a local Parquet file
+            (see lib.utils.intermediate_io). Tables are always backed by a volume
+            TSV, so save_to_table requires 'tsv'.
 
         Returns
         -------
         str
             Path where the file was saved
         """
+        if intermediate_format != 'tsv':
+            if save_to_table:
+                raise ValueError("save_to_table requires the 'tsv' intermediate format")
+            path = intermediate_io.write_intermediate(
+                df=df_data,
+                volume_path=self.volume_path,
+                obj_db=self.obj_db,
+                intermediate_format=intermediate_format
+            )
+            print(f"✓ Saved: {path}")
+            return path
+
         print(f"Saving intermediate file: {self.volume_path}")
 
         # Prepare table info if needed
@@ -0,0 +1,263 @@
+"""
+summary_fingerprint.py
+
+Fingerprints for incremental rebuilds of summary intermediates.
+
+A summary's intermediate only changes when one of its inputs changes. The
+fingerprint of a summary combines:
+- the SHA-256 of its YAML config
+- the Delta version of its source table
+- the Delta version of the anchor dates table
+- a hash of the template IDs the summary is merged onto
+- the run settings that affect the output (level, production/test, cohort,
+  intermediate format)
+
+Fingerprints are stored in a CSV next to the manifest. In incremental mode a
+config whose fingerprint matches the previous run (and whose intermediate still
+exists) is not re-queried; its previous intermediate_data_path is reused in the
+manifest. If a table version cannot be determined the summary is always rebuilt.
+
+Changes to the processing code itself are not part of the fingerprint: run
+without incremental mode after such changes to rebuild everything.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from msk_cdm.databricks import DatabricksAPI
+from ..utils import table_cache, intermediate_io
+
+
+FINGERPRINT_COLUMNS = [
+    'summary_id',
+    'fingerprint',
+    'intermediate_data_path',
+    'yaml_sha256',
+    'source_table',
+    'source_table_version',
+    'anchor_table_version',
+    'template_sha256',
+    'intermediate_format'
+]
+# Record fields that go into the fingerprint (in addition to the run settings)
+FINGERPRINT_INPUTS = FINGERPRINT_COLUMNS[3:]
+
+
+def hash_file(fname: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """Return a SHA-256 hex digest of a DataFrame's column names and values (row order included)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def fingerprints_path(output_manifest: str) -> str:
+    """Return the fingerprint CSV path stored next to a manifest."""
+    root, _ = os.path.splitext(output_manifest)
+    return f"{root}_fingerprints.csv"
+
+
+def load_fingerprints(obj_db: DatabricksAPI, path: str) -> Dict[str, Dict]:
+    """
+    Load the fingerprints of a previous run.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    path : str
+        Databricks volume path of the fingerprint CSV
+
+    Returns
+    -------
+    Dict[str, Dict]
+        Fingerprint records keyed by summary_id. Empty if there is no previous run.
+    """
+    try:
+        df = obj_db.read_db_obj(volume_path=path, sep=',')
+    except Exception as e:
+        print(f"No previous fingerprints at {path} ({str(e)}), rebuilding all summaries")
+        return {}
+
+    missing_columns = [col for col in FINGERPRINT_COLUMNS if col not in df.columns]
+    if missing_columns:
+        print(f"Fingerprint file {path} is missing columns {missing_columns}, rebuilding all summaries")
+        return {}
+
+    df = df[FINGERPRINT_COLUMNS].astype(str)
+    print(f"Loaded {df.shape[0]} fingerprints from {path}")
+
+    return {record['summary_id']: record for record in df.to_dict(orient='records')}
+
+
+def save_fingerprints(obj_db: DatabricksAPI, path: str, records: List[Dict]):
+    """
+    Save fingerprint records to a CSV on a Databricks volume.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    path : str
+        Databricks volume path of the fingerprint CSV
+    records : List[Dict]
+        Fingerprint records (see FINGERPRINT_COLUMNS)
+    """
+    df = pd.DataFrame(records, columns=FINGERPRINT_COLUMNS)
+
+    print(f"Saving {df.shape[0]} fingerprints to: {path}")
+    obj_db.write_db_obj(
+        df=df,
+        volume_path=path,
+        sep=',',
+        overwrite=True,
+        dict_database_table_info=None
+    )
+
+
+class FingerprintContext:
+    """
+    Computes summary fingerprints for one run and compares them with the previous run.
+
+    Table versions are looked up once per table and shared between threads.
+    """
+
+    def __init__(
+        self,
+        obj_db: DatabricksAPI,
+        anchor_table: str,
+        df_template: pd.DataFrame,
+        patient_or_sample: str,
+        production_or_test: str,
+        cohort: str,
+        intermediate_format: str,
+        previous: Optional[Dict[str, Dict]] = None
+    ):
+        """
+        Parameters
+        ----------
+        obj_db : DatabricksAPI
+            Databricks API object used for table version lookups
+        anchor_table : str
+            Anchor dates table name
+        df_template : pd.DataFrame
+            Template IDs the summaries are merged onto
+        patient_or_sample : str
+            'patient' or 'sample'
+        production_or_test : str
+            'production' or 'test'
+        cohort : str
+            Cohort name
+        intermediate_format : str
+            'parquet' or 'tsv'
+        previous : Dict[str, Dict], optional
+            Fingerprint records of the previous run keyed by summary_id (see load_fingerprints)
+        """
+        self.obj_db = obj_db
+        self.previous = previous if previous is not None else {}
+        self.intermediate_format = intermediate_format
+        self.settings = {
+            'patient_or_sample': patient_or_sample,
+            'production_or_test': production_or_test,
+            'cohort': cohort,
+            'intermediate_format': intermediate_format
+        }
+        self._versions = {}
+        self._lock = threading.Lock()
+
+        self.anchor_table_version = self.get_table_version(anchor_table)
+        self.template_sha256 = hash_frame(df_template)
+
+    def get_table_version(self, table_name: str) -> Optional[str]:
+        """Return the table version token, looking each table up once."""
+        with self._lock:
+            if table_name in self._versions:
+                return self._versions[table_name]
+
+        version = table_cache.get_table_version(obj_db=self.obj_db, table_name=table_name)
+        with self._lock:
+            self._versions[table_name] = version
+
+        return version
+
+    def fingerprint(self, fname_yaml_config: str, summary_id: str, source_table: str) -> Dict:
+        """
+        Compute the fingerprint record of a summary.
+
+        Parameters
+        ----------
+        fname_yaml_config : str
+            Path to the summary's YAML config
+        summary_id : str
+            Summary identifier
+        source_table : str
+            Source table the summary is queried from
+
+        Returns
+        -------
+        Dict
+            Fingerprint record. 'fingerprint' is None if a table version is unknown.
+            'intermediate_data_path' is filled in once the intermediate is written.
+        """
+        record = {
+            'summary_id': summary_id,
+            'fingerprint': None,
+            'intermediate_data_path': None,
+            'yaml_sha256': hash_file(fname_yaml_config),
+            'source_table': source_table,
+            'source_table_version': self.get_table_version(source_table),
+            'anchor_table_version': self.anchor_table_version,
+            'template_sha256': self.template_sha256,
+            'intermediate_format': self.intermediate_format
+        }
+
+        if record['source_table_version'] is not None and record['anchor_table_version'] is not None:
+            components = {key: record[key] for key in FINGERPRINT_INPUTS}
+            components.update(self.settings)
+            record['fingerprint'] = hashlib.sha256(
+                json.dumps(components, sort_keys=True).encode('utf-8')
+            ).hexdigest()
+
+        return record
+
+    def previous_intermediate(self, record: Dict) -> Optional[str]:
+        """
+        Return the previous intermediate path if the summary is unchanged since the last run.
+
+        Parameters
+        ----------
+        record : Dict
+            Fingerprint record from fingerprint()
+
+        Returns
+        -------
+        Optional[str]
+            Path of the reusable intermediate, or None if the summary must be rebuilt
+        """
+        previous = self.previous.get(record['summary_id'])
+        if record['fingerprint'] is None or previous is None:
+            return None
+        if previous['fingerprint'] != record['fingerprint']:
+            return None
+
+        path = previous['intermediate_data_path']
+        # Parquet intermediates are local, so they are missing on another machine
+        if intermediate_io.is_parquet_path(path) and not os.path.exists(path):
+            return None
+
+        return path
@@ -16,6 +16,10 @@ import numpy as np
 from typing import List, Tuple, Dict
 
 from msk_cdm.databricks import DatabricksAPI
+from .aligned_merge import left_merge_all
+from .final_file_writer import write_final_file, DEFAULT_CHUNK_SIZE
+from ..utils import intermediate_io
+from ..utils.dtype_policy import as_text
 
 
 NROWS_HEADER = 4
@@ -94,8 +98,8 @@ class SummaryMerger:
         else:
             df_template = self.obj_db.read_db_obj(volume_path=self.fname_template, sep='\t')
 
-        # Ensure data is string type
-        df_template = df_template.astype(str)
+        # Text columns, with missing values as astype(str) writes them (see lib.utils.dtype_policy)
+        df_template = as_text(df_template, missing_as_text=True)
 
         # Extract only the ID column
         if self.id_column in df_template.columns:
@@ -169,7 +173,8 @@ class SummaryMerger:
         Parameters
         ----------
         fname_intermediate : str
-            Path to intermediate file (data only, no headers)
+            Path to intermediate file (data only, no headers): a volume TSV or a
+            local Parquet file from lib.utils.intermediate_io
         config : Dict
             YAML configuration dictionary for this summary
 
@@ -181,10 +186,10 @@ class SummaryMerger:
         print(f"Loading intermediate file: {fname_intermediate}")
 
         # Load data (no headers in intermediate files)
-        df_data = self.obj_db.read_db_obj(volume_path=fname_intermediate, sep='\t')
+        df_data = intermediate_io.read_intermediate(path=fname_intermediate, obj_db=self.obj_db)
 
-        # Ensure data is string type
-        df_data = df_data.astype(str)
+        # Text columns, with missing values as astype(str) writes them (see lib.utils.dtype_policy)
+        df_data = as_text(df_data, missing_as_text=True)
 
         print(f"  Loaded: {df_data.shape[0]} rows, {df_data.shape[1]} columns")
 
@@ -249,10 +254,63 @@ class SummaryMerger:
 
         print(f"  Merged summary now has {self.df_merged_data.shape[1]} columns")
 
+    def merge_intermediates_aligned(self, list_loaded: List[Tuple[pd.DataFrame, pd.DataFrame]]):
+        """
+        Merge several intermediate files into the accumulated merged data in one pass.
+
+        Same result as calling merge_intermediate() for each file in order: a column
+        that is already present is replaced by the later file's column (and header).
+        The data is joined with a single aligned concat instead of one merge per file
+        (see aligned_merge.left_merge_all).
+
+        Parameters
+        ----------
+        list_loaded : List[Tuple[pd.DataFrame, pd.DataFrame]]
+            (header_df, data_df) per intermediate file, in merge order
+        """
+        # Files with only the ID column add nothing
+        list_loaded = [
+            (df_header, df_data) for df_header, df_data in list_loaded
+            if any(col != self.id_column for col in df_data.columns)
+        ]
+        if not list_loaded:
+            print("  No new columns to add (only ID column present)")
+            return
+
+        print(f"Merging {len(list_loaded)} intermediate file(s) into accumulated summary")
+
+        self.df_merged_data = left_merge_all(
+            df_template=self.df_merged_data,
+            list_df=[df_data for _, df_data in list_loaded],
+            merge_key=self.id_column,
+            replace_duplicates=True
+        )
+
+        # Drop header columns whose data column is replaced by a later file
+        list_headers = []
+        cols_later = set()
+        for df_header, df_data in reversed(list_loaded):
+            if df_header.shape[1] > 0:
+                logic_keep = ~df_header.iloc[ROW_HEADING, :].isin(cols_later).to_numpy()
+                df_header = df_header.loc[:, logic_keep]
+            list_headers.append(df_header)
+            cols_later.update(col for col in df_data.columns if col != self.id_column)
+
+        logic_keep = ~self.df_merged_header.iloc[ROW_HEADING, :].isin(cols_later).to_numpy()
+        self.df_merged_header = pd.concat(
+            [self.df_merged_header.loc[:, logic_keep]] + list_headers[::-1],
+            axis=1,
+            sort=False
+        )
+
+        print(f"  Merged summary now has {self.df_merged_data.shape[1]} columns")
+
     def merge_all_intermediates(self, processed_summaries: List[Dict]):
         """
         Merge all intermediate files in order.
 
+        All files are loaded first and then merged in a single pass.
+
         Parameters
         ----------
         processed_summaries : List[Dict]
@@ -266,8 +324,9 @@ class SummaryMerger:
         print(f"Merging {len(processed_summaries)} intermediate files")
         print(f"{'='*80}\n")
 
-        merged_count = 0
+        loaded_count = 0
         skipped_count = 0
+        list_loaded = []
 
         for idx, summary_info in enumerate(processed_summaries, 1):
             summary_id = summary_info['summary_id']
@@ -278,20 +337,21 @@ class SummaryMerger:
             print(f"  File: {fname}")
 
             try:
-                df_header, df_data = self.load_intermediate_file(fname, config)
-                self.merge_intermediate(df_header, df_data)
-                merged_count += 1
-                print(f"  ✓ Merged successfully")
+                list_loaded.append(self.load_intermediate_file(fname, config))
+                loaded_count += 1
+                print(f"  ✓ Loaded successfully")
             except Exception as e:
-                print(f"  ✗ ERROR: Failed to load or merge file: {str(e)}")
+                print(f"  ✗ ERROR: Failed to load file: {str(e)}")
                 skipped_count += 1
 
             print()
 
+        self.merge_intermediates_aligned(list_loaded)
+
         print(f"{'='*80}")
         print(f"MERGE SUMMARY")
         print(f"{'='*80}")
-        print(f"Successfully merged: {merged_count}")
+        print(f"Successfully merged: {loaded_count}")
         print(f"Skipped: {skipped_count}")
         print(f"Final shape: {self.df_merged_data.shape}")
         print(f"{'='*80}")
@@ -385,6 +445,55 @@ class SummaryMerger:
 
         print(f"✓ Saved: {fname_output}")
 
+    def write_final_summary(
+        self,
+        fname_output: str = None,
+        fname_local: str = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> int:
+        """
+        Write the final summary without creating it in memory first.
+
+        Writes the same files as create_final_summary() followed by
+        save_final_summary() (without a table) and/or to_csv(header=False) of the
+        final summary, but streams the header rows and the data in chunks instead
+        of stacking them into one object DataFrame (see final_file_writer).
+
+        Parameters
+        ----------
+        fname_output : str, optional
+            Databricks volume path for the final summary file
+        fname_local : str, optional
+            Local filesystem path for the final summary file (no column-name line)
+        chunk_size : int, optional
+            Data rows formatted at a time
+
+        Returns
+        -------
+        int
+            Number of data rows written
+        """
+        print(f"Writing final summary: {fname_output or ''} {fname_local or ''}".rstrip())
+
+        # Same sequential column names as create_final_summary()
+        col_name_new = list(range(self.df_merged_header.shape[1]))
+        df_header = self.df_merged_header.set_axis(col_name_new, axis=1)
+        df_data = self.df_merged_data.set_axis(col_name_new, axis=1)
+
+        n_rows = write_final_file(
+            df_header_wide=df_header,
+            data=df_data,
+            output_local_path=fname_local,
+            output_volume_path=fname_output,
+            obj_db=self.obj_db,
+            column_names=col_name_new,
+            chunk_size=chunk_size
+        )
+
+        print(f"✓ Final summary written: {df_header.shape[0] + n_rows} rows × {len(col_name_new)} columns")
+
+        return n_rows
+
     def get_merged_summary(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
         Get the current merged header and data (before final combination).
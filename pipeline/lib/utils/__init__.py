@@ -3,11 +3,31 @@ from .age_at_sequencing import compute_age_at_sequencing
 from .sequencing_date import date_of_sequencing
 from .constants import constants
 from .cbioportal_update_config import CbioportalUpdateConfig as cbioportal_update_config
+from . import table_cache
+from . import cohort_filter
+from . import timeline_deid_sql
+from . import date_parsing
+from . import intermediate_io
+from .anchor_date_index import AnchorDateIndex
+from .pathology_snapshot import PathologySnapshot
+from .vital_status import load_vital_status
+from .id_codec import IdCodec
+from . import dtype_policy
 
 __all__ = [
     "get_anchor_dates",
     "compute_age_at_sequencing",
     "date_of_sequencing",
     "constants",
-    "cbioportal_update_config"
+    "cbioportal_update_config",
+    "table_cache",
+    "cohort_filter",
+    "timeline_deid_sql",
+    "date_parsing",
+    "intermediate_io",
+    "AnchorDateIndex",
+    "PathologySnapshot",
+    "load_vital_status",
+    "IdCodec",
+    "dtype_policy"
 ]
@@ -13,8 +13,10 @@ from datetime import date
 import pandas as pd
 
 from msk_cdm.databricks import DatabricksAPI
-from msk_cdm.data_processing import mrn_zero_pad
 from .get_anchor_dates import get_anchor_dates
+from .pathology_snapshot import PathologySnapshot
+from .date_parsing import parse_dates
+from .vital_status import load_vital_status
 
 AGE_CONVERSION_FACTOR = 365.2422
 
@@ -26,7 +28,9 @@ def compute_age_at_sequencing(
         volume_path_save_age_at_seq,
         table_save_age_at_seq=None,
         catalog=None,
-        schema=None
+        schema=None,
+        snapshot=None,
+        df_anchor_dates=None
 ):
     """
 
@@ -37,6 +41,8 @@ def compute_age_at_sequencing(
     :param table_save_age_at_seq: Optional table name to create from the data
     :param catalog: Optional catalog name for table creation
     :param schema: Optional schema name for table creation
+    :param snapshot: Optional PathologySnapshot of table_samples, loaded once if not given
+    :param df_anchor_dates: Optional anchor dates from get_anchor_dates on the same snapshot
     :return: df_f: dataframe with age at sequencing
     """
     today = date.today()
@@ -45,39 +51,26 @@ def compute_age_at_sequencing(
     ## Create Databricks object
     obj_db = DatabricksAPI(fname_databricks_env=databricks_env)
 
-    ## Load demographics for date of birth
-    col_keep_demo = ['MRN', 'PT_BIRTH_DTE', 'PT_DEATH_DTE', 'PLA_LAST_CONTACT_DTE']
-    cols_str_demo = ', '.join(col_keep_demo)
-    sql_demo = f"SELECT {cols_str_demo} FROM {table_demo}"
-    df_demo = obj_db.query_from_sql(sql=sql_demo)
-    df_demo = mrn_zero_pad(df=df_demo, col_mrn='MRN')
+    ## Load demographics dates (vital status table, shared with the other scripts of a run)
+    col_keep_demo = ['MRN', 'PT_BIRTH_DTE', 'PT_DEATH_DTE', 'PLA_LAST_CONTACT_DTE', 'PLA_LAST_CONTACT_MISSING']
+    df_demo = load_vital_status(obj_db=obj_db, table_demo=table_demo)[col_keep_demo]
 
-    # Convert date columns to datetime with timezone handling
-    df_demo['PT_BIRTH_DTE'] = pd.to_datetime(df_demo['PT_BIRTH_DTE'], errors='coerce')
-    if isinstance(df_demo['PT_BIRTH_DTE'].dtype, pd.DatetimeTZDtype):
-        df_demo['PT_BIRTH_DTE'] = df_demo['PT_BIRTH_DTE'].dt.tz_localize(None)
-
-    df_demo['PT_DEATH_DTE'] = pd.to_datetime(df_demo['PT_DEATH_DTE'], errors='coerce')
-    if isinstance(df_demo['PT_DEATH_DTE'].dtype, pd.DatetimeTZDtype):
-        df_demo['PT_DEATH_DTE'] = df_demo['PT_DEATH_DTE'].dt.tz_localize(None)
-
-    df_demo['PLA_LAST_CONTACT_DTE'] = df_demo['PLA_LAST_CONTACT_DTE'].fillna(today)
-    df_demo['PLA_LAST_CONTACT_DTE'] = pd.to_datetime(df_demo['PLA_LAST_CONTACT_DTE'], errors='coerce')
-    if isinstance(df_demo['PLA_LAST_CONTACT_DTE'].dtype, pd.DatetimeTZDtype):
-        df_demo['PLA_LAST_CONTACT_DTE'] = df_demo['PLA_LAST_CONTACT_DTE'].dt.tz_localize(None)
+    # Missing last contact dates default to today; unparseable ones stay NaT
+    logic_no_contact = df_demo['PLA_LAST_CONTACT_MISSING']
+    df_demo.loc[logic_no_contact, 'PLA_LAST_CONTACT_DTE'] = pd.Timestamp(today)
+    df_demo = df_demo.drop(columns='PLA_LAST_CONTACT_MISSING')
 
     df_demo['OS_DTE'] = df_demo['PT_DEATH_DTE'].fillna(df_demo['PLA_LAST_CONTACT_DTE'])
 
-    ## Load pathology report table
-    col_keep_samples = ['MRN', 'DATE_TUMOR_SEQUENCING', 'DMP_ID', 'SAMPLE_ID']
-    cols_str_samples = ', '.join(col_keep_samples)
-    sql_samples = f"SELECT {cols_str_samples} FROM {table_samples}"
-    df_path1 = obj_db.query_from_sql(sql=sql_samples)
-    df_path = df_path1.dropna()
-    df_path = mrn_zero_pad(df=df_path, col_mrn='MRN')
+    ## Load pathology report table (once, shared with the anchor dates)
+    if snapshot is None:
+        snapshot = PathologySnapshot(obj_db=obj_db, table_pathology=table_samples)
+    df_path = snapshot.samples()
 
     ## Load anchor dates
-    df_archor_dates = get_anchor_dates(databricks_env, table_pathology=table_samples)
+    df_archor_dates = df_anchor_dates
+    if df_archor_dates is None:
+        df_archor_dates = get_anchor_dates(databricks_env, table_pathology=table_samples, snapshot=snapshot)
     list_sample_ids_used = list(set(df_archor_dates['DMP_ID']))
 
     # Clean and Combine data
@@ -85,9 +78,7 @@ def compute_age_at_sequencing(
     df_path_clean = df_path_clean[df_path_clean['SAMPLE_ID'].str.contains('-T')].copy()
     df_path_clean['DMP_ID_DERIVED'] = df_path_clean['SAMPLE_ID'].apply(lambda x: x[:9])
     df_path_clean = df_path_clean[df_path_clean['DMP_ID_DERIVED'] == df_path_clean['DMP_ID']].copy()
-    df_path_clean['DATE_TUMOR_SEQUENCING'] = pd.to_datetime(df_path_clean['DATE_TUMOR_SEQUENCING'], errors='coerce')
-    if isinstance(df_path_clean['DATE_TUMOR_SEQUENCING'].dtype, pd.DatetimeTZDtype):
-        df_path_clean['DATE_TUMOR_SEQUENCING'] = df_path_clean['DATE_TUMOR_SEQUENCING'].dt.tz_localize(None)
+    df_path_clean['DATE_TUMOR_SEQUENCING'] = parse_dates(df_path_clean['DATE_TUMOR_SEQUENCING'])
 
     ## Merge dataframes
     df_f = df_path_clean.merge(right=df_demo, how='left', on=['MRN'])
@@ -0,0 +1,172 @@
+"""
+anchor_date_index.py
+
+Anchor dates (MRN, DMP_ID, DATE_TUMOR_SEQUENCING) loaded once per run and shared
+by every summary and timeline.
+
+Summary processors used to zero-pad the MRNs of the full anchor table again for
+every MRN-keyed config, and every summary/timeline merge rebuilt a hash table of
+the anchor keys. AnchorDateIndex normalizes the frame once (zero-padded MRN,
+datetime anchor date) and builds the MRN and DMP_ID indexes once. Joins then only
+look up the other frame's keys (Index.get_indexer) and take the matching rows.
+
+The joins return the same rows, row order, columns and dtypes as the
+DataFrame.merge calls they replace. If a key is not unique or has missing values
+in the anchor table, or the frames share non-key column names, they fall back to
+DataFrame.merge.
+
+The index is read-only and can be shared between threads and forked processes.
+"""
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from msk_cdm.data_processing import mrn_zero_pad
+from .date_parsing import parse_dates
+
+COL_MRN = 'MRN'
+COL_DMP_ID = 'DMP_ID'
+COL_ANCHOR_DATE = 'DATE_TUMOR_SEQUENCING'
+
+
+def _build_index(values: pd.Series) -> Optional[pd.Index]:
+    """Return a lookup index on a key column, or None if the keys are not unique and non-null."""
+    index = pd.Index(values)
+    if index.hasnans or not index.is_unique:
+        return None
+
+    return index
+
+
+class AnchorDateIndex:
+    """
+    Normalized anchor dates with prebuilt MRN and DMP_ID indexes.
+
+    Attributes
+    ----------
+    df : pd.DataFrame
+        Normalized anchor dates (RangeIndex). Treat as read-only.
+    """
+
+    def __init__(self, df_anchor: pd.DataFrame, normalized: bool = False):
+        """
+        Parameters
+        ----------
+        df_anchor : pd.DataFrame
+            Anchor dates with MRN, DMP_ID and DATE_TUMOR_SEQUENCING columns
+        normalized : bool, optional
+            True if MRNs are already zero-padded and the anchor date is already
+            parsed (e.g. by a loader), to skip normalizing again
+        """
+        df = df_anchor.reset_index(drop=True)
+        if not normalized:
+            df = df.copy()
+            if COL_MRN in df.columns:
+                df = mrn_zero_pad(df=df, col_mrn=COL_MRN)
+            if COL_ANCHOR_DATE in df.columns and not pd.api.types.is_datetime64_any_dtype(df[COL_ANCHOR_DATE]):
+                df[COL_ANCHOR_DATE] = parse_dates(df[COL_ANCHOR_DATE])
+
+        self.df = df
+        self._index_mrn = _build_index(df[COL_MRN]) if COL_MRN in df.columns else None
+        self._index_dmp_id = _build_index(df[COL_DMP_ID]) if COL_DMP_ID in df.columns else None
+
+    @classmethod
+    def from_frame(cls, df_anchor: Union['AnchorDateIndex', pd.DataFrame]) -> 'AnchorDateIndex':
+        """Return df_anchor if it already is an AnchorDateIndex, otherwise index it."""
+        if isinstance(df_anchor, cls):
+            return df_anchor
+
+        return cls(df_anchor)
+
+    @staticmethod
+    def frame_of(df_anchor: Union['AnchorDateIndex', pd.DataFrame]) -> pd.DataFrame:
+        """Return the anchor dates DataFrame of an AnchorDateIndex or DataFrame."""
+        if isinstance(df_anchor, AnchorDateIndex):
+            return df_anchor.df
+
+        return df_anchor
+
+    @property
+    def shape(self):
+        return self.df.shape
+
+    def _can_join(self, index: Optional[pd.Index], df: pd.DataFrame, key: str, col_anchor: str) -> bool:
+        """Check whether an index lookup gives the same result as DataFrame.merge."""
+        if index is None or key not in df.columns:
+            return False
+        if df[key].dtype != self.df[col_anchor].dtype:
+            return False
+        # Shared non-key columns would get merge suffixes
+        cols_anchor = set(self.df.columns) - {col_anchor}
+        cols_other = set(df.columns) - {key}
+
+        return not (cols_anchor & cols_other) and (col_anchor == key or col_anchor not in cols_other)
+
+    def join_on_mrn(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Inner join of the anchor dates with a frame on zero-padded MRN.
+
+        Same result as df_anchor.merge(right=df, how='inner', on='MRN'): anchor
+        columns first, rows in anchor order, and each anchor row's matches in the
+        order they appear in df.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Frame with a zero-padded MRN column
+
+        Returns
+        -------
+        pd.DataFrame
+            Joined frame with a RangeIndex
+        """
+        if not self._can_join(self._index_mrn, df=df, key=COL_MRN, col_anchor=COL_MRN):
+            return self.df.merge(right=df, how='inner', on=COL_MRN)
+
+        positions = self._index_mrn.get_indexer(df[COL_MRN])
+        rows_df = np.flatnonzero(positions >= 0)
+        # Stable sort on the anchor position keeps df's order within each anchor row
+        order = np.argsort(positions[rows_df], kind='stable')
+        rows_df = rows_df[order]
+        rows_anchor = positions[rows_df]
+
+        df_part_anchor = self.df.take(rows_anchor).reset_index(drop=True)
+        df_part_other = df.drop(columns=[COL_MRN]).take(rows_df).reset_index(drop=True)
+
+        return pd.concat([df_part_anchor, df_part_other], axis=1)
+
+    def join_on_dmp_id(self, df: pd.DataFrame, left_on: str = 'PATIENT_ID', return_rows: bool = False):
+        """
+        Left join of a frame with the anchor dates on DMP_ID.
+
+        Same result as df.merge(right=df_anchor, how='left', left_on=left_on,
+        right_on='DMP_ID'): df's rows and columns first, then the anchor columns
+        (missing for patients without anchor dates).
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Frame with a patient ID column
+        left_on : str, optional
+            Patient ID column of df
+        return_rows : bool, optional
+            Also return the anchor row position of each output row (-1 for
+            patients without anchor dates). Output rows are df's rows in order.
+            None if the join fell back to DataFrame.merge, which can repeat rows.
+
+        Returns
+        -------
+        pd.DataFrame or Tuple[pd.DataFrame, Optional[np.ndarray]]
+            Joined frame with a RangeIndex, and the anchor row positions if return_rows
+        """
+        if left_on == COL_DMP_ID or not self._can_join(self._index_dmp_id, df=df, key=left_on, col_anchor=COL_DMP_ID):
+            df_joined = df.merge(right=self.df, how='left', left_on=left_on, right_on=COL_DMP_ID)
+            return (df_joined, None) if return_rows else df_joined
+
+        positions = self._index_dmp_id.get_indexer(df[left_on])
+        # Reindexing by position gives missing values (with merge's upcasts) for -1
+        df_part_anchor = self.df.reindex(positions).reset_index(drop=True)
+        df_joined = pd.concat([df.reset_index(drop=True), df_part_anchor], axis=1)
+
+        return (df_joined, positions) if return_rows else df_joined
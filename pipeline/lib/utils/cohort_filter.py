@@ -0,0 +1,354 @@
+"""
+cohort_filter.py
+
+Push cohort filtering down into Databricks queries.
+
+Timeline tables cover all patients, but each cohort (mskimpact, mskaccess, ...)
+only keeps rows for the patients in its sample list. These helpers resolve the
+cohort's MRNs from the anchor dates table and restrict source-table reads to them,
+either with chunked IN lists or by joining against a staged lookup table.
+build_partition_where() splits a table into MRN-hash partitions for reads that
+must stay within memory.
+
+Cohort filters compare the raw MRN column, with no cast or padding, against every
+spelling mrn_zero_pad() maps to a cohort MRN (see mrn_spellings), so Databricks can
+use the column for file skipping. Joins and partition hashes use the zero-padded
+MRN of mrn_sql_expr().
+"""
+import pandas as pd
+
+from msk_cdm.data_processing import mrn_zero_pad
+from .table_cache import query_table
+from .anchor_date_index import AnchorDateIndex
+
+COL_MRN = 'MRN'
+COLS_COHORT_TABLE = [COL_MRN]
+COLS_SAMPLE_TABLE = ['PATIENT_ID', 'SAMPLE_ID']
+COHORT_FILTER_MODES = ['none', 'in_list', 'staged']
+IN_LIST_CHUNK_SIZE = 5000
+
+
+def mrn_sql_expr(col_mrn=COL_MRN):
+    """
+    Return a SQL expression for a zero-padded MRN, equivalent to mrn_zero_pad().
+
+    Parameters
+    ----------
+    col_mrn : str
+        MRN column (optionally qualified with a table alias)
+
+    Returns
+    -------
+    str
+        SQL expression
+    """
+    mrn_str = f"CAST({col_mrn} AS STRING)"
+    # LPAD truncates longer values, zfill does not
+    return f"CASE WHEN LENGTH({mrn_str}) >= 8 THEN {mrn_str} ELSE LPAD({mrn_str}, 8, '0') END"
+
+
+def mrn_spellings(list_mrns):
+    """
+    Return every MRN spelling that mrn_zero_pad() maps to the given MRNs.
+
+    Source tables store MRNs with or without leading zeros, so each zero-padded
+    MRN is listed as is and with each of its leading zeros removed
+    (e.g. '00104729', '0104729' and '104729').
+
+    Parameters
+    ----------
+    list_mrns : list of str
+        Zero-padded MRNs
+
+    Returns
+    -------
+    list of str
+        MRN spellings, grouped by MRN
+    """
+    list_spellings = []
+    for mrn in list_mrns:
+        mrn = str(mrn)
+        n_zeros = len(mrn) - len(mrn.lstrip('0'))
+        # Keep at least one character of an all-zero MRN
+        list_spellings += [mrn[i:] for i in range(min(n_zeros, len(mrn) - 1) + 1)]
+
+    return list_spellings
+
+
+def get_cohort_mrns(df_anchor, df_samples_used):
+    """
+    Return the zero-padded MRNs of the patients in a cohort sample list.
+
+    Parameters
+    ----------
+    df_anchor : AnchorDateIndex or pd.DataFrame
+        Anchor dates with MRN and DMP_ID columns
+    df_samples_used : pd.DataFrame
+        Sample list with a PATIENT_ID column
+
+    Returns
+    -------
+    list of str
+        Sorted, unique MRNs
+    """
+    df_anchor = AnchorDateIndex.frame_of(df_anchor)
+    list_dmp_ids = df_samples_used['PATIENT_ID'].drop_duplicates()
+    df_cohort = df_anchor.loc[df_anchor['DMP_ID'].isin(list_dmp_ids), [COL_MRN]].dropna()
+    df_cohort = mrn_zero_pad(df=df_cohort, col_mrn=COL_MRN)
+
+    return sorted(df_cohort[COL_MRN].astype(str).unique())
+
+
+def build_in_list_where(list_mrns, col_mrn=COL_MRN):
+    """
+    Build a WHERE clause restricting a query to a list of MRNs.
+
+    The raw MRN column is compared against all spellings of the MRNs (see
+    mrn_spellings), so the filter needs no per-row transform.
+
+    Parameters
+    ----------
+    list_mrns : list of str
+        Zero-padded MRNs
+    col_mrn : str
+        MRN column in the source table
+
+    Returns
+    -------
+    str
+        SQL filter expression
+    """
+    # MRNs are digit strings, but quote-escape anyway so the clause is always valid SQL
+    values = ', '.join("'" + mrn.replace("'", "''") + "'" for mrn in mrn_spellings(list_mrns))
+    return f"{col_mrn} IN ({values})"
+
+
+def build_staged_where(cohort_table, col_mrn=COL_MRN):
+    """
+    Build a WHERE clause restricting a query to the MRNs in a staged cohort table.
+
+    The staged table holds every spelling of the cohort MRNs, so the raw MRN
+    column is compared as is.
+
+    Parameters
+    ----------
+    cohort_table : str
+        Full table name of the staged cohort table (see stage_cohort_table)
+    col_mrn : str
+        MRN column in the source table
+
+    Returns
+    -------
+    str
+        SQL filter expression
+    """
+    return f"{col_mrn} IN (SELECT {COL_MRN} FROM {cohort_table})"
+
+
+def build_partition_where(partition, partitions, col_mrn=COL_MRN):
+    """
+    Build a WHERE clause selecting one MRN-hash partition of a table.
+
+    Rows are assigned with pmod(hash(MRN), partitions) on the zero-padded MRN, so
+    all rows of a patient fall in the same partition even when the table spells
+    their MRN with and without leading zeros. Rows whose MRN hashes to null go
+    to partition 0.
+
+    Parameters
+    ----------
+    partition : int
+        Partition to select, from 0 to partitions - 1
+    partitions : int
+        Number of partitions
+    col_mrn : str
+        MRN column in the source table
+
+    Returns
+    -------
+    str
+        SQL filter expression
+    """
+    return f"COALESCE(pmod(hash({mrn_sql_expr(col_mrn)}), {int(partitions)}), 0) = {int(partition)}"
+
+
+def _and_where(where, where_extra):
+    """Combine two optional WHERE clauses."""
+    if where_extra is None:
+        return where
+    return f"({where}) AND ({where_extra})"
+
+
+def _stage_table(obj_db, df, volume_path, catalog, schema, table):
+    """Write a frame to a Databricks volume and table, returning the full table name."""
+    dict_database_table_info = {
+        'catalog': catalog,
+        'schema': schema,
+        'table': table,
+        'volume_path': volume_path,
+        'sep': '\t'
+    }
+    obj_db.write_db_obj(
+        df=df,
+        volume_path=volume_path,
+        sep='\t',
+        overwrite=True,
+        dict_database_table_info=dict_database_table_info
+    )
+
+    return f"{catalog}.{schema}.{table}"
+
+
+def stage_cohort_table(obj_db, list_mrns, volume_path, catalog, schema, table):
+    """
+    Save the cohort MRNs to a Databricks volume and table for server-side joins.
+
+    Every spelling of each MRN is staged (see mrn_spellings), so that
+    build_staged_where() can compare the raw MRN column of a source table.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    list_mrns : list of str
+        Zero-padded MRNs
+    volume_path : str
+        Volume path for the staged TSV
+    catalog : str
+        Catalog for the staged table
+    schema : str
+        Schema for the staged table
+    table : str
+        Name of the staged table
+
+    Returns
+    -------
+    str
+        Full table name of the staged cohort table
+    """
+    list_spellings = mrn_spellings(list_mrns)
+    print(f'Staging {len(list_mrns)} cohort MRNs ({len(list_spellings)} spellings) to {catalog}.{schema}.{table}')
+    df_cohort = pd.DataFrame({COL_MRN: list_spellings}, columns=COLS_COHORT_TABLE)
+
+    return _stage_table(
+        obj_db=obj_db,
+        df=df_cohort,
+        volume_path=volume_path,
+        catalog=catalog,
+        schema=schema,
+        table=table
+    )
+
+
+def stage_sample_table(obj_db, df_samples_used, volume_path, catalog, schema, table):
+    """
+    Save the cohort sample list to a Databricks volume and table.
+
+    Used by the SQL deidentification engine, which joins the sample list in the
+    warehouse instead of in pandas.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    df_samples_used : pd.DataFrame
+        Sample list with PATIENT_ID and SAMPLE_ID columns
+    volume_path : str
+        Volume path for the staged TSV
+    catalog : str
+        Catalog for the staged table
+    schema : str
+        Schema for the staged table
+    table : str
+        Name of the staged table
+
+    Returns
+    -------
+    str
+        Full table name of the staged sample table
+    """
+    df_samples = df_samples_used[COLS_SAMPLE_TABLE].drop_duplicates()
+    print(f'Staging {df_samples.shape[0]} cohort samples to {catalog}.{schema}.{table}')
+
+    return _stage_table(
+        obj_db=obj_db,
+        df=df_samples,
+        volume_path=volume_path,
+        catalog=catalog,
+        schema=schema,
+        table=table
+    )
+
+
+def query_cohort_rows(
+        obj_db,
+        table_name,
+        columns=None,
+        list_mrns=None,
+        cohort_table=None,
+        chunk_size=IN_LIST_CHUNK_SIZE,
+        where=None
+):
+    """
+    Read only the cohort's rows from a Databricks table.
+
+    Uses the staged cohort table if given, otherwise chunked IN lists of MRNs
+    (one query per chunk, concatenated).
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    table_name : str
+        Full table name (e.g., 'catalog.schema.table')
+    columns : list of str, optional
+        Columns to select. None selects all columns.
+    list_mrns : list of str, optional
+        Zero-padded cohort MRNs (used when cohort_table is not given)
+    cohort_table : str, optional
+        Full table name of a staged cohort table
+    chunk_size : int
+        Number of MRNs per IN list
+    where : str, optional
+        Additional SQL filter (e.g., build_partition_where)
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows of table_name belonging to the cohort
+    """
+    if cohort_table is not None:
+        return query_table(
+            obj_db=obj_db,
+            table_name=table_name,
+            columns=columns,
+            where=_and_where(build_staged_where(cohort_table=cohort_table), where),
+            use_cache=False
+        )
+
+    if list_mrns is None:
+        raise ValueError('Either list_mrns or cohort_table is required')
+
+    list_df = []
+    for i in range(0, len(list_mrns), chunk_size):
+        chunk = list_mrns[i:i + chunk_size]
+        print(f'  Querying cohort rows for MRNs {i + 1}-{i + len(chunk)} of {len(list_mrns)}')
+        df_chunk = query_table(
+            obj_db=obj_db,
+            table_name=table_name,
+            columns=columns,
+            where=_and_where(build_in_list_where(list_mrns=chunk), where),
+            use_cache=False
+        )
+        list_df.append(df_chunk)
+
+    if not list_df:
+        # Empty cohort: run a zero-row query so the result still has the table's columns
+        return query_table(
+            obj_db=obj_db,
+            table_name=table_name,
+            columns=columns,
+            where='1 = 0',
+            use_cache=False
+        )
+
+    return pd.concat(list_df, axis=0, ignore_index=True)
@@ -9,6 +9,8 @@ class constants:
     COL_RPT_NAME: str = 'REPORT_NAME'
 
     COL_ANCHOR_DATE: str = 'DATE_TUMOR_SEQUENCING'
+    ### Columns of the timeline anchor dates table
+    COLS_ANCHOR_DATES = ['MRN', 'DMP_ID', 'DATE_TUMOR_SEQUENCING']
 
     COL_PID: str = 'DMP_ID'
     COL_PID_CBIO: str = 'PATIENT_ID'
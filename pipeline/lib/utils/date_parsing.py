@@ -0,0 +1,188 @@
+"""
+date_parsing.py
+
+Fast date parsing for timeline and reference table date columns.
+
+pd.to_datetime(..., format='mixed') parses every element on its own, which is slow
+on multi-million-row timelines. parse_dates() samples the column, detects the
+dominant format (e.g. ISO 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'), parses every
+conforming value with that exact format and only sends the remainder through
+format='mixed'. Results match a plain format='mixed' parse, with timezone
+information dropped (wall-clock time kept) so all dates are tz-naive.
+
+One difference: a column mixing tz-aware and naive strings keeps the tz-aware
+values (as wall-clock time) instead of coercing them to null.
+"""
+import numpy as np
+import pandas as pd
+
+# Candidate formats, tried in order on the sample. Each parses identically to format='mixed'.
+# Only ISO formats: pandas parses these with a fast C path, while exact non-ISO
+# formats (e.g. '%m/%d/%Y') go through strptime and are slower than 'mixed'.
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S.%f'
+]
+SAMPLE_SIZE = 1000
+MIN_SHARE = 0.5
+
+
+def strip_timezone(values):
+    """
+    Drop timezone information from parsed dates, keeping the wall-clock time.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Output of pd.to_datetime
+
+    Returns
+    -------
+    pd.Series
+        tz-naive datetime64 series
+    """
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return values.dt.tz_localize(None)
+    if values.dtype == object:
+        # Mixed offsets, or a mix of tz-aware and naive values
+        values = values.map(lambda x: x.tz_localize(None) if isinstance(x, pd.Timestamp) and x.tzinfo is not None else x)
+        return pd.to_datetime(values, errors='coerce')
+
+    return values
+
+
+def detect_date_format(values, formats=DATE_FORMATS, sample_size=SAMPLE_SIZE, min_share=MIN_SHARE):
+    """
+    Detect the dominant format of a column of date strings.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Date strings
+    formats : list of str
+        Candidate strptime formats
+    sample_size : int
+        Number of values to test, spread evenly over the column
+    min_share : float
+        Minimum fraction of the sample a format must parse
+
+    Returns
+    -------
+    str or None
+        Best matching format, or None if no format parses min_share of the sample
+    """
+    values = values.dropna()
+    if values.empty:
+        return None
+
+    step = max(len(values) // sample_size, 1)
+    sample = values.iloc[::step].iloc[:sample_size]
+
+    best_format = None
+    best_share = 0
+    for fmt in formats:
+        share = pd.to_datetime(sample, format=fmt, errors='coerce').notnull().mean()
+        if share > best_share:
+            best_format, best_share = fmt, share
+        if share == 1:
+            break
+
+    return best_format if best_share >= min_share else None
+
+
+def parse_dates(values, formats=DATE_FORMATS, sample_size=SAMPLE_SIZE):
+    """
+    Parse a column of dates, using an exact format for the bulk of the values.
+
+    Equivalent to pd.to_datetime(values, errors='coerce', format='mixed') followed
+    by timezone stripping. Only all-string columns take the fast path; columns of
+    date/datetime objects are parsed with format='mixed' directly.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Dates as strings, date/datetime objects or datetime64
+    formats : list of str
+        Candidate strptime formats for the fast path
+    sample_size : int
+        Number of values sampled for format detection
+
+    Returns
+    -------
+    pd.Series
+        tz-naive datetime64 series with the same index
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return strip_timezone(values)
+
+    fmt = None
+    if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        fmt = detect_date_format(values, formats=formats, sample_size=sample_size)
+    if fmt is None:
+        return strip_timezone(pd.to_datetime(values, errors='coerce', format='mixed'))
+
+    # Positional assignment, so duplicate index labels are not an issue
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce').to_numpy(dtype='datetime64[ns]')
+
+    # Values that do not conform to the dominant format
+    logic_rest = values.notnull().to_numpy() & np.isnat(parsed)
+    if logic_rest.any():
+        parsed_rest = strip_timezone(pd.to_datetime(values[logic_rest], errors='coerce', format='mixed'))
+        parsed[logic_rest] = parsed_rest.to_numpy(dtype='datetime64[ns]')
+
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+
+def coercion_stats(values, parsed):
+    """
+    Count values that were not null before parsing but are null after.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Original values
+    parsed : pd.Series
+        Parsed dates
+
+    Returns
+    -------
+    tuple of (int, float)
+        Number of values coerced to null and their fraction of non-null values
+    """
+    coerced_to_null = int((values.notnull() & parsed.isnull()).sum())
+    total_non_null = values.notnull().sum()
+    pct_coerced = coerced_to_null / total_non_null if total_non_null > 0 else 0
+
+    return coerced_to_null, pct_coerced
+
+
+def parse_date_columns(df, list_cols, report=False):
+    """
+    Parse date columns of a dataframe in place with parse_dates().
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe with date columns
+    list_cols : list of str
+        Columns to parse
+    report : bool
+        If True, print the number of values coerced to null per column
+
+    Returns
+    -------
+    pd.DataFrame
+        Dataframe with parsed, tz-naive date columns
+    """
+    for col in list_cols:
+        parsed = parse_dates(df[col])
+        if report:
+            coerced_to_null, pct_coerced = coercion_stats(values=df[col], parsed=parsed)
+            print(f"{col}: {coerced_to_null} values coerced to null ({pct_coerced:.2%})")
+        df[col] = parsed
+
+    return df
@@ -0,0 +1,157 @@
+"""
+dtype_policy.py
+
+Dtypes of the text columns held by the summary pipeline.
+
+Summary loaders used to convert whole frames with astype(str), which keeps every
+cell as a Python str object in a NumPy object column and turns missing values into
+the literal strings 'nan', 'None', 'NaT' or '<NA>', depending on where they came
+from. The wide sample summary, with one such column per summary field, is the
+largest frame of a run. The policy instead:
+
+- keeps ID columns (PATIENT_ID, SAMPLE_ID, DMP_ID, MRN) as object columns of str,
+  the key dtype of templates, anchor dates and IdCodec joins
+- stores low-cardinality fields (CATEGORICAL_COLUMNS) as categoricals
+- stores other text as string[pyarrow] (one buffer per column instead of one
+  object per cell), or pandas' python-backed string dtype without pyarrow
+- keeps missing values missing, so they are written as empty fields (to_csv's
+  na_rep), like the cells of template rows without summary data
+
+Loaders that replace astype(str) pass missing_as_text=True to as_text(), so
+missing values are still written as 'nan' (or 'None', 'NaT', '<NA>') and their
+output does not change.
+"""
+from typing import Iterable
+
+import pandas as pd
+
+from .id_codec import ID_COLUMNS
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    STRING_DTYPE = pd.StringDtype('python')
+
+# Fields with a handful of distinct values, stored as categoricals
+CATEGORICAL_COLUMNS = [
+    'EVENT_TYPE',
+    'SUBTYPE',
+    'GENDER',
+    'SEX',
+    'OS_STATUS'
+]
+
+
+def _is_text_column(values: pd.Series) -> bool:
+    """Check whether a column is an object column of strings (or only missing values)."""
+    return values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty')
+
+
+def _id_as_text(values: pd.Series, missing_as_text: bool = False) -> pd.Series:
+    """Convert an ID column to str, keeping missing values unless missing_as_text."""
+    if missing_as_text:
+        return values.astype(str).astype(object)
+
+    return values.where(values.isnull(), values.astype(str)).astype(object)
+
+
+def _column_as_text(values: pd.Series, categorical: bool, missing_as_text: bool = False) -> pd.Series:
+    """Convert a column to the policy's string dtype (or a categorical of strings)."""
+    if missing_as_text:
+        values = values.astype(str)
+    values = values.astype(STRING_DTYPE)
+    if categorical:
+        values = values.astype('category')
+
+    return values
+
+
+def apply_dtype_policy(
+    df: pd.DataFrame,
+    categorical_columns: Iterable[str] = CATEGORICAL_COLUMNS,
+    id_columns: Iterable[str] = ID_COLUMNS
+) -> pd.DataFrame:
+    """
+    Convert the object columns of strings of a frame to the policy dtypes.
+
+    Numeric, date and mixed-type columns keep their dtype.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame to convert (not modified)
+    categorical_columns : Iterable[str], optional
+        Columns stored as categoricals
+    id_columns : Iterable[str], optional
+        Columns kept as object
+
+    Returns
+    -------
+    pd.DataFrame
+        New frame with the same values and missing values
+    """
+    categorical_columns = set(categorical_columns)
+    id_columns = set(id_columns)
+
+    cols_convert = [col for col in df.columns if col not in id_columns and _is_text_column(df[col])]
+    if not cols_convert:
+        return df
+
+    df = df.copy(deep=False)
+    for col in cols_convert:
+        df[col] = _column_as_text(df[col], categorical=col in categorical_columns)
+
+    return df
+
+
+def as_text(
+    df: pd.DataFrame,
+    categorical_columns: Iterable[str] = CATEGORICAL_COLUMNS,
+    id_columns: Iterable[str] = ID_COLUMNS,
+    missing_as_text: bool = False
+) -> pd.DataFrame:
+    """
+    Convert every column of a frame to text; replaces df.astype(str).
+
+    Values are formatted as astype(str) formats them, but missing values stay
+    missing instead of becoming 'nan', 'None', 'NaT' or '<NA>', unless
+    missing_as_text is set.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame to convert (not modified)
+    categorical_columns : Iterable[str], optional
+        Columns stored as categoricals. Pass () if missing values are filled
+        later with values that may not be among the categories.
+    id_columns : Iterable[str], optional
+        Columns kept as object columns of str
+    missing_as_text : bool, optional
+        Format missing values as astype(str) does, so that the text (and a later
+        fillna) is the same as with astype(str)
+
+    Returns
+    -------
+    pd.DataFrame
+        New frame of text columns
+    """
+    categorical_columns = set(categorical_columns)
+    id_columns = set(id_columns)
+
+    dict_cols = {}
+    for idx, col in enumerate(df.columns):
+        values = df.iloc[:, idx]
+        if col in id_columns:
+            dict_cols[idx] = _id_as_text(values, missing_as_text=missing_as_text)
+        else:
+            dict_cols[idx] = _column_as_text(
+                values,
+                categorical=col in categorical_columns,
+                missing_as_text=missing_as_text
+            )
+
+    df_text = pd.DataFrame(dict_cols, index=df.index)
+    df_text.columns = df.columns
+
+    return df_text
@@ -1,41 +1,21 @@
+import numpy as np
 import pandas as pd
 
-from msk_cdm.databricks import DatabricksAPI
-from msk_cdm.data_processing import set_debug_console, mrn_zero_pad
+from msk_cdm.data_processing import set_debug_console
+from .pathology_snapshot import (
+    PathologySnapshot,
+    filter_tumor_samples,
+    TABLE_PATHOLOGY,
+    COL_SEQ_DATE
+)
 
-# Default table name for pathology data (can be overridden)
-TABLE_PATHOLOGY = 'cdsi_prod.cdm_impact_pipeline_prod.t03_id_mapping_pathology_sample_xml_parsed'
-COL_SEQ_DATE = 'DATE_TUMOR_SEQUENCING'
-COLS_PATHOLOGY = [
-    'MRN',
-    COL_SEQ_DATE,
-    'SAMPLE_ID',
-    'DMP_ID'
-]
 
-
-def get_anchor_dates(fname_databricks_env, table_pathology=TABLE_PATHOLOGY):
-    print('Creating anchor date table from first sequencing date..')
-    obj_db = DatabricksAPI(fname_databricks_env=fname_databricks_env)
-
-    print('Loading %s' % table_pathology)
-    cols_str = ', '.join(COLS_PATHOLOGY)
-    sql = f"SELECT {cols_str} FROM {table_pathology}"
-    df_path = obj_db.query_from_sql(sql=sql)
-    df_path = mrn_zero_pad(df=df_path, col_mrn='MRN')
-    
-    df_path = df_path.dropna().copy()
-    df_path[COL_SEQ_DATE] = pd.to_datetime(
-        df_path[COL_SEQ_DATE],
-        errors='coerce'
-    )
-
-    logic_filt1 = df_path['SAMPLE_ID'].notnull()
-    logic_filt2 = df_path['SAMPLE_ID'].str.contains('T')
-    logic_filt3 = df_path[COL_SEQ_DATE].notnull()
-    logic_filt = logic_filt1 & logic_filt2 & logic_filt3
-
-    df_path_filt = df_path[logic_filt].copy()
+def _derive_from_tumor_samples_reference(df_path_filt):
+    """
+    Row-wise derivation from tumor samples, the fallback for sequencing dates that
+    do not parse to a datetime64 column (e.g. mixed timezones).
+    """
+    df_path_filt = df_path_filt.copy()
     df_path_filt['DMP_ID_DERIVED'] = df_path_filt['SAMPLE_ID'].apply(lambda x: x[:9])
 
     # Find DMP_IDs that do not match DMP_ID Derived
@@ -63,9 +43,158 @@ def get_anchor_dates(fname_databricks_env, table_pathology=TABLE_PATHOLOGY):
 
     df_path_g_f = df_path_g[~filt_rmv_patients]
 
+    return df_path_g_f, df_path_sample_id_error
+
+
+def _factorize_sorted(values):
+    """
+    Same as pd.factorize(values, sort=True).
+
+    String uniques are sorted as a fixed-width numpy array, which is several
+    times faster than sorting Python strings.
+    """
+    codes, uniques = pd.factorize(values)
+    if pd.api.types.infer_dtype(uniques, skipna=False) != 'string':
+        return pd.factorize(values, sort=True)
+
+    order = np.argsort(uniques.to_numpy().astype(str), kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    return rank[codes], uniques.take(order)
+
+
+def _dates_from_int64(values, dtype):
+    """Convert int64 epoch values back to dates of a datetime64 dtype."""
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return pd.DatetimeIndex(values.view(f'M8[{dtype.unit}]')).tz_localize('UTC').tz_convert(dtype.tz)
+
+    return pd.DatetimeIndex(values.view(dtype))
+
+
+def derive_anchor_dates(df_path):
+    """
+    Derive each patient's anchor date (first tumor sequencing date) from pathology rows.
+
+    Parameters
+    ----------
+    df_path : pd.DataFrame
+        Pathology rows with MRN (zero-padded), DATE_TUMOR_SEQUENCING, SAMPLE_ID and DMP_ID
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        Anchor dates (MRN, DMP_ID, DATE_TUMOR_SEQUENCING as datetime.date) and
+        the sample rows with mapping errors (with DMP_ID_DERIVED)
+    """
+    # 'T' is a literal, so skip the regex engine
+    return derive_anchor_dates_from_tumor_samples(filter_tumor_samples(df_path, regex=False))
+
+
+def derive_anchor_dates_from_tumor_samples(df_path_filt):
+    """
+    Derive anchor dates from tumor samples (see pathology_snapshot.filter_tumor_samples).
+
+    Tumor samples whose SAMPLE_ID prefix does not match their DMP_ID, and MRNs or
+    DMP_IDs mapped to more than one DMP_ID or MRN, are reported as mapping errors
+    and removed.
+
+    The derivation is vectorized: MRN and DMP_ID are factorized once, both
+    cardinality checks count the unique (MRN, DMP_ID) code pairs, and the first
+    date per patient is a groupby().min() on int64 dates. The result is identical
+    to the previous row-wise implementation (see bench_anchor_dates.py), kept as
+    _derive_from_tumor_samples_reference(). df_path_filt is not modified.
+
+    Parameters
+    ----------
+    df_path_filt : pd.DataFrame
+        Tumor samples with MRN (zero-padded), DATE_TUMOR_SEQUENCING (parsed),
+        SAMPLE_ID and DMP_ID
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        Anchor dates (MRN, DMP_ID, DATE_TUMOR_SEQUENCING as datetime.date) and
+        the sample rows with mapping errors (with DMP_ID_DERIVED)
+    """
+    dtype_date = df_path_filt[COL_SEQ_DATE].dtype
+    if not pd.api.types.is_datetime64_any_dtype(dtype_date):
+        return _derive_from_tumor_samples_reference(df_path_filt)
+
+    dmp_id_derived = df_path_filt['SAMPLE_ID'].str[:9]
+    logic_mismatch = (dmp_id_derived != df_path_filt['DMP_ID']).to_numpy()
+
+    # Sorted codes, so (MRN, DMP_ID) groups come out in groupby order
+    codes_mrn, uniques_mrn = _factorize_sorted(df_path_filt['MRN'])
+    codes_dmp_id, uniques_dmp_id = _factorize_sorted(df_path_filt['DMP_ID'])
+    n_dmp_ids = max(len(uniques_dmp_id), 1)
+    codes_pair = codes_mrn.astype(np.int64) * n_dmp_ids + codes_dmp_id
+
+    # MRNs with several DMP_IDs and DMP_IDs with several MRNs, from the unique pairs
+    pairs = np.unique(codes_pair)
+    logic_mrn_multi = np.bincount(pairs // n_dmp_ids, minlength=len(uniques_mrn)) > 1
+    logic_dmp_id_multi = np.bincount(pairs % n_dmp_ids, minlength=len(uniques_dmp_id)) > 1
+    logic_ambiguous = logic_dmp_id_multi[codes_dmp_id] | logic_mrn_multi[codes_mrn]
+
+    # Mismatched rows first, then ambiguous ones (the order of the error report)
+    logic_error = logic_mismatch | logic_ambiguous
+    df_error = df_path_filt[logic_error].assign(DMP_ID_DERIVED=dmp_id_derived[logic_error])
+    logic_error_mismatch = logic_mismatch[logic_error]
+    df_path_sample_id_error = pd.concat(
+        [df_error[logic_error_mismatch], df_error[~logic_error_mismatch]],
+        axis=0
+    ).drop_duplicates()
+
+    # First sequencing date per (MRN, DMP_ID) of the matching samples
+    logic_clean = ~logic_mismatch
+    dates_int64 = pd.Series(df_path_filt[COL_SEQ_DATE].array.asi8[logic_clean])
+    min_dates = dates_int64.groupby(codes_pair[logic_clean], sort=True).min()
+    codes_group = min_dates.index.to_numpy()
+
+    df_path_g = pd.DataFrame({
+        'MRN': uniques_mrn.take(codes_group // n_dmp_ids),
+        'DMP_ID': uniques_dmp_id.take(codes_group % n_dmp_ids),
+        # Keep only the date portion to drop time and timezone information
+        COL_SEQ_DATE: _dates_from_int64(min_dates.to_numpy(), dtype_date).date
+    })
+
+    # Remove any MRN or DMP-ID with a mapping error
+    filt_rmv_patients = df_path_g['DMP_ID'].isin(df_path_sample_id_error['DMP_ID']) | \
+                        df_path_g['MRN'].isin(df_path_sample_id_error['MRN']) | \
+                        df_path_g['DMP_ID'].isin(df_path_sample_id_error['DMP_ID_DERIVED'])
+
+    df_path_g_f = df_path_g[~filt_rmv_patients]
+
+    return df_path_g_f, df_path_sample_id_error
+
+
+def get_anchor_dates(fname_databricks_env, table_pathology=TABLE_PATHOLOGY, snapshot=None):
+    """
+    Create the anchor date table from each patient's first tumor sequencing date.
+
+    Parameters
+    ----------
+    fname_databricks_env : str
+        Databricks environment filename
+    table_pathology : str, optional
+        Full table name of the pathology sample mapping table
+    snapshot : PathologySnapshot, optional
+        Pathology table already loaded by the caller. Loaded here if not given.
+
+    Returns
+    -------
+    pd.DataFrame
+        Anchor dates with MRN, DMP_ID and DATE_TUMOR_SEQUENCING columns
+    """
+    print('Creating anchor date table from first sequencing date..')
+    if snapshot is None:
+        snapshot = PathologySnapshot.from_env(fname_databricks_env, table_pathology=table_pathology)
+
+    df_path_g_f, df_path_sample_id_error = derive_anchor_dates_from_tumor_samples(snapshot.tumor_samples())
+
     print('Error in mapping summary:')
     print(df_path_sample_id_error)
-    
+
     print('Done!')
-    
+
     return df_path_g_f
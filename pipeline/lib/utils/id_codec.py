@@ -0,0 +1,279 @@
+"""
+id_codec.py
+
+Dense int32 codes for patient and sample IDs (PATIENT_ID, SAMPLE_ID, DMP_ID, MRN),
+built once per run from the reference frames (template or sample list, anchor
+dates, OS dates).
+
+Every DataFrame.merge on an ID column hashes the object strings of both frames
+again, although the template and anchor side of these joins is the same for every
+summary and timeline of a run. IdCodec factorizes the ID columns of the reference
+frames once and keeps their codes, so a join against a reference frame only looks
+up the other frame's IDs, and the row matching itself runs on integer arrays. The
+dictionary is sorted, so sorting on codes gives the same order as sorting the IDs.
+
+Only row positions are computed from codes: the output columns are taken from the
+input frames, so IDs never need to be decoded. A joined frame is not a reference
+frame, so callers that join it again pass the codes of its key columns, taken
+from the row positions of the earlier join (see take_codes), instead of encoding
+its IDs again. left_join() returns the same rows,
+row order, columns and dtypes as DataFrame.merge(how='left'). It falls back to
+DataFrame.merge if a key column is not an object column, the frames share non-key
+column names, either frame is empty, or the left frame has IDs that are not in
+the dictionary.
+
+The codec is read-only after construction and can be shared between threads and
+forked processes. The frames it was built from must not be modified.
+"""
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+ID_COLUMNS = ['PATIENT_ID', 'SAMPLE_ID', 'DMP_ID', 'MRN']
+
+
+def _is_id_column(values: pd.Series) -> bool:
+    """Check whether a column holds string IDs (object dtype, strings or missing values)."""
+    return values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty')
+
+
+def _factorize_sorted_ids(values: np.ndarray):
+    """
+    pd.factorize(values, sort=True) for string IDs with missing values.
+
+    Uniques are sorted as a fixed-width numpy array, which is several times faster
+    than sorting Python strings.
+    """
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return codes.astype(np.int32), uniques
+
+    order = np.argsort(uniques.astype(str), kind='stable')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    codes = np.where(codes >= 0, rank[codes], -1).astype(np.int32)
+
+    return codes, uniques.take(order)
+
+
+def take_codes(codes: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Return the codes of the rows at the given positions, -1 where the position is -1."""
+    codes_taken = np.full(len(rows), -1, dtype=np.int32)
+    valid = rows >= 0
+    codes_taken[valid] = codes[rows[valid]]
+
+    return codes_taken
+
+
+def left_join_positions(codes_left: np.ndarray, codes_right: np.ndarray, n_codes: int):
+    """
+    Row positions of a left join on integer codes.
+
+    Parameters
+    ----------
+    codes_left : np.ndarray
+        Key codes of the left rows, all in [0, n_codes)
+    codes_right : np.ndarray
+        Key codes of the right rows. Rows with negative codes never match.
+    n_codes : int
+        Number of distinct codes
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Left and right row positions of each output row, in DataFrame.merge(how='left')
+        order: left rows in order, each once per matching right row (in right
+        order). The right position is -1 for left rows without a match.
+    """
+    valid = codes_right >= 0
+    rows_valid = np.flatnonzero(valid)
+    counts = np.bincount(codes_right[valid], minlength=n_codes)
+    if counts.max(initial=0) <= 1:
+        # Unique right keys: one output row per left row
+        position_of_code = np.full(n_codes, -1, dtype=np.int64)
+        position_of_code[codes_right[valid]] = rows_valid
+        return np.arange(len(codes_left)), position_of_code[codes_left]
+
+    # Right rows grouped by code, in their original order within each code
+    order = rows_valid[np.argsort(codes_right[valid], kind='stable')]
+    starts = np.cumsum(counts) - counts
+
+    counts_left = counts[codes_left]
+    reps = np.maximum(counts_left, 1)
+    rows_left = np.repeat(np.arange(len(codes_left)), reps)
+
+    # Offset of each output row among its left row's matches
+    offsets = np.arange(len(rows_left)) - np.repeat(np.cumsum(reps) - reps, reps)
+    matched = np.repeat(counts_left > 0, reps)
+    rows_right = np.full(len(rows_left), -1, dtype=np.int64)
+    rows_right[matched] = order[(np.repeat(starts[codes_left], reps) + offsets)[matched]]
+
+    return rows_left, rows_right
+
+
+class IdCodec:
+    """
+    Sorted dictionary of patient and sample IDs with dense int32 codes.
+    """
+
+    def __init__(self, frames: Sequence[pd.DataFrame] = (), columns: Sequence[str] = ID_COLUMNS):
+        """
+        Parameters
+        ----------
+        frames : Sequence[pd.DataFrame]
+            Reference frames of the run (e.g. template, anchor dates). Their ID
+            columns make up the dictionary, and their codes are kept for joins.
+        columns : Sequence[str], optional
+            ID columns to encode. Columns that do not hold strings are skipped.
+        """
+        list_keys = []
+        list_values = []
+        for df in frames:
+            for col in columns:
+                if col in df.columns and _is_id_column(df[col]):
+                    list_keys.append((df, col))
+                    list_values.append(df[col].to_numpy(dtype=object))
+
+        values = np.concatenate(list_values) if list_values else np.array([], dtype=object)
+        codes, uniques = _factorize_sorted_ids(values)
+        self._uniques = pd.Index(uniques, dtype=object)
+
+        # Codes of the reference frames, by frame identity and column
+        self._frame_codes = {}
+        start = 0
+        for (df, col), values_col in zip(list_keys, list_values):
+            self._frame_codes[(id(df), col)] = (df, codes[start:start + len(values_col)])
+            start += len(values_col)
+
+    def __len__(self) -> int:
+        return len(self._uniques)
+
+    def encode(self, values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+        """Return the int32 codes of IDs, -1 for missing IDs and IDs not in the dictionary."""
+        return self._uniques.get_indexer(values).astype(np.int32)
+
+    def codes(self, df: pd.DataFrame, col: str) -> np.ndarray:
+        """
+        Return the codes of a frame's ID column.
+
+        Codes of the frames the codec was built from are returned without encoding
+        again. Treat the array as read-only.
+        """
+        entry = self._frame_codes.get((id(df), col))
+        if entry is not None and entry[0] is df:
+            return entry[1]
+
+        return self.encode(df[col])
+
+    def _join_codes(self, df: pd.DataFrame, on: List[str], codes_known: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Return join codes of a frame's key columns and a mask of rows with IDs that
+        are not in the dictionary.
+
+        Missing IDs get their own code, as DataFrame.merge matches missing keys with
+        each other. Keys of several columns are combined into one int64 code.
+        Columns in codes_known are not encoded again.
+        """
+        codes_known = codes_known or {}
+        n_codes = len(self) + 1
+        codes_join = np.zeros(len(df), dtype=np.int64)
+        logic_unknown = np.zeros(len(df), dtype=bool)
+        for col in on:
+            codes = codes_known[col] if col in codes_known else self.codes(df, col)
+            # Only IDs without a code can be missing
+            rows_no_code = np.flatnonzero(codes < 0)
+            logic_null = np.zeros(len(df), dtype=bool)
+            logic_null[rows_no_code] = pd.isnull(df[col].to_numpy()[rows_no_code])
+            logic_unknown |= (codes < 0) & ~logic_null
+            codes_join = codes_join * n_codes + np.where(logic_null, len(self), codes)
+
+        return codes_join, logic_unknown
+
+    def _can_join(self, df_left: pd.DataFrame, df_right: pd.DataFrame, on: List[str]) -> bool:
+        """Check whether a join on codes gives the same result as DataFrame.merge."""
+        if df_left.empty or df_right.empty:
+            return False
+        for col in on:
+            if col not in df_left.columns or col not in df_right.columns:
+                return False
+            if df_left[col].dtype != object or df_right[col].dtype != object:
+                return False
+        if not (df_left.columns.is_unique and df_right.columns.is_unique):
+            return False
+        # Shared non-key columns would get merge suffixes
+        cols_left = set(df_left.columns) - set(on)
+        cols_right = set(df_right.columns) - set(on)
+
+        return not (cols_left & cols_right)
+
+    def left_join(
+        self,
+        df_left: pd.DataFrame,
+        df_right: pd.DataFrame,
+        on: Union[str, List[str]],
+        return_rows: bool = False,
+        key_codes_left: Optional[Dict[str, np.ndarray]] = None,
+        key_codes_right: Optional[Dict[str, np.ndarray]] = None
+    ):
+        """
+        Left join of two frames on ID columns.
+
+        Same result as df_left.merge(right=df_right, how='left', on=on): df_left's
+        columns first, then df_right's non-key columns, rows in df_left order and
+        each left row's matches in the order they appear in df_right.
+
+        Parameters
+        ----------
+        df_left : pd.DataFrame
+            Left frame, e.g. the template
+        df_right : pd.DataFrame
+            Right frame
+        on : str or List[str]
+            Key column(s) present in both frames
+        return_rows : bool, optional
+            Also return the df_left and df_right positions of each output row (-1
+            for left rows without a match), or None for both if the join fell back
+            to DataFrame.merge
+        key_codes_left : Dict[str, np.ndarray], optional
+            Codes of df_left's key columns, e.g. carried from an earlier join with
+            take_codes(), so that they are not encoded again
+        key_codes_right : Dict[str, np.ndarray], optional
+            Codes of df_right's key columns
+
+        Returns
+        -------
+        pd.DataFrame or Tuple[pd.DataFrame, Optional[np.ndarray], Optional[np.ndarray]]
+            Joined frame with a RangeIndex, and the row positions if return_rows
+        """
+        on = [on] if isinstance(on, str) else list(on)
+
+        rows_left = None
+        rows_right = None
+        if self._can_join(df_left, df_right, on=on):
+            codes_left, logic_unknown_left = self._join_codes(df_left, on=on, codes_known=key_codes_left)
+            if not logic_unknown_left.any():
+                codes_right, logic_unknown_right = self._join_codes(df_right, on=on, codes_known=key_codes_right)
+                codes_right[logic_unknown_right] = -1
+                if len(on) > 1:
+                    # Combined codes are sparse: renumber them densely for the join
+                    codes_all, uniques = pd.factorize(np.concatenate([codes_left, codes_right]))
+                    n_codes = len(uniques)
+                    codes_left = codes_all[:len(codes_left)]
+                    codes_right = np.where(codes_right >= 0, codes_all[len(codes_left):], -1)
+                else:
+                    n_codes = len(self) + 1
+                rows_left, rows_right = left_join_positions(codes_left, codes_right, n_codes=n_codes)
+
+        if rows_left is None:
+            df_joined = df_left.merge(right=df_right, how='left', on=on)
+        else:
+            df_part_left = df_left.take(rows_left).reset_index(drop=True)
+            # Reindexing by position gives missing values (with merge's upcasts) for -1
+            df_part_right = df_right.drop(columns=on).reset_index(drop=True).reindex(rows_right)
+            df_joined = pd.concat([df_part_left, df_part_right.reset_index(drop=True)], axis=1)
+
+        if return_rows:
+            return df_joined, rows_left, rows_right
+
+        return df_joined
@@ -0,0 +1,248 @@
+"""
+intermediate_io.py
+
+Read and write the PHI intermediates handed between summary pipeline steps.
+
+Summary intermediates, the merged summary data and the summary header used to be
+written to Databricks volumes as TSV and re-parsed by the next step, which re-infers
+every dtype (leading zeros and 'NA' fill values are lost, integer columns become
+float, ...). With the 'parquet' format they are written as Parquet files on local
+disk instead: dtypes are preserved, reads can be restricted to the columns a step
+needs, and nothing is parsed as text. The 'tsv' format (default) keeps the volume
+TSVs.
+
+'parquet' is opt-in: it moves PHI from the governed volume to local disk, and the
+step manifests then record local paths that only resolve on the machine that ran
+the step.
+
+Parquet intermediates mirror their volume path under the intermediate directory,
+e.g. /Volumes/cat/schema/vol/cbioportal/intermediate_files/mskimpact/x.tsv is
+written to {intermediate_dir}/Volumes/cat/schema/vol/cbioportal/intermediate_files/mskimpact/x.parquet.
+Readers dispatch on the file extension, so a manifest can point at either format.
+
+The intermediate directory holds PHI and is created with owner-only permissions.
+
+Environment variables
+---------------------
+CDM_CBIO_ETL_INTERMEDIATE_DIR
+    Directory for Parquet intermediates (default: ~/.cache/cdm-cbioportal-etl-intermediates)
+"""
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ENV_INTERMEDIATE_DIR = 'CDM_CBIO_ETL_INTERMEDIATE_DIR'
+DEFAULT_INTERMEDIATE_DIR = os.path.join('~', '.cache', 'cdm-cbioportal-etl-intermediates')
+
+INTERMEDIATE_FORMATS = ['parquet', 'tsv']
+DEFAULT_INTERMEDIATE_FORMAT = 'tsv'
+PARQUET_SUFFIX = '.parquet'
+
+
+def get_intermediate_dir():
+    """Return the Parquet intermediate directory, creating it with owner-only permissions."""
+    intermediate_dir = Path(os.path.expanduser(os.environ.get(ENV_INTERMEDIATE_DIR, DEFAULT_INTERMEDIATE_DIR)))
+    intermediate_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+    return intermediate_dir
+
+
+def is_parquet_path(path):
+    """Return True if path is a Parquet intermediate."""
+    return str(path).endswith(PARQUET_SUFFIX)
+
+
+def intermediate_path(volume_path, intermediate_format=DEFAULT_INTERMEDIATE_FORMAT):
+    """
+    Return where an intermediate for a volume path is stored in the given format.
+
+    Parameters
+    ----------
+    volume_path : str
+        Databricks volume path of the TSV intermediate
+    intermediate_format : str
+        'parquet' or 'tsv'
+
+    Returns
+    -------
+    str
+        volume_path for 'tsv', the local Parquet path for 'parquet'
+    """
+    if intermediate_format not in INTERMEDIATE_FORMATS:
+        raise ValueError(f"Unknown intermediate format: {intermediate_format}")
+    if intermediate_format == 'tsv' or is_parquet_path(volume_path):
+        return volume_path
+
+    relative_path = Path(str(volume_path).lstrip('/'))
+    return str(get_intermediate_dir() / relative_path.with_suffix(PARQUET_SUFFIX))
+
+
+def normalize_for_parquet(df):
+    """
+    Convert object columns holding a mix of types (e.g. the header's priority
+    column, with YAML ints next to strings) to strings, which Parquet requires.
+    Missing values are kept.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame to write
+
+    Returns
+    -------
+    pd.DataFrame
+        Frame that can be written to Parquet
+    """
+    cols_mixed = [
+        col for col in df.columns
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty')
+    ]
+    if not cols_mixed:
+        return df
+
+    df = df.copy()
+    for col in cols_mixed:
+        df[col] = df[col].where(df[col].isnull(), df[col].astype(str))
+
+    return df
+
+
+def nulls_as_nan(df):
+    """
+    Replace None in object columns with NaN, as read_csv returns missing values.
+
+    Parquet reads string nulls back as None, which later astype(str) calls would
+    turn into 'None' instead of 'nan'.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Frame read from Parquet
+
+    Returns
+    -------
+    pd.DataFrame
+        Frame with NaN for missing values in object columns
+    """
+    cols_object = [col for col in df.columns if df[col].dtype == object and df[col].isnull().any()]
+    if not cols_object:
+        return df
+
+    df = df.copy()
+    for col in cols_object:
+        df[col] = df[col].where(df[col].notnull(), np.nan)
+
+    return df
+
+
+def as_read_from_parquet(df):
+    """Return a DataFrame as read_intermediate() returns it after a Parquet round trip."""
+    return nulls_as_nan(normalize_for_parquet(df))
+
+
+def write_intermediate(df, volume_path, obj_db, intermediate_format=DEFAULT_INTERMEDIATE_FORMAT, sep='\t'):
+    """
+    Write an intermediate in the given format.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data to write
+    volume_path : str
+        Databricks volume path of the TSV intermediate
+    obj_db : DatabricksAPI
+        Databricks API object (used for the 'tsv' format)
+    intermediate_format : str
+        'parquet' or 'tsv'
+    sep : str
+        Delimiter for the 'tsv' format
+
+    Returns
+    -------
+    str
+        Path the intermediate was written to
+    """
+    path = intermediate_path(volume_path=volume_path, intermediate_format=intermediate_format)
+
+    if intermediate_format == 'tsv':
+        obj_db.write_db_obj(
+            df=df,
+            volume_path=path,
+            sep=sep,
+            overwrite=True,
+            dict_database_table_info=None
+        )
+        return path
+
+    fname = Path(path)
+    fname.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+    # Write to a temporary file and rename so readers never see a partial file
+    fname_tmp = fname.with_name(f"{fname.name}.tmp.{uuid.uuid4().hex}")
+    try:
+        normalize_for_parquet(df).to_parquet(fname_tmp, index=False)
+        os.chmod(fname_tmp, 0o600)
+        os.replace(fname_tmp, fname)
+    finally:
+        fname_tmp.unlink(missing_ok=True)
+
+    return path
+
+
+def read_intermediate(path, obj_db, columns=None, sep='\t'):
+    """
+    Read an intermediate written by write_intermediate (or any volume TSV).
+
+    Parameters
+    ----------
+    path : str
+        Local Parquet path or Databricks volume path
+    obj_db : DatabricksAPI
+        Databricks API object (used for volume paths)
+    columns : list of str, optional
+        Columns to read. Parquet files only read these columns.
+    sep : str
+        Delimiter for volume files
+
+    Returns
+    -------
+    pd.DataFrame
+        Intermediate data
+    """
+    if is_parquet_path(path):
+        return nulls_as_nan(pd.read_parquet(path, columns=columns))
+
+    df = obj_db.read_db_obj(volume_path=path, sep=sep)
+    if columns is not None:
+        df = df[columns]
+
+    return df
+
+
+def read_intermediate_columns(path, obj_db, sep='\t'):
+    """
+    Return the column names of an intermediate.
+
+    Parquet files are not read beyond their schema.
+
+    Parameters
+    ----------
+    path : str
+        Local Parquet path or Databricks volume path
+    obj_db : DatabricksAPI
+        Databricks API object (used for volume paths)
+    sep : str
+        Delimiter for volume files
+
+    Returns
+    -------
+    list of str
+        Column names
+    """
+    if is_parquet_path(path):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+
+    return list(obj_db.read_db_obj(volume_path=path, sep=sep).columns)
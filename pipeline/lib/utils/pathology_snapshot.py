@@ -0,0 +1,115 @@
+"""
+pathology_snapshot.py
+
+One read of the pathology sample mapping table (t03_id_mapping_pathology_sample_xml_parsed)
+shared by everything derived from it: anchor dates, age at sequencing, date of
+sequencing and the sequencing timeline.
+
+Each of these used to query the table itself (compute_age_at_sequencing twice, once
+directly and once through get_anchor_dates with a new DatabricksAPI object) and then
+repeat the same cleaning. PathologySnapshot queries the union of their columns once
+and caches the cleaned frames:
+
+- raw(): the table as queried
+- samples(): rows with all columns present, MRN zero-padded
+- tumor_samples(): samples() with parsed sequencing dates, restricted to tumor
+  samples ('T' in SAMPLE_ID) with a sequencing date
+
+The cached frames are shared between consumers and must not be modified in place.
+"""
+import pandas as pd
+
+from msk_cdm.databricks import DatabricksAPI
+from msk_cdm.data_processing import mrn_zero_pad
+from .table_cache import query_table
+
+# Default table name for pathology data (can be overridden)
+TABLE_PATHOLOGY = 'cdsi_prod.cdm_impact_pipeline_prod.t03_id_mapping_pathology_sample_xml_parsed'
+COL_SEQ_DATE = 'DATE_TUMOR_SEQUENCING'
+COLS_PATHOLOGY = [
+    'MRN',
+    COL_SEQ_DATE,
+    'SAMPLE_ID',
+    'DMP_ID'
+]
+
+
+def filter_tumor_samples(df_path, regex=True):
+    """
+    Drop incomplete rows, parse sequencing dates and keep tumor samples with a date.
+
+    Parameters
+    ----------
+    df_path : pd.DataFrame
+        Pathology rows with MRN, DATE_TUMOR_SEQUENCING, SAMPLE_ID and DMP_ID
+    regex : bool, optional
+        Match 'T' in SAMPLE_ID as a regex (same result, slower)
+
+    Returns
+    -------
+    pd.DataFrame
+        New frame of tumor samples with DATE_TUMOR_SEQUENCING as datetime
+    """
+    df_path = df_path.dropna().copy()
+    df_path[COL_SEQ_DATE] = pd.to_datetime(
+        df_path[COL_SEQ_DATE],
+        errors='coerce'
+    )
+
+    logic_filt1 = df_path['SAMPLE_ID'].notnull()
+    logic_filt2 = df_path['SAMPLE_ID'].str.contains('T', regex=regex)
+    logic_filt3 = df_path[COL_SEQ_DATE].notnull()
+    logic_filt = logic_filt1 & logic_filt2 & logic_filt3
+
+    return df_path[logic_filt].copy()
+
+
+class PathologySnapshot:
+    """
+    Pathology sample mapping table read once, with cached cleaned views.
+    """
+
+    def __init__(self, obj_db: DatabricksAPI, table_pathology: str = TABLE_PATHOLOGY):
+        """
+        Parameters
+        ----------
+        obj_db : DatabricksAPI
+            Databricks API object used for the query
+        table_pathology : str, optional
+            Full table name of the pathology sample mapping table
+        """
+        self.table_pathology = table_pathology
+
+        print('Loading %s' % table_pathology)
+        self._df_raw = query_table(obj_db=obj_db, table_name=table_pathology, columns=COLS_PATHOLOGY)
+        print(f'  Loaded {self._df_raw.shape[0]} pathology rows')
+
+        self._df_samples = None
+        self._df_tumor_samples = None
+
+    @classmethod
+    def from_env(cls, fname_databricks_env: str, table_pathology: str = TABLE_PATHOLOGY) -> 'PathologySnapshot':
+        """Create a snapshot from a Databricks environment file."""
+        return cls(obj_db=DatabricksAPI(fname_databricks_env=fname_databricks_env), table_pathology=table_pathology)
+
+    def raw(self, columns=None) -> pd.DataFrame:
+        """Return the table as queried, optionally restricted to columns."""
+        if columns is None:
+            return self._df_raw
+
+        return self._df_raw[columns]
+
+    def samples(self) -> pd.DataFrame:
+        """Return the rows with all columns present, MRN zero-padded."""
+        if self._df_samples is None:
+            self._df_samples = mrn_zero_pad(df=self._df_raw.dropna(), col_mrn='MRN')
+
+        return self._df_samples
+
+    def tumor_samples(self) -> pd.DataFrame:
+        """Return the tumor samples with a parsed sequencing date (see filter_tumor_samples)."""
+        if self._df_tumor_samples is None:
+            # 'T' is a literal, so skip the regex engine
+            self._df_tumor_samples = filter_tumor_samples(self.samples(), regex=False)
+
+        return self._df_tumor_samples
@@ -6,6 +6,7 @@ Extracts sequencing date from pathology table and saves to Databricks
 import pandas as pd
 
 from msk_cdm.databricks import DatabricksAPI
+from .pathology_snapshot import PathologySnapshot
 
 
 def date_of_sequencing(
@@ -15,7 +16,8 @@ def date_of_sequencing(
         volume_path_save_date_of_seq,
         table_save_date_of_seq=None,
         catalog=None,
-        schema=None
+        schema=None,
+        snapshot=None
 ):
     """
 
@@ -25,6 +27,7 @@ def date_of_sequencing(
     :param table_save_date_of_seq: Optional table name to create from the data
     :param catalog: Optional catalog name for table creation
     :param schema: Optional schema name for table creation
+    :param snapshot: Optional PathologySnapshot of table_samples, loaded if not given
     :return: df_path: dataframe with sequencing dates
     """
 
@@ -34,9 +37,9 @@ def date_of_sequencing(
 
     ## Load pathology report table
     col_keep = ['DMP_ID', 'SAMPLE_ID', 'DATE_TUMOR_SEQUENCING']
-    cols_str = ', '.join(col_keep)
-    sql = f"SELECT {cols_str} FROM {table_samples}"
-    df_path1 = obj_db.query_from_sql(sql=sql)
+    if snapshot is None:
+        snapshot = PathologySnapshot(obj_db=obj_db, table_pathology=table_samples)
+    df_path1 = snapshot.raw(columns=col_keep)
     df_path = df_path1.dropna()
     df_path = df_path.rename(
         columns={
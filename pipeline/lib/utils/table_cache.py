@@ -0,0 +1,361 @@
+"""
+table_cache.py
+
+Local on-disk cache for Databricks table reads.
+
+Reference tables such as demographics, anchor dates and the pathology ID mapping
+are read by many scripts in a single ETL run. query_table() stores each result as
+Parquet on local disk, keyed by table name, filter and the table's Delta version
+(or last-modified time), so that a run pulls each upstream table over the wire at
+most once. A cached superset of columns is reused for narrower projections.
+
+The cache directory holds PHI and is created with owner-only permissions.
+
+Environment variables
+---------------------
+CDM_CBIO_ETL_CACHE_DIR
+    Cache directory (default: ~/.cache/cdm-cbioportal-etl)
+CDM_CBIO_ETL_CACHE_MAX_GB
+    Size bound for the cache; least recently used entries are evicted (default: 20)
+CDM_CBIO_ETL_NO_CACHE
+    Set to 1 to bypass the cache (same as --no_cache on the entry points)
+"""
+import os
+import json
+import uuid
+import hashlib
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ENV_CACHE_DIR = 'CDM_CBIO_ETL_CACHE_DIR'
+ENV_CACHE_MAX_GB = 'CDM_CBIO_ETL_CACHE_MAX_GB'
+ENV_NO_CACHE = 'CDM_CBIO_ETL_NO_CACHE'
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.cache', 'cdm-cbioportal-etl')
+DEFAULT_CACHE_MAX_GB = 20
+
+
+def set_cache_enabled(enabled):
+    """
+    Enable or disable the table cache for this process and its child processes.
+
+    Parameters
+    ----------
+    enabled : bool
+        False to bypass the cache (used by the --no_cache flags)
+    """
+    if enabled:
+        os.environ.pop(ENV_NO_CACHE, None)
+    else:
+        os.environ[ENV_NO_CACHE] = '1'
+
+
+def cache_enabled():
+    """Return True unless the cache has been disabled."""
+    return os.environ.get(ENV_NO_CACHE, '').strip().lower() not in ('1', 'true', 'yes')
+
+
+def get_cache_dir():
+    """Return the cache directory, creating it with owner-only permissions."""
+    cache_dir = Path(os.path.expanduser(os.environ.get(ENV_CACHE_DIR, DEFAULT_CACHE_DIR)))
+    cache_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+    return cache_dir
+
+
+def _build_sql(table_name, columns, where):
+    cols_str = ', '.join(columns) if columns else '*'
+    sql = f"SELECT {cols_str} FROM {table_name}"
+    if where:
+        sql += f" WHERE {where}"
+    return sql
+
+
+def _hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def get_table_version(obj_db, table_name):
+    """
+    Return a version token for a Databricks table.
+
+    Uses the Delta table version from DESCRIBE HISTORY, falling back to the
+    lastModified time from DESCRIBE DETAIL.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    table_name : str
+        Full table name (e.g., 'catalog.schema.table')
+
+    Returns
+    -------
+    str or None
+        Version token, or None if the table version could not be determined
+    """
+    try:
+        df_history = obj_db.query_from_sql(sql=f"DESCRIBE HISTORY {table_name} LIMIT 1")
+        if df_history is not None and df_history.shape[0] > 0 and 'version' in df_history.columns:
+            return f"v{df_history['version'].iloc[0]}"
+    except Exception:
+        pass
+
+    try:
+        df_detail = obj_db.query_from_sql(sql=f"DESCRIBE DETAIL {table_name}")
+        if df_detail is not None and df_detail.shape[0] > 0 and 'lastModified' in df_detail.columns:
+            return f"t{pd.Timestamp(df_detail['lastModified'].iloc[0]).value}"
+    except Exception:
+        pass
+
+    return None
+
+
+def get_table_columns(obj_db, table_name):
+    """
+    Return the column names of a Databricks table without reading any rows.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    table_name : str
+        Full table name (e.g., 'catalog.schema.table')
+
+    Returns
+    -------
+    list of str
+        Column names in table order
+    """
+    df = obj_db.query_from_sql(sql=f"SELECT * FROM {table_name} LIMIT 0")
+    return list(df.columns)
+
+
+def _find_entry(entry_dir, version, columns):
+    """Return (parquet path, metadata) of a cached entry covering the requested columns."""
+    if not entry_dir.exists():
+        return None, None
+
+    for fname_meta in entry_dir.glob('*.json'):
+        try:
+            with open(fname_meta, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if meta.get('version') != version:
+            continue
+        fname_data = fname_meta.with_suffix('.parquet')
+        if not fname_data.exists():
+            continue
+        if columns is None:
+            if meta.get('all_columns'):
+                return fname_data, meta
+        elif set(columns).issubset(meta.get('columns', [])):
+            return fname_data, meta
+
+    return None, None
+
+
+def _write_entry(entry_dir, table_name, where, version, columns, df):
+    """Write a cache entry and drop entries for older versions of the same table."""
+    entry_dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+    # Stale versions can never be served again
+    for fname_meta in entry_dir.glob('*.json'):
+        try:
+            with open(fname_meta, 'r') as f:
+                meta_old = json.load(f)
+        except (OSError, ValueError):
+            meta_old = {}
+        if meta_old.get('version') != version:
+            fname_meta.with_suffix('.parquet').unlink(missing_ok=True)
+            fname_meta.unlink(missing_ok=True)
+
+    key = f"{version}_{_hash(','.join(columns) if columns else '*')}"
+    fname_data = entry_dir / f"{key}.parquet"
+    fname_meta = entry_dir / f"{key}.json"
+
+    # Write to temporary files and rename so concurrent readers never see partial entries
+    tmp_suffix = f".tmp.{uuid.uuid4().hex}"
+    fname_data_tmp = entry_dir / f"{key}.parquet{tmp_suffix}"
+    fname_meta_tmp = entry_dir / f"{key}.json{tmp_suffix}"
+    try:
+        df.to_parquet(fname_data_tmp, index=False)
+        os.chmod(fname_data_tmp, 0o600)
+        meta = {
+            'table': table_name,
+            'where': where,
+            'version': version,
+            'columns': list(df.columns),
+            'all_columns': columns is None,
+            'rows': int(df.shape[0]),
+            'created': time.time()
+        }
+        with open(fname_meta_tmp, 'w') as f:
+            json.dump(meta, f)
+        os.chmod(fname_meta_tmp, 0o600)
+        os.replace(fname_data_tmp, fname_data)
+        os.replace(fname_meta_tmp, fname_meta)
+    finally:
+        fname_data_tmp.unlink(missing_ok=True)
+        fname_meta_tmp.unlink(missing_ok=True)
+
+
+def evict_cache(max_bytes=None):
+    """
+    Evict least recently used cache entries until the cache fits in max_bytes.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Size bound in bytes. Defaults to CDM_CBIO_ETL_CACHE_MAX_GB.
+    """
+    if max_bytes is None:
+        max_gb = float(os.environ.get(ENV_CACHE_MAX_GB, DEFAULT_CACHE_MAX_GB))
+        max_bytes = int(max_gb * 1024 ** 3)
+
+    entries = []
+    for fname_data in get_cache_dir().glob('*/*.parquet'):
+        try:
+            stat = fname_data.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, fname_data))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, fname_data in sorted(entries):
+        if total <= max_bytes:
+            break
+        fname_data.unlink(missing_ok=True)
+        fname_data.with_suffix('.json').unlink(missing_ok=True)
+        total -= size
+
+
+def query_table(obj_db, table_name, columns=None, where=None, use_cache=None):
+    """
+    Read a Databricks table, serving repeat reads from the local cache.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    table_name : str
+        Full table name (e.g., 'catalog.schema.table')
+    columns : list of str, optional
+        Columns to select. None selects all columns.
+    where : str, optional
+        SQL filter appended as a WHERE clause
+    use_cache : bool, optional
+        Override the process-wide cache setting
+
+    Returns
+    -------
+    pd.DataFrame
+        Query result
+    """
+    columns = list(columns) if columns else None
+    sql = _build_sql(table_name=table_name, columns=columns, where=where)
+
+    if use_cache is None:
+        use_cache = cache_enabled()
+    if not use_cache:
+        return obj_db.query_from_sql(sql=sql)
+
+    version = get_table_version(obj_db=obj_db, table_name=table_name)
+    if version is None:
+        print(f'Table cache: no version available for {table_name}, reading without cache')
+        return obj_db.query_from_sql(sql=sql)
+
+    entry_dir = get_cache_dir() / _hash(f"{table_name.lower()}|{where or ''}")
+    fname_data, meta = _find_entry(entry_dir=entry_dir, version=version, columns=columns)
+    if fname_data is not None:
+        try:
+            df = pd.read_parquet(fname_data, columns=columns)
+            os.utime(fname_data)
+            print(f'Table cache: hit for {table_name} ({version})')
+            return df
+        except Exception as e:
+            print(f'Table cache: could not read entry for {table_name}: {e}')
+
+    df = obj_db.query_from_sql(sql=sql)
+    try:
+        _write_entry(
+            entry_dir=entry_dir,
+            table_name=table_name,
+            where=where,
+            version=version,
+            columns=columns,
+            df=df
+        )
+        evict_cache()
+    except Exception as e:
+        # Caching is best effort (e.g. pyarrow unavailable or mixed-type columns)
+        print(f'Table cache: could not cache {table_name}: {e}')
+
+    return df
+
+
+def derived_frame(obj_db, table_name, name, build, use_cache=None):
+    """
+    Build a frame derived from a Databricks table, serving repeat builds from the local cache.
+
+    The derived frame is stored next to the table's own cache entries, keyed by
+    name and the table version, so it is rebuilt when the table changes. Include
+    a version of the derivation in name to invalidate entries when it changes.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    table_name : str
+        Full table name the frame is derived from
+    name : str
+        Name of the derived frame (e.g., 'vital_status_v1')
+    build : callable
+        Called without arguments to build the frame on a cache miss
+    use_cache : bool, optional
+        Override the process-wide cache setting
+
+    Returns
+    -------
+    pd.DataFrame
+        Derived frame
+    """
+    if use_cache is None:
+        use_cache = cache_enabled()
+    if not use_cache:
+        return build()
+
+    version = get_table_version(obj_db=obj_db, table_name=table_name)
+    if version is None:
+        print(f'Table cache: no version available for {table_name}, building {name} without cache')
+        return build()
+
+    where = f"derived:{name}"
+    entry_dir = get_cache_dir() / _hash(f"{table_name.lower()}|{where}")
+    fname_data, meta = _find_entry(entry_dir=entry_dir, version=version, columns=None)
+    if fname_data is not None:
+        try:
+            df = pd.read_parquet(fname_data)
+            os.utime(fname_data)
+            print(f'Table cache: hit for {name} of {table_name} ({version})')
+            return df
+        except Exception as e:
+            print(f'Table cache: could not read {name} entry for {table_name}: {e}')
+
+    df = build()
+    try:
+        _write_entry(
+            entry_dir=entry_dir,
+            table_name=table_name,
+            where=where,
+            version=version,
+            columns=None,
+            df=df
+        )
+        evict_cache()
+    except Exception as e:
+        print(f'Table cache: could not cache {name} of {table_name}: {e}')
+
+    return df
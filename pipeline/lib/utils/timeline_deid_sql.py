@@ -0,0 +1,240 @@
+"""
+timeline_deid_sql.py
+
+Build the SQL for server-side timeline deidentification.
+
+The query reproduces the pandas deidentification in
+timeline/cbioportal_timeline_deidentify.py (deidentify_timeline_frames) inside the
+warehouse: the sample list, anchor dates, OS dates and timeline rows are joined with
+the same left joins, future dates are nulled, dates are optionally truncated by
+OS_DATE, and START_DATE/STOP_DATE are returned as days from the anchor date. Only
+the cBioPortal output columns come back over the wire.
+
+Anchor dates are date-only, so day offsets are computed as a difference of calendar
+dates, which matches the floor of the timestamp difference used in pandas.
+
+Date strings are parsed with a cast to TIMESTAMP plus the month-first formats of
+SQL_DATE_FORMATS, after dropping any UTC offset so the wall-clock time is kept as in
+pandas. pandas' format='mixed' accepts more spellings (e.g. 'Jan 15, 2020' or
+'15.01.2020'): those values are NULL here and their rows are dropped, where the
+pandas engine keeps them. compare_timeline_deid_engines.py --date_fixtures shows
+the affected forms.
+
+The SQL engine returns the deidentified timeline only; the PHI version is written
+by the pandas engine.
+"""
+import pandas as pd
+
+from .constants import constants
+from .cohort_filter import mrn_sql_expr
+
+COL_MRN = 'MRN'
+COL_ANCHOR_DATE = constants.COL_ANCHOR_DATE
+COL_DEATH_DATE = 'PT_DEATH_DTE'
+COL_LAST_CONTACT_DATE = 'PLA_LAST_CONTACT_DTE'
+COLS_DATES = ['START_DATE', 'STOP_DATE']
+SQL_DIALECTS = ['databricks', 'duckdb']
+# Non-ISO formats that format='mixed' parses (month first) and a cast to TIMESTAMP
+# rejects, as (Databricks, DuckDB) patterns
+SQL_DATE_FORMATS = [
+    ('M/d/yyyy', '%m/%d/%Y'),
+    ('M/d/yyyy H:mm', '%m/%d/%Y %H:%M'),
+    ('M/d/yyyy H:mm:ss', '%m/%d/%Y %H:%M:%S'),
+    ('yyyyMMdd', '%Y%m%d')
+]
+# UTC offset after a time of day, e.g. '10:00:00+05:00' or '10:00:00Z'
+PATTERN_UTC_OFFSET = '([0-9]{2}:[0-9]{2}(:[0-9]{2}([.][0-9]+)?)?) *(Z|[+-][0-9]{2}:?[0-9]{2})$'
+
+
+def _quote(col, dialect):
+    if dialect == 'duckdb':
+        return f'"{col}"'
+    return f"`{col}`"
+
+
+def _date_diff_days(dialect, col_end, col_start):
+    if dialect == 'databricks':
+        return f"DATEDIFF(CAST({col_end} AS DATE), CAST({col_start} AS DATE))"
+    if dialect == 'duckdb':
+        return f"DATE_DIFF('day', CAST({col_start} AS DATE), CAST({col_end} AS DATE))"
+    raise ValueError(f"Unknown SQL dialect: {dialect}")
+
+
+def _to_timestamp(col, dialect):
+    if dialect == 'databricks':
+        text = f"CAST({col} AS STRING)"
+        list_parsed = [f"TRY_TO_TIMESTAMP({text}, '{fmt}')" for fmt, _ in SQL_DATE_FORMATS]
+        text_naive = f"REGEXP_REPLACE({text}, '{PATTERN_UTC_OFFSET}', '$1')"
+    elif dialect == 'duckdb':
+        text = f"CAST({col} AS VARCHAR)"
+        list_parsed = [f"TRY_STRPTIME({text}, '{fmt}')" for _, fmt in SQL_DATE_FORMATS]
+        text_naive = f"REGEXP_REPLACE({text}, '{PATTERN_UTC_OFFSET}', '\\1')"
+    else:
+        raise ValueError(f"Unknown SQL dialect: {dialect}")
+    # Explicit formats first: a plain cast may read 'yyyyMMdd' as a far-future year
+    list_parsed.append(f"TRY_CAST({text_naive} AS TIMESTAMP)")
+
+    return f"COALESCE({', '.join(list_parsed)})"
+
+
+def build_timeline_deid_sql(
+        *,
+        table_timeline,
+        table_samples,
+        table_anchor,
+        table_demo,
+        timeline_columns,
+        list_cols_cbio_timeline,
+        merge_level='patient',
+        truncate_by_os_date=False,
+        today=None,
+        dialect='databricks'
+):
+    """
+    Build a query that returns a deidentified timeline.
+
+    Parameters
+    ----------
+    table_timeline : str
+        Timeline source table
+    table_samples : str
+        Cohort sample table with PATIENT_ID and SAMPLE_ID columns
+        (see cohort_filter.stage_sample_table)
+    table_anchor : str
+        Anchor dates table with MRN, DMP_ID and DATE_TUMOR_SEQUENCING columns
+    table_demo : str
+        Demographics table with MRN, PT_DEATH_DTE and PLA_LAST_CONTACT_DTE columns
+    timeline_columns : list of str
+        Columns available in the timeline source table
+    list_cols_cbio_timeline : list of str
+        Columns for final cBioPortal output
+    merge_level : str
+        'patient' or 'sample'
+    truncate_by_os_date : bool
+        If True, truncate START_DATE and STOP_DATE that exceed OS_DATE
+    today : pd.Timestamp, optional
+        Dates after this day are treated as invalid (default: today)
+    dialect : str
+        'databricks', or 'duckdb' for local comparison runs
+
+    Returns
+    -------
+    str
+        SQL query. Its result still needs the column selection, dropna and sort of
+        finalize_deidentified_timeline().
+    """
+    if dialect not in SQL_DIALECTS:
+        raise ValueError(f"Unknown SQL dialect: {dialect}")
+    if merge_level not in ('patient', 'sample'):
+        raise ValueError(f"Unknown merge_level: {merge_level}")
+    if today is None:
+        today = pd.Timestamp.today().normalize()
+    sql_today = f"TIMESTAMP '{pd.Timestamp(today):%Y-%m-%d %H:%M:%S}'"
+
+    timeline_columns = list(timeline_columns)
+    cols_join = ['PATIENT_ID'] + (['SAMPLE_ID'] if merge_level == 'sample' else [])
+    # Pass-through columns come from the timeline table; join keys come from the sample list
+    cols_passthrough = [
+        col for col in dict.fromkeys(list_cols_cbio_timeline)
+        if col in timeline_columns and col not in cols_join + COLS_DATES + [COL_MRN]
+    ]
+
+    # Timeline source rows
+    list_timeline_select = [f"{mrn_sql_expr(_quote(COL_MRN, dialect))} AS {COL_MRN}"]
+    if merge_level == 'sample':
+        list_timeline_select.append(f"{_quote('SAMPLE_ID', dialect)} AS SAMPLE_ID")
+    list_timeline_select += [f"{_quote(col, dialect)} AS {_quote(col, dialect)}" for col in cols_passthrough]
+    for col in COLS_DATES:
+        if col in timeline_columns:
+            list_timeline_select.append(f"{_to_timestamp(_quote(col, dialect), dialect)} AS {col}_TS")
+        else:
+            list_timeline_select.append(f"CAST(NULL AS TIMESTAMP) AS {col}_TS")
+
+    # Merge, matching the left joins of the pandas implementation
+    if merge_level == 'patient':
+        join_timeline = f"a.{COL_MRN} = t.{COL_MRN}"
+    else:
+        join_timeline = f"s.SAMPLE_ID = t.SAMPLE_ID AND a.{COL_MRN} = t.{COL_MRN}"
+
+    # Future dates are nulled before truncation, as in pandas
+    dict_date_exprs = {}
+    for col in COLS_DATES:
+        expr = f"CASE WHEN t.{col}_TS > {sql_today} THEN NULL ELSE t.{col}_TS END"
+        if truncate_by_os_date:
+            expr = f"CASE WHEN ({expr}) > o.OS_DATE THEN o.OS_DATE ELSE ({expr}) END"
+        dict_date_exprs[col] = expr
+
+    list_merged_select = [f"s.{col} AS {col}" for col in cols_join]
+    list_merged_select += [f"t.{_quote(col, dialect)} AS {_quote(col, dialect)}" for col in cols_passthrough]
+    list_merged_select += [
+        f"{_date_diff_days(dialect, dict_date_exprs[col], 'a.ANCHOR_DATE')} AS {col}"
+        for col in COLS_DATES
+    ]
+
+    cols_output = [col for col in dict.fromkeys(list_cols_cbio_timeline) if col in cols_join + cols_passthrough + COLS_DATES]
+    cols_sort = [col for col in ['PATIENT_ID', 'START_DATE'] if col in cols_output]
+    cols_order = cols_sort + [col for col in cols_output if col not in cols_sort]
+
+    sep = ',\n        '
+    sql = f"""WITH samples AS (
+    SELECT DISTINCT {', '.join(cols_join)}
+    FROM {table_samples}
+),
+anchor AS (
+    SELECT
+        {mrn_sql_expr(COL_MRN)} AS {COL_MRN},
+        DMP_ID,
+        {_to_timestamp(COL_ANCHOR_DATE, dialect)} AS ANCHOR_DATE
+    FROM {table_anchor}
+),
+os AS (
+    SELECT
+        {mrn_sql_expr(COL_MRN)} AS {COL_MRN},
+        COALESCE({_to_timestamp(COL_DEATH_DATE, dialect)}, {_to_timestamp(COL_LAST_CONTACT_DATE, dialect)}) AS OS_DATE
+    FROM {table_demo}
+),
+timeline AS (
+    SELECT
+        {sep.join(list_timeline_select)}
+    FROM {table_timeline}
+),
+merged AS (
+    SELECT
+        {sep.join(list_merged_select)}
+    FROM samples s
+    LEFT JOIN anchor a ON s.PATIENT_ID = a.DMP_ID
+    LEFT JOIN os o ON a.{COL_MRN} = o.{COL_MRN}
+    LEFT JOIN timeline t ON {join_timeline}
+)
+SELECT {', '.join(_quote(col, dialect) for col in cols_output)}
+FROM merged
+WHERE START_DATE IS NOT NULL
+ORDER BY {', '.join(_quote(col, dialect) for col in cols_order)}"""
+
+    return sql
+
+
+def match_pandas_dtypes(df):
+    """
+    Cast a SQL engine result to the dtypes the pandas engine produces.
+
+    The left joins in pandas upcast integer columns with missing values to float,
+    while some drivers return them as nullable integers.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Result of the query from build_timeline_deid_sql()
+
+    Returns
+    -------
+    pd.DataFrame
+        Result with nullable integer columns holding missing values cast to float
+    """
+    for col in df.columns:
+        if col in COLS_DATES:
+            continue
+        if isinstance(df[col].dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(df[col]) and df[col].isna().any():
+            df[col] = df[col].astype('float64')
+
+    return df
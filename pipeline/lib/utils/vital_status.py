@@ -0,0 +1,104 @@
+"""
+vital_status.py
+
+Patient vital status (birth, death, last contact and OS dates) derived once from
+the demographics table (t01_epic_ddp_demographics).
+
+Overall survival, age at sequencing, the follow-up timeline and timeline
+deidentification each used to query demographics and parse the same date
+columns. load_vital_status() builds the table once and stores it in the local
+table cache (see table_cache.derived_frame), keyed by the demographics table
+version, so later scripts in a run read the parsed dates from disk:
+
+- MRN: zero-padded
+- PT_BIRTH_DTE, PT_DEATH_DTE, PLA_LAST_CONTACT_DTE, MRN_CREATE_DTE: tz-naive datetime64
+- OS_DATE: date of death if available, otherwise last contact date
+- PLA_LAST_CONTACT_MISSING: True where the demographics last contact date is null
+  (unparseable dates are NaT but not missing, as age at sequencing tells them apart)
+
+Rows are the demographics rows in table order.
+"""
+import pandas as pd
+
+from msk_cdm.databricks import DatabricksAPI
+from msk_cdm.data_processing import mrn_zero_pad
+from .date_parsing import parse_date_columns
+from .table_cache import derived_frame, query_table
+
+TABLE_DEMO = 'cdsi_prod.cdm_impact_pipeline_prod.t01_epic_ddp_demographics'
+COL_BIRTH_DATE = 'PT_BIRTH_DTE'
+COL_DEATH_DATE = 'PT_DEATH_DTE'
+COL_LAST_CONTACT_DATE = 'PLA_LAST_CONTACT_DTE'
+COL_MRN_CREATE_DATE = 'MRN_CREATE_DTE'
+COL_OS_DATE = 'OS_DATE'
+COL_LAST_CONTACT_MISSING = 'PLA_LAST_CONTACT_MISSING'
+COLS_DATES = [COL_BIRTH_DATE, COL_DEATH_DATE, COL_LAST_CONTACT_DATE, COL_MRN_CREATE_DATE]
+COLS_DEMO = ['MRN'] + COLS_DATES
+
+# Bump when build_vital_status() changes, so cached tables are rebuilt
+VITAL_STATUS_VERSION = 2
+
+
+def build_vital_status(df_demo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse the vital status dates of a demographics frame and add OS_DATE.
+
+    Date columns missing from df_demo are skipped, so frames with only MRN,
+    PT_DEATH_DTE and PLA_LAST_CONTACT_DTE are enough for OS_DATE.
+
+    Parameters
+    ----------
+    df_demo : pd.DataFrame
+        Demographics with MRN, PT_DEATH_DTE and PLA_LAST_CONTACT_DTE columns, and
+        optionally PT_BIRTH_DTE and MRN_CREATE_DTE
+
+    Returns
+    -------
+    pd.DataFrame
+        New frame with zero-padded MRN, tz-naive dates, OS_DATE and
+        PLA_LAST_CONTACT_MISSING
+    """
+    cols = ['MRN'] + [col for col in COLS_DATES if col in df_demo.columns]
+    df = mrn_zero_pad(df=df_demo[cols].copy(), col_mrn='MRN')
+    df[COL_LAST_CONTACT_MISSING] = df[COL_LAST_CONTACT_DATE].isnull()
+    df = parse_date_columns(df=df, list_cols=cols[1:])
+
+    df[COL_OS_DATE] = df[COL_DEATH_DATE].fillna(df[COL_LAST_CONTACT_DATE])
+
+    return df
+
+
+def load_vital_status(obj_db: DatabricksAPI, table_demo: str = TABLE_DEMO, use_cache=None) -> pd.DataFrame:
+    """
+    Load the vital status table, building it from demographics on a cache miss.
+
+    Parameters
+    ----------
+    obj_db : DatabricksAPI
+        Databricks API object
+    table_demo : str, optional
+        Full table name of the demographics table
+    use_cache : bool, optional
+        Override the process-wide cache setting
+
+    Returns
+    -------
+    pd.DataFrame
+        Vital status with MRN, PT_BIRTH_DTE, PT_DEATH_DTE, PLA_LAST_CONTACT_DTE,
+        MRN_CREATE_DTE, OS_DATE and PLA_LAST_CONTACT_MISSING columns. A new frame, so callers may modify it.
+    """
+    def _build():
+        print('Loading %s' % table_demo)
+        df_demo = query_table(obj_db=obj_db, table_name=table_demo, columns=COLS_DEMO, use_cache=use_cache)
+        return build_vital_status(df_demo=df_demo)
+
+    df = derived_frame(
+        obj_db=obj_db,
+        table_name=table_demo,
+        name=f'vital_status_v{VITAL_STATUS_VERSION}',
+        build=_build,
+        use_cache=use_cache
+    )
+    print(f'  Vital status for {df.shape[0]} demographics rows')
+
+    return df
@@ -6,7 +6,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 import pandas as pd
 
 from msk_cdm.databricks import DatabricksAPI
-from lib.utils import cbioportal_update_config
+from lib.utils import cbioportal_update_config, table_cache
 from msk_cdm.data_processing import (
     mrn_zero_pad,
     convert_col_to_datetime
@@ -18,6 +18,8 @@ COL_P_ID = 'PATIENT_ID'
 TABLE_DEMO = 'cdsi_prod.cdm_impact_pipeline_prod.t01_epic_ddp_demographics'
 table_anchor_dates = 'cdsi_eng_phi.cdm_eng_cbioportal_etl.timeline_anchor_dates'
 COL_ANCHOR_DATE = 'DATE_TUMOR_SEQUENCING'
+COLS_DEMO = ['MRN', 'PT_DEATH_DTE', 'PLA_LAST_CONTACT_DTE']
+COLS_ANCHOR = ['MRN', 'DMP_ID', COL_ANCHOR_DATE]
 
 def _load_data(
     obj_db,
@@ -26,13 +28,11 @@ def _load_data(
 ):
     # Demographics from Databricks table
     print('Loading demographics table: %s' % table_demo)
-    sql = f"SELECT * FROM {table_demo}"
-    df_demo = obj_db.query_from_sql(sql=sql)
+    df_demo = table_cache.query_table(obj_db=obj_db, table_name=table_demo, columns=COLS_DEMO)
     df_demo = df_demo.drop_duplicates()
 
     # Pathology table for sequencing date (using get_anchor_dates which queries Databricks)
-    sql_anchor_dates = f"SELECT * FROM {table_anchor_dates}"
-    df_path_g = obj_db.query_from_sql(sql=sql_anchor_dates)
+    df_path_g = table_cache.query_table(obj_db=obj_db, table_name=table_anchor_dates, columns=COLS_ANCHOR)
     print(df_path_g.head())
 
     print('Data loaded')
@@ -148,8 +148,19 @@ def main():
         required=True,
         help="--location of Databricks environment file",
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     obj_yaml = cbioportal_update_config(fname_yaml_config=args.config_yaml)
     databricks_config = obj_yaml.config_dict.get('inputs_databricks', {})
     catalog = databricks_config.get('catalog', 'cdsi_prod')
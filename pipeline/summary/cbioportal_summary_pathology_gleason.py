@@ -12,6 +12,7 @@ from msk_cdm.databricks import DatabricksAPI
 
 COL_GLEASON = 'GLEASON_SCORE'
 RENAME_SAMPLE = {COL_GLEASON: 'GLEASON_SAMPLE_LEVEL'}
+COLS_GLEASON = ['MRN', 'SAMPLE_ID', 'START_DATE', COL_GLEASON]
 
 # Hardcoded table paths from databricks_config_pathology.yaml
 TABLE_GLEASON = 'cdsi_eng_phi.cdm_eng_pathology_report_segmentation.table_timeline_gleason_scores'
@@ -28,7 +29,8 @@ SUBDIRECTORY = 'cbioportal'
 def _load_data(obj_db, table_gleason):
     """Load Gleason data."""
     print(f'Loading {table_gleason}')
-    sql_gleason = f"SELECT * FROM {table_gleason}"
+    cols_str = ', '.join(COLS_GLEASON)
+    sql_gleason = f"SELECT {cols_str} FROM {table_gleason}"
     df_gleason = obj_db.query_from_sql(sql=sql_gleason)
     df_gleason['START_DATE'] = pd.to_datetime(df_gleason['START_DATE'], errors='coerce')
 
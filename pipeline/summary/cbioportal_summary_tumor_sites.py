@@ -31,6 +31,7 @@ from lib.utils import cbioportal_update_config, get_anchor_dates
 TABLE_PATH="cdsi_eng_phi.cdm_eng_rad_tumor_sites.table_timeline_radiology_tumor_sites_predictions"
 OUTPUT_TABLE="table_summary_radiology_tumor_sites_predictions"
 VOLUME_FNAME="table_summary_radiology_tumor_sites_predictions.tsv"
+COLS_TUMOR_SITES = ['MRN', 'TUMOR_SITE']
 
 
 # Mapping of tumor site names to standardized column names
@@ -122,7 +123,8 @@ class TumorSitesSummaryProcessor(object):
         ## Load tumor sites timeline table from Databricks
         table_name = self._table_path
         print('Loading %s' % table_name)
-        sql = f"SELECT * FROM {table_name}"
+        cols_str = ', '.join(COLS_TUMOR_SITES)
+        sql = f"SELECT {cols_str} FROM {table_name}"
         df1 = self._obj_databricks.query_from_sql(sql=sql)
         df = mrn_zero_pad(df=df1, col_mrn='MRN')
 
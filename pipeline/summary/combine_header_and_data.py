@@ -7,8 +7,9 @@ This script:
 1. Loads tall-format header from Script 3
 2. Transposes header to cBioPortal wide format (4 rows × N columns)
 3. Loads merged data from Script 2
-4. Combines header + data vertically
-5. Saves to BOTH Databricks volume and local filesystem
+4. Writes header rows + data to BOTH Databricks volume and local filesystem
+   (streamed in row chunks, see lib/summary/final_file_writer.py; the volume copy
+   is only streamed when the volume is mounted on this machine)
 
 The final format is:
     Row 0: Display labels (#Patient Identifier, Age at Sequencing, ...)
@@ -33,6 +34,9 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 import pandas as pd
 from msk_cdm.databricks import DatabricksAPI
 
+from lib.utils import intermediate_io
+from lib.summary.final_file_writer import write_final_file, DEFAULT_CHUNK_SIZE
+
 
 def transpose_header_to_wide(df_header_tall: pd.DataFrame) -> pd.DataFrame:
     """
@@ -154,6 +158,66 @@ def combine_header_and_data(
     return df_combined
 
 
+def save_final_file(
+    df_header_wide: pd.DataFrame,
+    df_data: pd.DataFrame,
+    output_volume_path: str,
+    output_local_path: str,
+    obj_db: DatabricksAPI,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+):
+    """
+    Write header rows + data to the Databricks volume and the local filesystem.
+
+    Same output as combine_header_and_data() followed by save_to_databricks() and
+    save_to_local(): the data is formatted in chunks of chunk_size rows and
+    written to both files. When the volume is not mounted on this machine, the
+    volume copy is still written from one combined DataFrame (see
+    write_final_file).
+
+    Parameters
+    ----------
+    df_header_wide : pd.DataFrame
+        Header in wide format (5 rows × N columns)
+    df_data : pd.DataFrame
+        Data (M rows × N columns)
+    output_volume_path : str
+        Databricks volume path
+    output_local_path : str
+        Local filesystem path
+    obj_db : DatabricksAPI
+        Databricks API object
+    chunk_size : int, optional
+        Data rows formatted at a time
+    """
+    print(f"\n{'='*80}")
+    print(f"WRITING HEADER AND DATA")
+    print(f"{'='*80}")
+    print(f"Header shape: {df_header_wide.shape}")
+    print(f"Data shape:   {df_data.shape}")
+    print(f"Volume path:  {output_volume_path}")
+    print(f"Local path:   {output_local_path}")
+
+    n_rows = write_final_file(
+        df_header_wide=df_header_wide,
+        data=df_data,
+        output_local_path=output_local_path,
+        output_volume_path=output_volume_path,
+        obj_db=obj_db,
+        chunk_size=chunk_size
+    )
+
+    print(f"✓ Saved to Databricks: {output_volume_path}")
+    print(f"✓ Saved to local filesystem: {output_local_path}")
+    print(f"  Header rows: {df_header_wide.shape[0]}")
+    print(f"  Data rows:   {n_rows}")
+    if os.path.exists(output_local_path):
+        file_size = os.path.getsize(output_local_path)
+        print(f"  File size: {file_size:,} bytes")
+    else:
+        print(f"  ⚠ WARNING: File not found after save!")
+
+
 def save_to_databricks(
     df_combined: pd.DataFrame,
     output_volume_path: str,
@@ -240,12 +304,12 @@ def main():
     parser.add_argument(
         "--header_volume_path",
         required=True,
-        help="Databricks volume path to header file from create_summary_header.py"
+        help="Path to header file from create_summary_header.py (volume TSV or local Parquet)"
     )
     parser.add_argument(
         "--data_volume_path",
         required=True,
-        help="Databricks volume path to merged data from merge_intermediate_summaries.py"
+        help="Path to merged data from merge_intermediate_summaries.py (volume TSV or local Parquet)"
     )
     parser.add_argument(
         "--databricks_env",
@@ -262,6 +326,12 @@ def main():
         required=True,
         help="Output local filesystem path for final combined file"
     )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Data rows formatted and written at a time (default: {DEFAULT_CHUNK_SIZE})"
+    )
 
     args = parser.parse_args()
 
@@ -279,7 +349,7 @@ def main():
 
     # Load tall-format header from Databricks
     print(f"Loading header from Databricks: {args.header_volume_path}")
-    df_header_tall = obj_db.read_db_obj(volume_path=args.header_volume_path, sep='\t')
+    df_header_tall = intermediate_io.read_intermediate(path=args.header_volume_path, obj_db=obj_db)
     print(f"  Header loaded: {df_header_tall.shape}")
     print(f"  Columns: {list(df_header_tall.columns)}")
 
@@ -288,25 +358,17 @@ def main():
 
     # Load data from Databricks
     print(f"\nLoading data from Databricks: {args.data_volume_path}")
-    df_data = obj_db.read_db_obj(volume_path=args.data_volume_path, sep='\t')
+    df_data = intermediate_io.read_intermediate(path=args.data_volume_path, obj_db=obj_db)
     print(f"  Data loaded: {df_data.shape}")
 
-    # Combine header + data
-    df_combined = combine_header_and_data(df_header_wide, df_data)
-
-    print(df_combined.head())
-
-    # Save to Databricks volume
-    save_to_databricks(
-        df_combined=df_combined,
+    # Write header + data to Databricks volume and local filesystem
+    save_final_file(
+        df_header_wide=df_header_wide,
+        df_data=df_data,
         output_volume_path=args.output_volume_path,
-        obj_db=obj_db
-    )
-
-    # Save to local filesystem
-    save_to_local(
-        df_combined=df_combined,
-        output_local_path=args.output_local_path
+        output_local_path=args.output_local_path,
+        obj_db=obj_db,
+        chunk_size=args.chunk_size
     )
 
     print(f"\n{'#'*80}")
@@ -314,7 +376,7 @@ def main():
     print(f"{'#'*80}")
     print(f"Databricks: {args.output_volume_path}")
     print(f"Local:      {args.output_local_path}")
-    print(f"Shape:      {df_combined.shape[0]} rows × {df_combined.shape[1]} columns")
+    print(f"Shape:      {df_header_wide.shape[0] + df_data.shape[0]} rows × {df_data.shape[1]} columns")
     print(f"            (5 header rows + {df_data.shape[0]} data rows)")
     print(f"{'#'*80}\n")
 
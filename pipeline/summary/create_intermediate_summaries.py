@@ -6,9 +6,13 @@ Script 1 of 4: Create intermediate summary files from YAML configurations.
 This script:
 1. Loads all YAML config files from a directory
 2. Filters by patient_or_sample level
-3. Processes each config to create intermediate TSV files (data only, no headers)
-4. Saves intermediates to Databricks volumes
-5. Creates a manifest CSV tracking all outputs
+3. Processes each config to create intermediate files (data only, no headers)
+4. Saves intermediates as Databricks volume TSVs (default) or local Parquet files
+5. Creates a manifest CSV tracking all outputs, plus a fingerprint CSV next to it
+
+With --incremental, configs whose YAML, source table version, anchor dates table
+version and template are unchanged since the last run are not re-queried; their
+previous intermediate files are reused in the manifest.
 
 Usage:
     python create_intermediate_summaries.py \
@@ -18,7 +22,9 @@ Usage:
         --patient_or_sample patient \
         --production_or_test test \
         --cohort mskimpact \
-        --output_manifest /Volumes/.../manifest_patient.csv
+        --output_manifest /Volumes/.../manifest_patient.csv \
+        --parallel 4 \
+        --incremental
 """
 import argparse
 import sys
@@ -26,10 +32,23 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import glob
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
 
 from lib.summary.summary_config_processor import SummaryConfigProcessor
+from lib.summary.source_table_reader import SourceTableReader, plan_source_queries
+from lib.summary.summary_fingerprint import (
+    FingerprintContext,
+    fingerprints_path,
+    load_fingerprints,
+    save_fingerprints
+)
+from lib.utils import constants, table_cache, intermediate_io
+from lib.utils.anchor_date_index import AnchorDateIndex
+from lib.utils.id_codec import IdCodec
 from msk_cdm.databricks import DatabricksAPI
 from msk_cdm.data_processing import mrn_zero_pad
 
@@ -37,7 +56,7 @@ from msk_cdm.data_processing import mrn_zero_pad
 def load_anchor_dates(
     table_name: str,
     obj_db: DatabricksAPI
-) -> pd.DataFrame:
+) -> AnchorDateIndex:
     """
     Load anchor dates from Databricks table.
 
@@ -50,13 +69,17 @@ def load_anchor_dates(
 
     Returns
     -------
-    pd.DataFrame
-        Anchor dates with columns: MRN, DMP_ID, DATE_TUMOR_SEQUENCING
+    AnchorDateIndex
+        Normalized anchor dates with columns: MRN, DMP_ID, DATE_TUMOR_SEQUENCING,
+        indexed once and shared by all summaries
     """
     print(f"Loading anchor dates from table: {table_name}")
 
-    sql = f"SELECT * FROM {table_name}"
-    df_anchor = obj_db.query_from_sql(sql=sql)
+    df_anchor = table_cache.query_table(
+        obj_db=obj_db,
+        table_name=table_name,
+        columns=constants.COLS_ANCHOR_DATES
+    )
 
     # Zero-pad MRN
     df_anchor = mrn_zero_pad(df=df_anchor, col_mrn='MRN')
@@ -69,7 +92,7 @@ def load_anchor_dates(
 
     print(f"  Loaded {df_anchor.shape[0]} anchor dates")
 
-    return df_anchor
+    return AnchorDateIndex(df_anchor, normalized=True)
 
 
 def load_template_from_local(fname_template: str, patient_or_sample: str) -> pd.DataFrame:
@@ -125,14 +148,150 @@ def load_template_from_local(fname_template: str, patient_or_sample: str) -> pd.
     return df_template
 
 
+class _ThreadOutput(io.TextIOBase):
+    """
+    sys.stdout/sys.stderr stand-in that sends each worker thread's output to its own buffer.
+
+    Threads without a buffer (e.g. the main thread) write to the original stream.
+    """
+
+    def __init__(self, stream, local):
+        self.stream = stream
+        self.local = local
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _process_config(
+    yaml_file: str,
+    fname_databricks_env: str,
+    df_anchor: AnchorDateIndex,
+    df_template: pd.DataFrame,
+    patient_or_sample: str,
+    production_or_test: str,
+    cohort: str,
+    save_intermediates: bool = True,
+    obj_db: Optional[DatabricksAPI] = None,
+    intermediate_format: str = intermediate_io.DEFAULT_INTERMEDIATE_FORMAT,
+    fingerprint_context: Optional[FingerprintContext] = None,
+    source_reader: Optional[SourceTableReader] = None,
+    codec: Optional[IdCodec] = None
+) -> Tuple[str, Optional[Dict], Optional[pd.DataFrame], Optional[Dict]]:
+    """
+    Process a single YAML config and save its intermediate file.
+
+    Returns
+    -------
+    Tuple[str, Optional[Dict], Optional[pd.DataFrame], Optional[Dict]]
+        Status ('processed', 'unchanged', 'skipped' or 'error'), manifest entry,
+        processed data (None if unchanged) and fingerprint record
+    """
+    yaml_basename = os.path.basename(yaml_file)
+    print(f"\n{'-'*80}")
+    print(f"Processing: {yaml_basename}")
+    print(f"{'-'*80}")
+
+    try:
+        # Create processor
+        processor = SummaryConfigProcessor(
+            fname_yaml_config=yaml_file,
+            fname_databricks_env=fname_databricks_env,
+            production_or_test=production_or_test,
+            cohort=cohort,
+            obj_db=obj_db,
+            source_reader=source_reader
+        )
+
+        # Check if this config matches the patient/sample level we're processing
+        config_patient_or_sample = processor.config.get('patient_or_sample', '')
+        if config_patient_or_sample != patient_or_sample:
+            print(f"  ⊘ Skipping (this is a '{config_patient_or_sample}' summary)")
+            return 'skipped', None, None, None
+
+        # Reuse the previous intermediate if none of the inputs changed
+        fingerprint_record = None
+        if fingerprint_context is not None:
+            fingerprint_record = fingerprint_context.fingerprint(
+                fname_yaml_config=yaml_file,
+                summary_id=processor.config['summary_id'],
+                source_table=processor.source_table
+            )
+            previous_path = fingerprint_context.previous_intermediate(fingerprint_record)
+            if previous_path is not None:
+                fingerprint_record['intermediate_data_path'] = previous_path
+                manifest_entry = {
+                    'summary_id': processor.config['summary_id'],
+                    'yaml_config_path': os.path.abspath(yaml_file),
+                    'intermediate_data_path': previous_path,
+                    'patient_or_sample': patient_or_sample
+                }
+                print(f"↺ Unchanged since last run, reusing: {previous_path}")
+                return 'unchanged', manifest_entry, None, fingerprint_record
+
+        # Process the summary
+        df_data = processor.process_summary(
+            df_anchor=df_anchor,
+            df_template=df_template,
+            codec=codec
+        )
+
+        # Save intermediate file (data only, no headers)
+        if save_intermediates:
+            volume_path = processor.save_intermediate(
+                df_data=df_data,
+                save_to_table=False,  # Intermediates not saved to tables
+                intermediate_format=intermediate_format
+            )
+        else:
+            volume_path = intermediate_io.intermediate_path(
+                volume_path=processor.volume_path,
+                intermediate_format=intermediate_format
+            )
+
+        # Create manifest entry
+        manifest_entry = {
+            'summary_id': processor.config['summary_id'],
+            'yaml_config_path': os.path.abspath(yaml_file),
+            'intermediate_data_path': volume_path,
+            'patient_or_sample': patient_or_sample
+        }
+
+        if fingerprint_record is not None:
+            fingerprint_record['intermediate_data_path'] = volume_path
+
+        print(f"✓ Successfully processed: {processor.config['summary_id']}")
+        return 'processed', manifest_entry, df_data, fingerprint_record
+
+    except Exception as e:
+        print(f"✗ ERROR processing {yaml_basename}:")
+        print(f"  {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return 'error', None, None, None
+
+
 def process_all_configs(
     config_dir: str,
     fname_databricks_env: str,
-    df_anchor: pd.DataFrame,
+    df_anchor: Union[AnchorDateIndex, pd.DataFrame],
     df_template: pd.DataFrame,
     patient_or_sample: str,
     production_or_test: str,
-    cohort: str
+    cohort: str,
+    save_intermediates: bool = True,
+    intermediates: Optional[Dict[str, pd.DataFrame]] = None,
+    parallel: int = 1,
+    obj_db: Optional[DatabricksAPI] = None,
+    intermediate_format: str = intermediate_io.DEFAULT_INTERMEDIATE_FORMAT,
+    fingerprint_context: Optional[FingerprintContext] = None,
+    fingerprint_records: Optional[List[Dict]] = None,
+    source_reader: Optional[SourceTableReader] = None,
+    codec: Optional[IdCodec] = None
 ) -> List[Dict]:
     """
     Process all YAML configs and create intermediate files.
@@ -143,8 +302,9 @@ def process_all_configs(
         Directory containing YAML config files
     fname_databricks_env : str
         Path to Databricks environment file
-    df_anchor : pd.DataFrame
-        Anchor dates for deidentification
+    df_anchor : AnchorDateIndex or pd.DataFrame
+        Anchor dates for deidentification. A DataFrame is normalized and indexed
+        once; the index is read-only and shared by all configs.
     df_template : pd.DataFrame
         Template with ID column
     patient_or_sample : str
@@ -153,6 +313,35 @@ def process_all_configs(
         'production' or 'test'
     cohort : str
         Cohort name
+    save_intermediates : bool, optional
+        Whether to save each intermediate file to its Databricks volume
+    intermediates : Dict[str, pd.DataFrame], optional
+        If given, each processed summary is also stored here, keyed by summary_id,
+        so an in-process caller can merge without reading the files back
+    parallel : int, optional
+        Number of configs to process concurrently on a thread pool. Each config
+        mostly waits on Databricks, so threads overlap the queries and volume writes.
+        Output is buffered per config and printed in sorted order.
+    obj_db : DatabricksAPI, optional
+        Databricks API object shared by all configs. If not given, each config
+        creates its own from fname_databricks_env.
+    intermediate_format : str, optional
+        'parquet' (local Parquet files, see lib.utils.intermediate_io) or 'tsv'
+        (Databricks volume TSVs)
+    fingerprint_context : FingerprintContext, optional
+        Incremental mode: configs whose fingerprint matches the previous run are
+        not processed and their previous intermediate is reused in the manifest.
+        Requires save_intermediates.
+    fingerprint_records : List[Dict], optional
+        If given (with fingerprint_context), the fingerprint record of every
+        processed or reused config is appended here, to be saved for the next run
+    source_reader : SourceTableReader, optional
+        Reader that queries each source table once for all configs using it (see
+        lib.summary.source_table_reader). If not given, one is planned from this
+        level's configs.
+    codec : IdCodec, optional
+        ID codec built from df_template, shared by all configs' template merges.
+        Built here if not given.
 
     Returns
     -------
@@ -172,69 +361,118 @@ def process_all_configs(
     print(f"Cohort: {cohort}")
     print(f"{'='*80}\n")
 
-    manifest_entries = []
-    processed_count = 0
-    skipped_count = 0
-    error_count = 0
-
-    for yaml_file in sorted(yaml_files):
-        yaml_basename = os.path.basename(yaml_file)
-        print(f"\n{'-'*80}")
-        print(f"Processing: {yaml_basename}")
-        print(f"{'-'*80}")
+    yaml_files = sorted(yaml_files)
 
-        try:
-            # Create processor
-            processor = SummaryConfigProcessor(
-                fname_yaml_config=yaml_file,
-                fname_databricks_env=fname_databricks_env,
-                production_or_test=production_or_test,
-                cohort=cohort
-            )
+    # Normalize and index the anchor dates once for all configs
+    df_anchor = AnchorDateIndex.from_frame(df_anchor)
 
-            # Check if this config matches the patient/sample level we're processing
-            config_patient_or_sample = processor.config.get('patient_or_sample', '')
-            if config_patient_or_sample != patient_or_sample:
-                print(f"  ⊘ Skipping (this is a '{config_patient_or_sample}' summary)")
-                skipped_count += 1
-                continue
-
-            # Process the summary
-            df_data = processor.process_summary(
-                df_anchor=df_anchor,
-                df_template=df_template
-            )
+    # Encode the template IDs once for all template merges
+    if codec is None:
+        codec = IdCodec([df_template])
 
-            # Save intermediate file (data only, no headers)
-            volume_path = processor.save_intermediate(
-                df_data=df_data,
-                save_to_table=False  # Intermediates not saved to tables
-            )
+    # Query each source table once, with the columns of all configs that use it
+    if source_reader is None:
+        plan = plan_source_queries(
+            yaml_files=yaml_files,
+            production_or_test=production_or_test,
+            levels=[patient_or_sample]
+        )
+        source_reader = SourceTableReader(
+            obj_db=obj_db if obj_db is not None else DatabricksAPI(fname_databricks_env=fname_databricks_env),
+            plan=plan
+        )
+    shared_tables = source_reader.shared_tables()
+    if shared_tables:
+        print(f"Source tables shared by several configs (queried once): {shared_tables}\n")
 
-            # Create manifest entry
-            manifest_entry = {
-                'summary_id': processor.config['summary_id'],
-                'yaml_config_path': os.path.abspath(yaml_file),
-                'intermediate_data_path': volume_path,
-                'patient_or_sample': patient_or_sample
-            }
-            manifest_entries.append(manifest_entry)
+    config_kwargs = dict(
+        fname_databricks_env=fname_databricks_env,
+        df_template=df_template,
+        patient_or_sample=patient_or_sample,
+        production_or_test=production_or_test,
+        cohort=cohort,
+        save_intermediates=save_intermediates,
+        obj_db=obj_db,
+        intermediate_format=intermediate_format,
+        fingerprint_context=fingerprint_context,
+        source_reader=source_reader,
+        codec=codec
+    )
+    results = {}
+
+    if parallel > 1:
+        print(f"Processing configs on {parallel} threads")
+        local = threading.local()
+
+        def run_config(yaml_file):
+            # Buffer this thread's output so configs do not interleave in the log
+            local.buffer = io.StringIO()
+            try:
+                # The anchor index is read-only, so all threads share it
+                result = _process_config(yaml_file, df_anchor=df_anchor, **config_kwargs)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                result = ('error', None, None, None)
+            finally:
+                log = local.buffer.getvalue()
+                local.buffer = None
+            return result, log
+
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = _ThreadOutput(stdout, local), _ThreadOutput(stderr, local)
+        try:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                futures = {executor.submit(run_config, yaml_file): yaml_file for yaml_file in yaml_files}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    print(f"Finished: {os.path.basename(futures[future])} ({len(results)}/{len(yaml_files)})")
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+
+        # Print each config's log in sorted order so the output reads like a serial run
+        for yaml_file in yaml_files:
+            print(results[yaml_file][1], end='')
+        results = {yaml_file: result for yaml_file, (result, _) in results.items()}
+    else:
+        for yaml_file in yaml_files:
+            results[yaml_file] = _process_config(yaml_file, df_anchor=df_anchor, **config_kwargs)
 
-            processed_count += 1
-            print(f"✓ Successfully processed: {processor.config['summary_id']}")
+    # Manifest entries in sorted config order, independent of completion order
+    manifest_entries = []
+    processed_count = 0
+    unchanged_count = 0
+    skipped_count = 0
+    error_count = 0
 
-        except Exception as e:
+    for yaml_file in yaml_files:
+        status, manifest_entry, df_data, fingerprint_record = results[yaml_file]
+        if status in ('processed', 'unchanged'):
+            manifest_entries.append(manifest_entry)
+            if fingerprint_records is not None and fingerprint_record is not None:
+                fingerprint_records.append(fingerprint_record)
+            if intermediates is not None:
+                if df_data is None:
+                    df_data = intermediate_io.read_intermediate(
+                        path=manifest_entry['intermediate_data_path'],
+                        obj_db=obj_db if obj_db is not None else DatabricksAPI(fname_databricks_env=fname_databricks_env)
+                    )
+                intermediates[manifest_entry['summary_id']] = df_data
+            if status == 'processed':
+                processed_count += 1
+            else:
+                unchanged_count += 1
+        elif status == 'skipped':
+            skipped_count += 1
+        else:
             error_count += 1
-            print(f"✗ ERROR processing {yaml_basename}:")
-            print(f"  {str(e)}")
-            import traceback
-            traceback.print_exc()
-            continue
 
     print(f"\n{'='*80}")
     print(f"PROCESSING COMPLETE")
     print(f"{'='*80}")
     print(f"Successfully processed: {processed_count}")
+    if fingerprint_context is not None:
+        print(f"Unchanged (reused):     {unchanged_count}")
     print(f"Skipped (wrong level):  {skipped_count}")
     print(f"Errors:                 {error_count}")
     print(f"{'='*80}\n")
@@ -325,9 +563,47 @@ def main():
         required=True,
         help="Databricks volume path where manifest CSV should be saved"
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of YAML configs to process concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--intermediate_format",
+        choices=intermediate_io.INTERMEDIATE_FORMATS,
+        default=intermediate_io.DEFAULT_INTERMEDIATE_FORMAT,
+        help="Format of the intermediate files: volume 'tsv' or local 'parquet' (default: tsv)"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="Reuse intermediates of configs whose YAML, source table, anchor dates and template "
+             "are unchanged since the last run. Run without it after code changes."
+    )
+    parser.add_argument(
+        "--fingerprints",
+        default=None,
+        help="Databricks volume path of the fingerprint CSV (default: next to the manifest)"
+    )
 
     args = parser.parse_args()
 
+    if args.parallel < 1:
+        parser.error("--parallel must be at least 1")
+
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     print(f"\n{'#'*80}")
     print(f"# INTERMEDIATE SUMMARY CREATOR")
     print(f"{'#'*80}")
@@ -338,6 +614,9 @@ def main():
     print(f"Production/Test:     {args.production_or_test}")
     print(f"Cohort:              {args.cohort}")
     print(f"Output manifest:     {args.output_manifest}")
+    print(f"Parallel:            {args.parallel}")
+    print(f"Intermediate format: {args.intermediate_format}")
+    print(f"Incremental:         {args.incremental}")
     print(f"{'#'*80}\n")
 
     # Initialize Databricks API
@@ -357,6 +636,20 @@ def main():
     )
     print()
 
+    # Fingerprints are recorded on every run; --incremental also compares them with the last run
+    fname_fingerprints = args.fingerprints or fingerprints_path(args.output_manifest)
+    fingerprint_context = FingerprintContext(
+        obj_db=obj_db,
+        anchor_table=args.anchor_dates,
+        df_template=df_template,
+        patient_or_sample=args.patient_or_sample,
+        production_or_test=args.production_or_test,
+        cohort=args.cohort,
+        intermediate_format=args.intermediate_format,
+        previous=load_fingerprints(obj_db=obj_db, path=fname_fingerprints) if args.incremental else None
+    )
+    fingerprint_records = []
+
     # Process all configs
     manifest_entries = process_all_configs(
         config_dir=args.config_dir,
@@ -365,7 +658,12 @@ def main():
         df_template=df_template,
         patient_or_sample=args.patient_or_sample,
         production_or_test=args.production_or_test,
-        cohort=args.cohort
+        cohort=args.cohort,
+        parallel=args.parallel,
+        obj_db=obj_db,
+        intermediate_format=args.intermediate_format,
+        fingerprint_context=fingerprint_context,
+        fingerprint_records=fingerprint_records
     )
 
     # Save manifest
@@ -375,6 +673,7 @@ def main():
             output_manifest=args.output_manifest,
             obj_db=obj_db
         )
+        save_fingerprints(obj_db=obj_db, path=fname_fingerprints, records=fingerprint_records)
     else:
         print("⚠ WARNING: No summaries were successfully processed. Manifest not created.")
         sys.exit(1)
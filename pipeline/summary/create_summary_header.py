@@ -5,7 +5,8 @@ Script 3 of 4: Create cBioPortal header from YAML configurations.
 
 This script:
 1. Loads the manifest CSV from Script 1
-2. Loads merged data from Script 2 to determine column order
+2. Loads the merged data columns from Script 2 to determine column order
+   (only the schema is read for Parquet intermediates)
 3. Extracts metadata from YAML configs
 4. Creates header in tall format (4 columns × N rows)
 5. Saves header to both Databricks volume and table
@@ -38,6 +39,8 @@ import pandas as pd
 from typing import List, Dict
 from msk_cdm.databricks import DatabricksAPI
 
+from lib.utils import intermediate_io
+
 
 def create_header_from_yamls(
     df_manifest: pd.DataFrame,
@@ -207,11 +210,15 @@ def save_header(
     output_catalog: str,
     output_schema: str,
     output_table: str,
-    obj_db: DatabricksAPI
-):
+    obj_db: DatabricksAPI,
+    intermediate_format: str = 'tsv'
+) -> str:
     """
     Save header to both Databricks volume and table.
 
+    With the 'parquet' intermediate format, a local Parquet copy is also written
+    for Script 4 to read.
+
     Parameters
     ----------
     df_header : pd.DataFrame
@@ -226,6 +233,13 @@ def save_header(
         Table name
     obj_db : DatabricksAPI
         Databricks API object
+    intermediate_format : str, optional
+        'parquet' or 'tsv' (see lib.utils.intermediate_io)
+
+    Returns
+    -------
+    str
+        Path Script 4 should read the header from
     """
     print(f"\n{'='*80}")
     print(f"SAVING HEADER")
@@ -259,6 +273,19 @@ def save_header(
     print(f"  Shape:  {df_header.shape}")
     print(f"  Columns: {list(df_header.columns)}")
 
+    if intermediate_format == 'tsv':
+        return output_volume_path
+
+    path = intermediate_io.write_intermediate(
+        df=df_header,
+        volume_path=output_volume_path,
+        obj_db=obj_db,
+        intermediate_format=intermediate_format
+    )
+    print(f"  {intermediate_format.capitalize()}: {path}")
+
+    return path
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -277,7 +304,7 @@ def main():
     parser.add_argument(
         "--merged_data_path",
         required=True,
-        help="Databricks volume path to merged data from merge_intermediate_summaries.py"
+        help="Path to merged data from merge_intermediate_summaries.py (volume TSV or local Parquet)"
     )
     parser.add_argument(
         "--patient_or_sample",
@@ -305,6 +332,12 @@ def main():
         required=True,
         help="Table name for header"
     )
+    parser.add_argument(
+        "--intermediate_format",
+        choices=intermediate_io.INTERMEDIATE_FORMATS,
+        default=intermediate_io.DEFAULT_INTERMEDIATE_FORMAT,
+        help="Also write the header as a local Parquet intermediate ('parquet') or only as TSV ('tsv', default)"
+    )
 
     args = parser.parse_args()
 
@@ -327,10 +360,10 @@ def main():
     print(f"  Manifest has {len(df_manifest)} entries\n")
 
     # Load merged data (to get column order)
-    print(f"Loading merged data: {args.merged_data_path}")
-    df_merged_data = obj_db.read_db_obj(volume_path=args.merged_data_path, sep='\t')
-    print(f"  Merged data shape: {df_merged_data.shape}")
-    print(f"  Columns: {list(df_merged_data.columns)}\n")
+    print(f"Loading merged data columns: {args.merged_data_path}")
+    merged_columns = intermediate_io.read_intermediate_columns(path=args.merged_data_path, obj_db=obj_db)
+    df_merged_data = pd.DataFrame(columns=merged_columns)
+    print(f"  Columns: {merged_columns}\n")
 
     # Create header from YAML configs
     df_header = create_header_from_yamls(
@@ -340,19 +373,20 @@ def main():
     )
 
     # Save header
-    save_header(
+    output_path = save_header(
         df_header=df_header,
         output_volume_path=args.output_volume_path,
         output_catalog=args.output_catalog,
         output_schema=args.output_schema,
         output_table=args.output_table,
-        obj_db=obj_db
+        obj_db=obj_db,
+        intermediate_format=args.intermediate_format
     )
 
     print(f"\n{'#'*80}")
     print(f"# HEADER CREATION COMPLETE")
     print(f"{'#'*80}")
-    print(f"Output: {args.output_volume_path}")
+    print(f"Output: {output_path}")
     print(f"Table:  {args.output_catalog}.{args.output_schema}.{args.output_table}")
     print(f"{'#'*80}\n")
 
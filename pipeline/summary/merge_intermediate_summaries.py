@@ -6,7 +6,7 @@ Script 2 of 4: Merge intermediate summary files into a single data file.
 This script:
 1. Loads the manifest CSV from Script 1
 2. Loads the template from local filesystem
-3. Merges all intermediate files horizontally (left join on ID column)
+3. Merges all intermediate files horizontally (left join on ID column, in one pass)
 4. Saves merged data to both Databricks volume and table
 
 Usage:
@@ -26,7 +26,13 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import pandas as pd
+from typing import Dict, Optional
+
 from msk_cdm.databricks import DatabricksAPI
+from lib.summary.aligned_merge import left_merge_all
+from lib.utils import intermediate_io
+from lib.utils.dtype_policy import apply_dtype_policy
+from lib.utils.id_codec import IdCodec
 
 
 def load_template_from_local(fname_template: str, patient_or_sample: str) -> pd.DataFrame:
@@ -86,7 +92,9 @@ def merge_intermediates(
     df_manifest: pd.DataFrame,
     df_template: pd.DataFrame,
     obj_db: DatabricksAPI,
-    patient_or_sample: str
+    patient_or_sample: str,
+    intermediates: Optional[Dict[str, pd.DataFrame]] = None,
+    codec: Optional[IdCodec] = None
 ) -> pd.DataFrame:
     """
     Merge all intermediate files horizontally.
@@ -101,6 +109,12 @@ def merge_intermediates(
         Databricks API object
     patient_or_sample : str
         'patient' or 'sample'
+    intermediates : Dict[str, pd.DataFrame], optional
+        In-memory intermediates keyed by summary_id. Summaries found here are
+        not read from their volume path.
+    codec : IdCodec, optional
+        ID codec built from df_template (e.g. the one used to create the
+        intermediates). Built here if not given.
 
     Returns
     -------
@@ -114,24 +128,30 @@ def merge_intermediates(
     # Initialize with template
     # Merge key is always the primary ID for this level
     merge_key = 'PATIENT_ID' if patient_or_sample == 'patient' else 'SAMPLE_ID'
-    df_merged = df_template.copy()
+    if codec is None:
+        codec = IdCodec([df_template])
 
     template_columns = ', '.join(df_template.columns)
-    print(f"Starting with template: {df_merged.shape[0]} rows, {df_merged.shape[1]} column(s) ({template_columns})")
+    print(f"Starting with template: {df_template.shape[0]} rows, {df_template.shape[1]} column(s) ({template_columns})")
     print(f"Merge key: {merge_key}")
 
-    # Merge each intermediate
+    # Load each intermediate
+    list_intermediates = []
     for idx, row in df_manifest.iterrows():
         summary_id = row['summary_id']
         data_path = row['intermediate_data_path']
 
-        print(f"\n[{idx + 1}/{len(df_manifest)}] Merging: {summary_id}")
+        print(f"\n[{idx + 1}/{len(df_manifest)}] Loading: {summary_id}")
         print(f"  Path: {data_path}")
 
         try:
             # Load intermediate data
-            df_intermediate = obj_db.read_db_obj(volume_path=data_path, sep='\t')
-            print(f"  Loaded: {df_intermediate.shape}")
+            if intermediates is not None and summary_id in intermediates:
+                df_intermediate = intermediates[summary_id]
+                print(f"  In memory: {df_intermediate.shape}")
+            else:
+                df_intermediate = intermediate_io.read_intermediate(path=data_path, obj_db=obj_db)
+                print(f"  Loaded: {df_intermediate.shape}")
 
             # Ensure merge key exists
             if merge_key not in df_intermediate.columns:
@@ -153,23 +173,25 @@ def merge_intermediates(
                 print(f"  Dropping redundant ID column(s) from intermediate: {redundant_id_cols}")
                 df_intermediate = df_intermediate.drop(columns=redundant_id_cols)
 
-            # Merge (left join from template)
-            before_cols = df_merged.shape[1]
-            df_merged = df_merged.merge(
-                right=df_intermediate,
-                how='left',
-                on=merge_key
-            )
-            after_cols = df_merged.shape[1]
-            new_cols = after_cols - before_cols
+            # Text columns as string[pyarrow] or categoricals, to keep the wide summary small
+            df_intermediate = apply_dtype_policy(df_intermediate)
 
-            print(f"  Added {new_cols} column(s)")
-            print(f"  Current shape: {df_merged.shape}")
+            list_intermediates.append(df_intermediate)
+            print(f"  Adds {df_intermediate.shape[1] - 1} column(s)")
 
         except Exception as e:
-            print(f"  ✗ ERROR merging {summary_id}: {str(e)}")
+            print(f"  ✗ ERROR loading {summary_id}: {str(e)}")
             continue
 
+    # Merge all intermediates onto the template (left join) in one pass
+    print(f"\nMerging {len(list_intermediates)} intermediate(s) on {merge_key}")
+    df_merged = left_merge_all(
+        df_template=df_template,
+        list_df=list_intermediates,
+        merge_key=merge_key,
+        codec=codec
+    )
+
     print(f"\n{'='*80}")
     print(f"MERGE COMPLETE")
     print(f"{'='*80}")
@@ -185,11 +207,15 @@ def save_merged_data(
     output_catalog: str,
     output_schema: str,
     output_table: str,
-    obj_db: DatabricksAPI
-):
+    obj_db: DatabricksAPI,
+    intermediate_format: str = 'tsv'
+) -> str:
     """
     Save merged data to both Databricks volume and table.
 
+    With the 'parquet' intermediate format, a local Parquet copy is also written
+    for the next pipeline steps to read.
+
     Parameters
     ----------
     df_merged : pd.DataFrame
@@ -204,6 +230,13 @@ def save_merged_data(
         Table name
     obj_db : DatabricksAPI
         Databricks API object
+    intermediate_format : str, optional
+        'parquet' or 'tsv' (see lib.utils.intermediate_io)
+
+    Returns
+    -------
+    str
+        Path the next steps should read the merged data from
     """
     print(f"\n{'='*80}")
     print(f"SAVING MERGED DATA")
@@ -235,6 +268,19 @@ def save_merged_data(
     print(f"  Table:  {output_catalog}.{output_schema}.{output_table}")
     print(f"  Shape:  {df_merged.shape}")
 
+    if intermediate_format == 'tsv':
+        return output_volume_path
+
+    path = intermediate_io.write_intermediate(
+        df=df_merged,
+        volume_path=output_volume_path,
+        obj_db=obj_db,
+        intermediate_format=intermediate_format
+    )
+    print(f"  {intermediate_format.capitalize()}: {path}")
+
+    return path
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -281,6 +327,12 @@ def main():
         required=True,
         help="Table name for merged data"
     )
+    parser.add_argument(
+        "--intermediate_format",
+        choices=intermediate_io.INTERMEDIATE_FORMATS,
+        default=intermediate_io.DEFAULT_INTERMEDIATE_FORMAT,
+        help="Also write the merged data as a local Parquet intermediate ('parquet') or only as TSV ('tsv', default)"
+    )
 
     args = parser.parse_args()
 
@@ -317,19 +369,20 @@ def main():
     )
 
     # Save merged data
-    save_merged_data(
+    output_path = save_merged_data(
         df_merged=df_merged,
         output_volume_path=args.output_volume_path,
         output_catalog=args.output_catalog,
         output_schema=args.output_schema,
         output_table=args.output_table,
-        obj_db=obj_db
+        obj_db=obj_db,
+        intermediate_format=args.intermediate_format
     )
 
     print(f"\n{'#'*80}")
     print(f"# MERGE COMPLETE")
     print(f"{'#'*80}")
-    print(f"Output: {args.output_volume_path}")
+    print(f"Output: {output_path}")
     print(f"Table:  {args.output_catalog}.{args.output_schema}.{args.output_table}")
     print(f"{'#'*80}\n")
 
@@ -7,7 +7,7 @@ import pandas as pd
 
 from msk_cdm.databricks import DatabricksAPI
 from msk_cdm.data_processing import mrn_zero_pad, set_debug_console
-from lib.utils import cbioportal_update_config, get_anchor_dates
+from lib.utils import cbioportal_update_config, get_anchor_dates, table_cache
 
 
 COLS_KEEP = ['MRN', 'AGE_LAST_FOLLOWUP', 'AGE_FIRST_CANCER_DIAGNOSIS', 'AGE_FIRST_SEQUENCING']
@@ -15,6 +15,9 @@ TABLE_DEMO = 'cdsi_prod.cdm_impact_pipeline_prod.t01_epic_ddp_demographics'
 TABLE_DX = 'cdsi_prod.cdm_idbw_impact_pipeline_prod.table_dx_impact_summary'
 table_anchor_dates = 'cdsi_eng_phi.cdm_eng_cbioportal_etl.timeline_anchor_dates'
 COL_ANCHOR_DATE = 'DATE_TUMOR_SEQUENCING'
+COLS_DEMO = ['MRN', 'PT_BIRTH_DTE', 'CURRENT_AGE_DEID']
+COLS_DX = ['MRN', 'DATE_AT_FIRST_ICDO_DX']
+COLS_ANCHOR = ['MRN', COL_ANCHOR_DATE]
 
 
 def convert_col_to_datetime(df, list_cols):
@@ -31,18 +34,17 @@ def _load_data(
 ):
     # Demographics from Databricks table
     print('Loading demographics table: %s' % table_demo)
-    sql_demo = f"SELECT * FROM {table_demo}"
-    df_demo = obj_db.query_from_sql(sql=sql_demo)
+    df_demo = table_cache.query_table(obj_db=obj_db, table_name=table_demo, columns=COLS_DEMO)
     df_demo = df_demo.drop_duplicates()
 
     # Pathology table for sequencing date
-    sql_anchor_dates = f"SELECT * FROM {table_anchor_dates}"
-    df_path_g = obj_db.query_from_sql(sql=sql_anchor_dates)
+    df_path_g = table_cache.query_table(obj_db=obj_db, table_name=table_anchor_dates, columns=COLS_ANCHOR)
     # df_path_g = get_anchor_dates(fname_databricks_env=fname_databricks_env)
 
     # Diagnosis from Databricks table
     print('Loading diagnosis table: %s' % table_dx)
-    sql_dx = f"SELECT * FROM {table_dx}"
+    cols_str_dx = ', '.join(COLS_DX)
+    sql_dx = f"SELECT {cols_str_dx} FROM {table_dx}"
     df_dx = obj_db.query_from_sql(sql=sql_dx)
 
     return df_demo, df_path_g, df_dx
@@ -171,8 +173,19 @@ def main():
         required=True,
         help="--location of Databricks environment file",
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     obj_yaml = cbioportal_update_config(fname_yaml_config=args.config_yaml)
     databricks_config = obj_yaml.config_dict.get('inputs_databricks', {})
     catalog = databricks_config.get('catalog', 'cdsi_prod')
@@ -25,6 +25,24 @@ Usage:
         --patient \
         --sample
 
+In-process mode (--in_process) runs the 4 steps as function calls in this process
+and passes DataFrames between them instead of re-reading each step's output from
+the Databricks volume. Intermediate, manifest, data and header files are still
+written as checkpoints unless --no_checkpoints is given; the final file is always
+written to both the volume and the local filesystem.
+
+Concurrent mode (--concurrent) runs the patient and sample pipelines at the same
+time in two forked processes. Anchor dates are loaded once in the wrapper (and
+shared with both pipelines in in-process mode, or served from the local table
+cache to the step scripts otherwise). Each pipeline writes its own log file in
+--log_dir; the logs are printed in order once both finish, and the wrapper exits
+non-zero if either pipeline failed.
+
+Intermediates are handed over as volume TSVs by default. --intermediate_format parquet
+(see lib/utils/intermediate_io.py) writes them as local Parquet files instead, which keeps
+dtypes between steps but puts PHI on local disk; the merged data and header are still
+saved to their volume paths and tables.
+
 File Structure:
     Databricks Volume:
     /Volumes/.../cbioportal/
@@ -43,10 +61,37 @@ File Structure:
     └── data_clinical_sample.txt
 """
 import argparse
+import glob
+import io
+import multiprocessing
 import subprocess
 import sys
 import os
 from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+from msk_cdm.databricks import DatabricksAPI
+
+from lib.utils import table_cache, intermediate_io
+from lib.utils.anchor_date_index import AnchorDateIndex
+from lib.utils.id_codec import IdCodec
+from lib.summary.source_table_reader import SourceTableReader, plan_source_queries
+from lib.summary.summary_fingerprint import (
+    FingerprintContext,
+    fingerprints_path,
+    load_fingerprints,
+    save_fingerprints
+)
+from create_intermediate_summaries import (
+    load_anchor_dates,
+    load_template_from_local,
+    process_all_configs,
+    save_manifest
+)
+from merge_intermediate_summaries import merge_intermediates, save_merged_data
+from create_summary_header import create_header_from_yamls, save_header
+from combine_header_and_data import transpose_header_to_wide, save_final_file
 
 
 def run_command(cmd: list, description: str):
@@ -86,6 +131,9 @@ def run_patient_pipeline(args):
     manifest_path = f"{args.output_dir_databricks}/intermediate_files/{args.cohort}/manifest_patient.csv"
     data_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_patient_data.txt"
     header_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_patient_header.txt"
+    # Where steps 3 and 4 read the merged data and header (local Parquet copies with --intermediate_format parquet)
+    data_read_path = intermediate_io.intermediate_path(data_path, intermediate_format=args.intermediate_format)
+    header_read_path = intermediate_io.intermediate_path(header_path, intermediate_format=args.intermediate_format)
     final_volume_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_patient.txt"
     final_local_path = f"{args.output_dir_local}/data_clinical_patient.txt"
 
@@ -99,8 +147,12 @@ def run_patient_pipeline(args):
         "--patient_or_sample", "patient",
         "--production_or_test", args.production_or_test,
         "--cohort", args.cohort,
-        "--output_manifest", manifest_path
+        "--output_manifest", manifest_path,
+        "--parallel", str(args.parallel),
+        "--intermediate_format", args.intermediate_format
     ]
+    if args.incremental:
+        cmd_step1.append("--incremental")
     run_command(cmd_step1, "Step 1: Create intermediate patient summaries")
 
     # Step 2: Merge intermediates
@@ -113,7 +165,8 @@ def run_patient_pipeline(args):
         "--output_volume_path", data_path,
         "--output_catalog", args.catalog,
         "--output_schema", args.schema,
-        "--output_table", f"data_clinical_patient_{args.cohort}_phi"
+        "--output_table", f"data_clinical_patient_{args.cohort}_phi",
+        "--intermediate_format", args.intermediate_format
     ]
     run_command(cmd_step2, "Step 2: Merge patient intermediates")
 
@@ -122,20 +175,21 @@ def run_patient_pipeline(args):
         "python", "pipeline/summary/create_summary_header.py",
         "--manifest", manifest_path,
         "--databricks_env", args.databricks_env,
-        "--merged_data_path", data_path,
+        "--merged_data_path", data_read_path,
         "--patient_or_sample", "patient",
         "--output_volume_path", header_path,
         "--output_catalog", args.catalog,
         "--output_schema", args.schema,
-        "--output_table", f"data_clinical_patient_header_{args.cohort}_phi"
+        "--output_table", f"data_clinical_patient_header_{args.cohort}_phi",
+        "--intermediate_format", args.intermediate_format
     ]
     run_command(cmd_step3, "Step 3: Create patient header")
 
     # Step 4: Combine header and data
     cmd_step4 = [
         "python", "pipeline/summary/combine_header_and_data.py",
-        "--header_volume_path", header_path,
-        "--data_volume_path", data_path,
+        "--header_volume_path", header_read_path,
+        "--data_volume_path", data_read_path,
         "--databricks_env", args.databricks_env,
         "--output_volume_path", final_volume_path,
         "--output_local_path", final_local_path
@@ -162,6 +216,9 @@ def run_sample_pipeline(args):
     manifest_path = f"{args.output_dir_databricks}/intermediate_files/{args.cohort}/manifest_sample.csv"
     data_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_sample_data.txt"
     header_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_sample_header.txt"
+    # Where steps 3 and 4 read the merged data and header (local Parquet copies with --intermediate_format parquet)
+    data_read_path = intermediate_io.intermediate_path(data_path, intermediate_format=args.intermediate_format)
+    header_read_path = intermediate_io.intermediate_path(header_path, intermediate_format=args.intermediate_format)
     final_volume_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_sample.txt"
     final_local_path = f"{args.output_dir_local}/data_clinical_sample.txt"
 
@@ -175,8 +232,12 @@ def run_sample_pipeline(args):
         "--patient_or_sample", "sample",
         "--production_or_test", args.production_or_test,
         "--cohort", args.cohort,
-        "--output_manifest", manifest_path
+        "--output_manifest", manifest_path,
+        "--parallel", str(args.parallel),
+        "--intermediate_format", args.intermediate_format
     ]
+    if args.incremental:
+        cmd_step1.append("--incremental")
     run_command(cmd_step1, "Step 1: Create intermediate sample summaries")
 
     # Step 2: Merge intermediates
@@ -189,7 +250,8 @@ def run_sample_pipeline(args):
         "--output_volume_path", data_path,
         "--output_catalog", args.catalog,
         "--output_schema", args.schema,
-        "--output_table", f"data_clinical_sample_{args.cohort}_phi"
+        "--output_table", f"data_clinical_sample_{args.cohort}_phi",
+        "--intermediate_format", args.intermediate_format
     ]
     run_command(cmd_step2, "Step 2: Merge sample intermediates")
 
@@ -198,20 +260,21 @@ def run_sample_pipeline(args):
         "python", "pipeline/summary/create_summary_header.py",
         "--manifest", manifest_path,
         "--databricks_env", args.databricks_env,
-        "--merged_data_path", data_path,
+        "--merged_data_path", data_read_path,
         "--patient_or_sample", "sample",
         "--output_volume_path", header_path,
         "--output_catalog", args.catalog,
         "--output_schema", args.schema,
-        "--output_table", f"data_clinical_sample_header_{args.cohort}_phi"
+        "--output_table", f"data_clinical_sample_header_{args.cohort}_phi",
+        "--intermediate_format", args.intermediate_format
     ]
     run_command(cmd_step3, "Step 3: Create sample header")
 
     # Step 4: Combine header and data
     cmd_step4 = [
         "python", "pipeline/summary/combine_header_and_data.py",
-        "--header_volume_path", header_path,
-        "--data_volume_path", data_path,
+        "--header_volume_path", header_read_path,
+        "--data_volume_path", data_read_path,
         "--databricks_env", args.databricks_env,
         "--output_volume_path", final_volume_path,
         "--output_local_path", final_local_path
@@ -226,6 +289,383 @@ def run_sample_pipeline(args):
     print(f"{'#'*80}\n")
 
 
+def as_read_from_volume(df: pd.DataFrame, intermediate_format: str = 'tsv', sep: str = '\t') -> pd.DataFrame:
+    """
+    Return a DataFrame as the next step would see it after reading back its intermediate.
+
+    With the 'tsv' format the subprocess pipeline hands data between steps as
+    delimited files, so every step sees pandas' read_csv type inference (e.g. empty
+    strings become NaN, integer columns with missing values become float).
+    Round-tripping through an in-memory buffer keeps the in-process output identical
+    to the subprocess output. Parquet intermediates keep dtypes, so only the
+    conversions applied when writing and reading them are needed.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Output of a pipeline step
+    intermediate_format : str, optional
+        'parquet' or 'tsv'
+    sep : str, optional
+        Delimiter used for the volume file
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame with the dtypes and values of the re-read file
+    """
+    if intermediate_format == 'parquet':
+        return intermediate_io.as_read_from_parquet(df)
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, sep=sep, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer, sep=sep)
+
+
+def plan_source_reader(args, levels: list, tables: dict = None) -> SourceTableReader:
+    """
+    Plan one source table reader for the summary configs of several levels.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed wrapper arguments
+    levels : list
+        Levels the reader serves, e.g. ['patient', 'sample']
+    tables : dict, optional
+        Source tables already queried (see prefetch_shared_tables)
+
+    Returns
+    -------
+    SourceTableReader
+        Reader that queries each source table once across all levels, with its
+        own Databricks connection
+    """
+    yaml_files = sorted(glob.glob(os.path.join(args.config_dir, '*.yaml')))
+    plan = plan_source_queries(
+        yaml_files=yaml_files,
+        production_or_test=args.production_or_test,
+        levels=levels
+    )
+
+    return SourceTableReader(obj_db=DatabricksAPI(fname_databricks_env=args.databricks_env), plan=plan, tables=tables)
+
+
+def prefetch_shared_tables(args, levels: list) -> dict:
+    """
+    Query the source tables read by summary configs of several levels.
+
+    Used before forking one process per level: only the returned frames are
+    passed to the processes, which each build their own reader and Databricks
+    connection (see plan_source_reader).
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed wrapper arguments
+    levels : list
+        Levels to run, e.g. ['patient', 'sample']
+
+    Returns
+    -------
+    dict
+        DataFrame of each shared source table, with the columns of all levels
+    """
+    source_reader = plan_source_reader(args, levels=levels)
+    source_reader.prefetch(tables_shared_across_levels(args, levels=levels))
+
+    return source_reader.loaded_tables()
+
+
+def tables_shared_across_levels(args, levels: list) -> list:
+    """Return the source tables read by summary configs of more than one level."""
+    yaml_files = sorted(glob.glob(os.path.join(args.config_dir, '*.yaml')))
+    list_tables = [
+        set(plan_source_queries(yaml_files=yaml_files, production_or_test=args.production_or_test, levels=[level]))
+        for level in levels
+    ]
+
+    return sorted(table for table in set.union(*list_tables) if sum(table in tables for tables in list_tables) > 1)
+
+
+def run_pipeline_in_process(
+    args,
+    patient_or_sample: str,
+    df_anchor: AnchorDateIndex = None,
+    source_reader: SourceTableReader = None
+):
+    """
+    Run the complete pipeline for one level in this process.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed wrapper arguments
+    patient_or_sample : str
+        'patient' or 'sample'
+    df_anchor : AnchorDateIndex, optional
+        Indexed anchor dates from load_anchor_dates. Loaded here if not given.
+    source_reader : SourceTableReader, optional
+        Source table reader shared with the other level (see plan_source_reader).
+        Planned for this level only if not given.
+    """
+    level = patient_or_sample
+    print(f"\n{'#'*80}")
+    print(f"# {level.upper()} SUMMARY PIPELINE (IN-PROCESS)")
+    print(f"{'#'*80}\n")
+
+    save_checkpoints = not args.no_checkpoints
+    fname_template = args.template_patient if level == 'patient' else args.template_sample
+
+    # Define paths
+    # Intermediates: {base}/intermediate_files/{cohort}/
+    # Finals: {base}/{cohort}/
+    manifest_path = f"{args.output_dir_databricks}/intermediate_files/{args.cohort}/manifest_{level}.csv"
+    data_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_{level}_data.txt"
+    header_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_{level}_header.txt"
+    final_volume_path = f"{args.output_dir_databricks}/{args.cohort}/data_clinical_{level}.txt"
+    final_local_path = f"{args.output_dir_local}/data_clinical_{level}.txt"
+
+    obj_db = DatabricksAPI(fname_databricks_env=args.databricks_env)
+
+    # Step 1: Create intermediates
+    print(f"\n{'='*80}")
+    print(f"RUNNING: Step 1: Create intermediate {level} summaries")
+    print(f"{'='*80}")
+    if df_anchor is None:
+        df_anchor = load_anchor_dates(table_name=args.anchor_dates, obj_db=obj_db)
+    df_template = load_template_from_local(fname_template=fname_template, patient_or_sample=level)
+    # Template IDs encoded once for the template merges of both steps
+    codec = IdCodec([df_template])
+    fingerprint_context = None
+    fingerprint_records = []
+    if save_checkpoints:
+        fingerprint_context = FingerprintContext(
+            obj_db=obj_db,
+            anchor_table=args.anchor_dates,
+            df_template=df_template,
+            patient_or_sample=level,
+            production_or_test=args.production_or_test,
+            cohort=args.cohort,
+            intermediate_format=args.intermediate_format,
+            previous=load_fingerprints(obj_db=obj_db, path=fingerprints_path(manifest_path)) if args.incremental else None
+        )
+    intermediates = {}
+    manifest_entries = process_all_configs(
+        config_dir=args.config_dir,
+        fname_databricks_env=args.databricks_env,
+        df_anchor=df_anchor,
+        df_template=df_template,
+        patient_or_sample=level,
+        production_or_test=args.production_or_test,
+        cohort=args.cohort,
+        save_intermediates=save_checkpoints,
+        intermediates=intermediates,
+        parallel=args.parallel,
+        obj_db=obj_db,
+        intermediate_format=args.intermediate_format,
+        fingerprint_context=fingerprint_context,
+        fingerprint_records=fingerprint_records,
+        source_reader=source_reader,
+        codec=codec
+    )
+    if not manifest_entries:
+        print(f"\n✗ ERROR: No {level} summaries were successfully processed")
+        sys.exit(1)
+    df_manifest = pd.DataFrame(manifest_entries)
+    if save_checkpoints:
+        save_manifest(manifest_entries=manifest_entries, output_manifest=manifest_path, obj_db=obj_db)
+        save_fingerprints(obj_db=obj_db, path=fingerprints_path(manifest_path), records=fingerprint_records)
+
+    # Step 2: Merge intermediates
+    print(f"\n{'='*80}")
+    print(f"RUNNING: Step 2: Merge {level} intermediates")
+    print(f"{'='*80}")
+    intermediates = {
+        summary_id: as_read_from_volume(df_intermediate, intermediate_format=args.intermediate_format)
+        for summary_id, df_intermediate in intermediates.items()
+    }
+    df_merged = merge_intermediates(
+        df_manifest=df_manifest,
+        df_template=df_template,
+        obj_db=obj_db,
+        patient_or_sample=level,
+        intermediates=intermediates,
+        codec=codec
+    )
+    if save_checkpoints:
+        save_merged_data(
+            df_merged=df_merged,
+            output_volume_path=data_path,
+            output_catalog=args.catalog,
+            output_schema=args.schema,
+            output_table=f"data_clinical_{level}_{args.cohort}_phi",
+            obj_db=obj_db,
+            intermediate_format=args.intermediate_format
+        )
+    df_merged = as_read_from_volume(df_merged, intermediate_format=args.intermediate_format)
+
+    # Step 3: Create header
+    print(f"\n{'='*80}")
+    print(f"RUNNING: Step 3: Create {level} header")
+    print(f"{'='*80}")
+    df_header = create_header_from_yamls(
+        df_manifest=df_manifest,
+        df_merged_data=df_merged,
+        patient_or_sample=level
+    )
+    if save_checkpoints:
+        save_header(
+            df_header=df_header,
+            output_volume_path=header_path,
+            output_catalog=args.catalog,
+            output_schema=args.schema,
+            output_table=f"data_clinical_{level}_header_{args.cohort}_phi",
+            obj_db=obj_db,
+            intermediate_format=args.intermediate_format
+        )
+    df_header = as_read_from_volume(df_header, intermediate_format=args.intermediate_format)
+
+    # Step 4: Combine header and data
+    print(f"\n{'='*80}")
+    print(f"RUNNING: Step 4: Combine {level} header and data")
+    print(f"{'='*80}")
+    df_header_wide = transpose_header_to_wide(df_header_tall=df_header)
+    save_final_file(
+        df_header_wide=df_header_wide,
+        df_data=df_merged,
+        output_volume_path=final_volume_path,
+        output_local_path=final_local_path,
+        obj_db=obj_db
+    )
+
+    print(f"\n{'#'*80}")
+    print(f"# {level.upper()} PIPELINE COMPLETE")
+    print(f"{'#'*80}")
+    print(f"Databricks: {final_volume_path}")
+    print(f"Local:      {final_local_path}")
+    print(f"{'#'*80}\n")
+
+
+def run_pipeline(
+    args,
+    patient_or_sample: str,
+    df_anchor: AnchorDateIndex = None,
+    source_reader: SourceTableReader = None
+):
+    """Run the complete pipeline for one level, in-process or as step subprocesses."""
+    if args.in_process:
+        run_pipeline_in_process(
+            args,
+            patient_or_sample=patient_or_sample,
+            df_anchor=df_anchor,
+            source_reader=source_reader
+        )
+    elif patient_or_sample == 'patient':
+        run_patient_pipeline(args)
+    else:
+        run_sample_pipeline(args)
+
+
+def _run_pipeline_logged(
+    args,
+    patient_or_sample: str,
+    fname_log: str,
+    df_anchor: AnchorDateIndex = None,
+    source_tables: dict = None
+):
+    """
+    Process entry point for concurrent mode: run one level with its output sent to a log file.
+
+    stdout and stderr are redirected at the file descriptor level so the step
+    subprocesses write to the same log. In-process pipelines get a new source
+    table reader and Databricks connection here, seeded with the tables the
+    parent prefetched (source_tables).
+    """
+    with open(fname_log, 'w') as f:
+        os.dup2(f.fileno(), sys.stdout.fileno())
+        os.dup2(f.fileno(), sys.stderr.fileno())
+    # Keep our prints ordered with the output of the step subprocesses
+    sys.stdout.reconfigure(line_buffering=True)
+    sys.stderr.reconfigure(line_buffering=True)
+
+    source_reader = None
+    if args.in_process:
+        source_reader = plan_source_reader(args, levels=[patient_or_sample], tables=source_tables)
+
+    run_pipeline(args, patient_or_sample=patient_or_sample, df_anchor=df_anchor, source_reader=source_reader)
+
+
+def run_pipelines_concurrently(args, levels: list) -> dict:
+    """
+    Run the pipelines for several levels at the same time in forked processes.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed wrapper arguments
+    levels : list
+        Levels to run, e.g. ['patient', 'sample']
+
+    Returns
+    -------
+    dict
+        Exit code of each level's pipeline (0 on success)
+    """
+    print(f"\n{'='*80}")
+    print(f"RUNNING CONCURRENTLY: {', '.join(levels)}")
+    print(f"{'='*80}")
+
+    # Load anchor dates once. In-process pipelines inherit the index through fork;
+    # step scripts read it from the local table cache.
+    df_anchor = None
+    if args.in_process or table_cache.cache_enabled():
+        df_anchor = load_anchor_dates(
+            table_name=args.anchor_dates,
+            obj_db=DatabricksAPI(fname_databricks_env=args.databricks_env)
+        )
+
+    # Source tables used by configs of several levels are also queried once before forking.
+    # Only the frames are passed on: no Databricks connection is shared with the processes.
+    source_tables = None
+    if args.in_process:
+        source_tables = prefetch_shared_tables(args, levels=levels)
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    ctx = multiprocessing.get_context('fork')
+    processes = {}
+    logs = {}
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for level in levels:
+        logs[level] = os.path.join(args.log_dir, f"summary_pipeline_{level}_{args.cohort}.log")
+        processes[level] = ctx.Process(
+            target=_run_pipeline_logged,
+            args=(args, level, logs[level], df_anchor if args.in_process else None, source_tables),
+            name=f"summary_{level}"
+        )
+        processes[level].start()
+        print(f"Started {level} pipeline (pid {processes[level].pid}), log: {logs[level]}")
+
+    exit_codes = {}
+    for level in levels:
+        processes[level].join()
+        exit_codes[level] = processes[level].exitcode
+        status = "✓ completed" if exit_codes[level] == 0 else f"✗ failed with exit code {exit_codes[level]}"
+        print(f"{level.capitalize()} pipeline {status}")
+
+    # Print each pipeline's log in order so the output reads like a serial run
+    for level in levels:
+        print(f"\n{'='*80}")
+        print(f"LOG: {level} pipeline ({logs[level]})")
+        print(f"{'='*80}")
+        with open(logs[level], 'r') as f:
+            print(f.read(), end='')
+
+    return exit_codes
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Wrapper for modular cBioPortal summary pipeline",
@@ -308,6 +748,57 @@ def main():
         help="Process sample summaries"
     )
 
+    # Execution mode
+    parser.add_argument(
+        "--in_process",
+        "--in-process",
+        action="store_true",
+        dest="in_process",
+        default=False,
+        help="Run the 4 steps in this process, passing data in memory instead of through volume files"
+    )
+    parser.add_argument(
+        "--no_checkpoints",
+        "--no-checkpoints",
+        action="store_true",
+        dest="no_checkpoints",
+        default=False,
+        help="With --in_process, skip writing the intermediate, manifest, data and header files and tables"
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of YAML configs processed concurrently in step 1 (default: 1)"
+    )
+    parser.add_argument(
+        "--intermediate_format",
+        choices=intermediate_io.INTERMEDIATE_FORMATS,
+        default=intermediate_io.DEFAULT_INTERMEDIATE_FORMAT,
+        help="Format of the PHI intermediates handed between steps: volume 'tsv' (default) or local "
+             "'parquet' (keeps dtypes, writes PHI to local disk). The final cBioPortal files are always TSV."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="Step 1 reuses intermediates of summaries whose YAML, source table, anchor dates and "
+             "template are unchanged since the last run"
+    )
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        dest="concurrent",
+        default=False,
+        help="Run the patient and sample pipelines at the same time, each with its own log file"
+    )
+    parser.add_argument(
+        "--log_dir",
+        dest="log_dir",
+        default=".",
+        help="Directory for the per-pipeline log files written with --concurrent (default: current directory)"
+    )
+
     args = parser.parse_args()
 
     # Validate inputs
@@ -320,6 +811,15 @@ def main():
     if args.sample and not args.template_sample:
         parser.error("--template_sample is required when using --sample")
 
+    if args.no_checkpoints and not args.in_process:
+        parser.error("--no_checkpoints requires --in_process")
+
+    if args.incremental and args.no_checkpoints:
+        parser.error("--incremental reuses saved intermediates and cannot be used with --no_checkpoints")
+
+    if args.parallel < 1:
+        parser.error("--parallel must be at least 1")
+
     # Print configuration
     print(f"\n{'#'*80}")
     print(f"# MODULAR SUMMARY PIPELINE WRAPPER")
@@ -335,14 +835,28 @@ def main():
     print(f"Output (Local):      {args.output_dir_local}")
     print(f"Process patient:     {args.patient}")
     print(f"Process sample:      {args.sample}")
+    print(f"In-process:          {args.in_process}")
+    print(f"Checkpoints:         {not args.no_checkpoints}")
+    print(f"Concurrent:          {args.concurrent}")
+    print(f"Parallel configs:    {args.parallel}")
+    print(f"Intermediate format: {args.intermediate_format}")
+    print(f"Incremental:         {args.incremental}")
     print(f"{'#'*80}\n")
 
-    # Run pipelines
-    if args.patient:
-        run_patient_pipeline(args)
+    levels = [level for level, selected in [('patient', args.patient), ('sample', args.sample)] if selected]
 
-    if args.sample:
-        run_sample_pipeline(args)
+    # Run pipelines
+    if args.concurrent and len(levels) > 1:
+        exit_codes = run_pipelines_concurrently(args, levels=levels)
+        failed = [level for level in levels if exit_codes[level] != 0]
+        if failed:
+            print(f"\n✗ ERROR: {', '.join(failed)} pipeline(s) failed")
+            sys.exit(1)
+    else:
+        # In-process levels share one reader, so a source table used by both is queried once
+        source_reader = plan_source_reader(args, levels=levels) if args.in_process else None
+        for level in levels:
+            run_pipeline(args, patient_or_sample=level, source_reader=source_reader)
 
     # Final summary
     print(f"\n{'#'*80}")
@@ -3,14 +3,46 @@ cbioportal_timeline_batch_deidentify.py
 
 Batch wrapper script to execute timeline deidentification for all timeline files.
 Reads timeline configurations from YAML files in config/timelines/ directory.
+
+By default each timeline is run as a separate cbioportal_timeline_deidentify.py
+subprocess. With --in_process, the sample list, OS dates and anchor dates are
+loaded once and each timeline is deidentified with a function call instead.
+With --workers N, up to N timelines run at once in a forked process pool. It
+implies --in_process: the reference frames are loaded in the parent before
+forking so workers share them instead of re-querying Databricks.
+With --engine=sql, each timeline is deidentified by a single Databricks SQL query
+against a cohort sample table staged once for the batch. That engine writes the
+deidentified GPFS files only: no PHI files or tables are written.
+With --partitions N (or `partitions: N` in a timeline's YAML), timelines are read
+and deidentified in N MRN-hash partitions to bound memory.
 """
 import os
 import sys
 import argparse
+import io
 import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
 from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
 import yaml
 
+from lib.utils import table_cache
+from lib.utils.cohort_filter import COHORT_FILTER_MODES
+from cbioportal_timeline_deidentify import (
+    DEID_ENGINES,
+    build_id_codec,
+    deidentify_timeline,
+    deidentify_timeline_sql,
+    load_anchor_dates,
+    load_reference_frames,
+    load_sample_list,
+    stage_cohort_mrns,
+    stage_cohort_samples
+)
+
 
 def load_timeline_configs(config_dir, production_or_test):
     """
@@ -32,6 +64,7 @@ def load_timeline_configs(config_dir, production_or_test):
         - output_filename
         - columns (list)
         - patient_or_sample
+        - partitions (optional, None if not set)
     """
     config_path = Path(config_dir)
     if not config_path.exists():
@@ -66,15 +99,158 @@ def load_timeline_configs(config_dir, production_or_test):
                 'columns': list(config['columns'].keys()),  # Extract column names
                 'patient_or_sample': config['patient_or_sample'],
                 'catalog': catalog,
-                'schema': schema
+                'schema': schema,
+                'partitions': config.get('partitions')
             }
             configs.append(etl_config)
 
     print(f"Loaded {len(configs)} timeline configurations from {config_dir}")
     return configs
 
+# Reference frames shared with forked workers (populated before the pool starts)
+_SHARED_FRAMES = {
+    'df_samples_used': None,
+    'df_os': None,
+    'df_anchor': None,
+    'codec': None
+}
 
-def run_timeline_deidentification(config_dir, production_or_test, fname_dbx, anchor_dates, fname_sample, volume_base_path, gpfs_output_path, cohort_name):
+
+def _run_timeline_job(job):
+    """
+    Deidentify a single timeline, either in this process or as a subprocess.
+
+    Parameters
+    ----------
+    job : dict
+        Timeline job built by run_timeline_deidentification
+
+    Returns
+    -------
+    bool
+        True if the timeline was processed successfully
+    """
+    timeline_id = job['timeline_id']
+
+    print(f"\n[{job['idx']}/{job['total']}] Processing: {timeline_id}")
+    print("-" * 80)
+
+    # Build command arguments
+    cmd = [
+        "python",
+        job['deidentify_script'],
+        f"--fname_dbx={job['fname_dbx']}",
+        f"--fname_deid={job['anchor_dates']}",
+        f"--fname_timeline={job['source_table']}",
+        f"--fname_sample={job['fname_sample']}",
+        f"--fname_output_gpfs={job['fname_output_gpfs']}",
+        f"--columns_cbio={','.join(job['columns'])}",
+        f"--merge_level={job['patient_or_sample']}",  # Always pass merge_level
+        f"--catalog={job['catalog']}",
+        f"--schema={job['schema']}",
+        f"--cohort_filter={job['cohort_filter']}",
+        f"--engine={job['engine']}",
+        f"--partitions={job['partitions']}"
+    ]
+    # PHI outputs are only configured for the pandas engine
+    if job['fname_output_volume'] is not None:
+        cmd.append(f"--fname_output_volume={job['fname_output_volume']}")
+    if job['table_name'] is not None:
+        cmd.append(f"--table_name={job['table_name']}")
+    if job['cohort_table'] is not None:
+        cmd.append(f"--cohort_table={job['cohort_table']}")
+    if job['sample_table'] is not None:
+        cmd.append(f"--sample_table={job['sample_table']}")
+
+    print(f"Source table: {job['source_table']}")
+    if job['fname_output_volume'] is not None:
+        print(f"Output volume (PHI): {job['fname_output_volume']}")
+        print(f"Output table (PHI): {job['catalog']}.{job['schema']}.{job['table_name']}")
+    else:
+        print("Output PHI: not written (--engine=sql)")
+    print(f"Output GPFS (DEID): {job['fname_output_gpfs']}")
+    print(f"Merge level: {job['patient_or_sample']}")
+    if job['partitions'] > 1:
+        print(f"Partitions: {job['partitions']}")
+    print()
+
+    success = False
+    try:
+        if job['in_process'] and job['engine'] == 'sql':
+            deidentify_timeline_sql(
+                fname_dbx=job['fname_dbx'],
+                fname_timeline=job['source_table'],
+                sample_table=job['sample_table'],
+                fname_output_gpfs=job['fname_output_gpfs'],
+                list_cols_cbio_timeline=job['columns'],
+                merge_level=job['patient_or_sample'],
+                fname_deid=job['anchor_dates']
+            )
+        elif job['in_process']:
+            deidentify_timeline(
+                fname_dbx=job['fname_dbx'],
+                fname_timeline=job['source_table'],
+                df_samples_used=_SHARED_FRAMES['df_samples_used'],
+                df_os=_SHARED_FRAMES['df_os'],
+                df_anchor=_SHARED_FRAMES['df_anchor'],
+                fname_output_volume=job['fname_output_volume'],
+                fname_output_gpfs=job['fname_output_gpfs'],
+                list_cols_cbio_timeline=job['columns'],
+                merge_level=job['patient_or_sample'],
+                catalog=job['catalog'],
+                schema=job['schema'],
+                table_name=job['table_name'],
+                cohort_filter=job['cohort_filter'],
+                cohort_table=job['cohort_table'],
+                partitions=job['partitions'],
+                codec=_SHARED_FRAMES['codec']
+            )
+        else:
+            # Run the deidentification script
+            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            print(result.stdout)
+            if result.stderr:
+                print("STDERR:", result.stderr)
+        success = True
+        print(f"✓ Successfully processed: {timeline_id}")
+    except subprocess.CalledProcessError as e:
+        print(f"✗ FAILED to process: {timeline_id}")
+        print(f"Error code: {e.returncode}")
+        print(f"STDOUT: {e.stdout}")
+        print(f"STDERR: {e.stderr}")
+    except Exception as e:
+        print(f"✗ FAILED to process: {timeline_id}")
+        print(f"Error: {str(e)}")
+
+    print("-" * 80)
+
+    return success
+
+
+def _run_timeline_job_captured(job):
+    """
+    Pool entry point: run a timeline job and return its output as text.
+
+    Output is buffered per job so that concurrent timelines do not interleave
+    in the batch log.
+
+    Parameters
+    ----------
+    job : dict
+        Timeline job built by run_timeline_deidentification
+
+    Returns
+    -------
+    tuple of (bool, str)
+        Success flag and the captured job log
+    """
+    buffer = io.StringIO()
+    with redirect_stdout(buffer), redirect_stderr(buffer):
+        success = _run_timeline_job(job)
+    return success, buffer.getvalue()
+
+
+def run_timeline_deidentification(config_dir, production_or_test, fname_dbx, anchor_dates, fname_sample, volume_base_path, gpfs_output_path, cohort_name, in_process=False, workers=1, cohort_filter='none', engine='pandas', partitions=1):
     """
     Run timeline deidentification for all configured timeline files.
 
@@ -96,8 +272,30 @@ def run_timeline_deidentification(config_dir, production_or_test, fname_dbx, anc
         Base path for GPFS output files
     cohort_name : str
         Name of the cohort (e.g., 'mskimpact', 'mskimpact_heme')
+    in_process : bool
+        If True, load the shared reference frames once and deidentify each
+        timeline in this process instead of spawning a subprocess per timeline
+    workers : int
+        Number of timelines to process concurrently. Values above 1 run the
+        jobs in a forked process pool and imply in_process, so workers share
+        the reference frames loaded in the parent
+    cohort_filter : str
+        How to restrict timeline queries to the cohort's patients: 'none',
+        'in_list' (chunked MRN IN lists) or 'staged' (one staged cohort MRN
+        table shared by all timelines)
+    engine : str
+        'pandas', or 'sql' to deidentify each timeline with one Databricks SQL
+        query (deidentified GPFS output only, no PHI volume copy)
+    partitions : int
+        Number of MRN-hash partitions per timeline for the pandas engine,
+        unless set by a timeline's `partitions` YAML key
     """
 
+    # Subprocess workers would each query the reference tables again
+    if workers > 1 and not in_process:
+        print(f"⚠ --workers={workers} runs timelines in process so workers share the reference frames")
+        in_process = True
+
     # Load timeline configurations from YAML files
     timeline_configs = load_timeline_configs(config_dir, production_or_test)
 
@@ -123,23 +321,66 @@ def run_timeline_deidentification(config_dir, production_or_test, fname_dbx, anc
     print(f"Volume base path: {volume_path_full}")
     print(f"GPFS output path: {gpfs_output_path}")
     print(f"Cohort: {cohort_name}")
+    print(f"Mode: {'in-process' if in_process else 'subprocess'}")
+    print(f"Workers: {workers}")
+    print(f"Cohort filter: {cohort_filter}")
+    print(f"Engine: {engine}")
+    print(f"Partitions: {partitions}")
     print("=" * 80)
     print()
 
-    successful = []
-    failed = []
+    # Shared reference frames, loaded once for all timelines in in-process mode
+    df_samples_used = None
+    df_os = None
+    df_anchor = None
+    if in_process and engine == 'sql':
+        # The SQL engine joins the reference tables in Databricks
+        df_samples_used = load_sample_list(fname_sample=fname_sample)
+        print()
+    elif in_process:
+        df_samples_used = load_sample_list(fname_sample=fname_sample)
+        df_os, df_anchor = load_reference_frames(
+            fname_dbx=fname_dbx,
+            fname_deid=anchor_dates
+        )
+        print()
+
+    # Stage the cohort MRNs once so every timeline query can join against them
+    cohort_table = None
+    if cohort_filter == 'staged' and engine == 'pandas':
+        df_samples_stage = df_samples_used if in_process else load_sample_list(fname_sample=fname_sample)
+        df_anchor_stage = df_anchor if in_process else load_anchor_dates(fname_dbx=fname_dbx, fname_deid=anchor_dates)
+        cohort_table_name = f"timeline_cohort_mrns_{cohort_name}"
+        cohort_table = stage_cohort_mrns(
+            fname_dbx=fname_dbx,
+            df_anchor=df_anchor_stage,
+            df_samples_used=df_samples_stage,
+            volume_path=f"{volume_path_full}/{cohort_table_name}.tsv",
+            catalog=timeline_configs[0]['catalog'],
+            schema=timeline_configs[0]['schema'],
+            table=cohort_table_name
+        )
+        print()
 
+    # Stage the sample list once for the SQL engine's server-side joins
+    sample_table = None
+    if engine == 'sql':
+        df_samples_stage = df_samples_used if in_process else load_sample_list(fname_sample=fname_sample)
+        sample_table_name = f"timeline_cohort_samples_{cohort_name}"
+        sample_table = stage_cohort_samples(
+            fname_dbx=fname_dbx,
+            df_samples_used=df_samples_stage,
+            volume_path=f"{volume_path_full}/{sample_table_name}.tsv",
+            catalog=timeline_configs[0]['catalog'],
+            schema=timeline_configs[0]['schema'],
+            table=sample_table_name
+        )
+        print()
+
+    jobs = []
     for idx, config in enumerate(timeline_configs, 1):
         timeline_id = config['timeline_id']
-        source_table = config['source_table']
         output_filename = config['output_filename']
-        columns = config['columns']  # This is a list
-        patient_or_sample = config['patient_or_sample']
-        catalog = config['catalog']
-        schema = config['schema']
-
-        print(f"\n[{idx}/{len(timeline_configs)}] Processing: {timeline_id}")
-        print("-" * 80)
 
         # Build paths
         fname_output_volume = f"{volume_path_full}/{output_filename}_phi.tsv"
@@ -148,53 +389,83 @@ def run_timeline_deidentification(config_dir, production_or_test, fname_dbx, anc
         # Build table name: {output_filename}_{cohort_name}_phi
         table_name = f"{output_filename}_{cohort_name}_phi"
 
-        # Convert columns list to comma-separated string
-        columns_str = ",".join(columns)
-
-        # Build command arguments
-        cmd = [
-            "python",
-            str(deidentify_script),
-            f"--fname_dbx={fname_dbx}",
-            f"--fname_deid={anchor_dates}",
-            f"--fname_timeline={source_table}",
-            f"--fname_sample={fname_sample}",
-            f"--fname_output_volume={fname_output_volume}",
-            f"--fname_output_gpfs={fname_output_gpfs}",
-            f"--columns_cbio={columns_str}",
-            f"--merge_level={patient_or_sample}",  # Always pass merge_level
-            f"--catalog={catalog}",
-            f"--schema={schema}",
-            f"--table_name={table_name}"
-        ]
-
-        print(f"Source table: {source_table}")
-        print(f"Output volume (PHI): {fname_output_volume}")
-        print(f"Output table (PHI): {catalog}.{schema}.{table_name}")
-        print(f"Output GPFS (DEID): {fname_output_gpfs}")
-        print(f"Merge level: {patient_or_sample}")
-        print()
+        # The SQL engine writes no PHI version
+        if engine == 'sql':
+            fname_output_volume = None
+            table_name = None
+
+        jobs.append({
+            'idx': idx,
+            'total': len(timeline_configs),
+            'timeline_id': timeline_id,
+            'source_table': config['source_table'],
+            'columns': config['columns'],  # This is a list
+            'patient_or_sample': config['patient_or_sample'],
+            'catalog': config['catalog'],
+            'schema': config['schema'],
+            'table_name': table_name,
+            'fname_output_volume': fname_output_volume,
+            'fname_output_gpfs': fname_output_gpfs,
+            'fname_dbx': fname_dbx,
+            'anchor_dates': anchor_dates,
+            'fname_sample': fname_sample,
+            'deidentify_script': str(deidentify_script),
+            'in_process': in_process,
+            'cohort_filter': cohort_filter,
+            'cohort_table': cohort_table,
+            'engine': engine,
+            'sample_table': sample_table,
+            'partitions': config['partitions'] or partitions
+        })
+
+    # Frames are module globals so forked workers inherit them without re-querying
+    _SHARED_FRAMES['df_samples_used'] = df_samples_used
+    _SHARED_FRAMES['df_os'] = df_os
+    _SHARED_FRAMES['df_anchor'] = df_anchor
+    # Sample list, anchor date and OS date IDs encoded once for the joins of every timeline
+    if df_os is not None:
+        _SHARED_FRAMES['codec'] = build_id_codec(
+            df_samples_used=df_samples_used,
+            df_os=df_os,
+            df_anchor=df_anchor
+        )
 
-        try:
-            # Run the deidentification script
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            print(result.stdout)
-            if result.stderr:
-                print("STDERR:", result.stderr)
-            successful.append(timeline_id)
-            print(f"✓ Successfully processed: {timeline_id}")
-        except subprocess.CalledProcessError as e:
-            print(f"✗ FAILED to process: {timeline_id}")
-            print(f"Error code: {e.returncode}")
-            print(f"STDOUT: {e.stdout}")
-            print(f"STDERR: {e.stderr}")
-            failed.append(timeline_id)
-        except Exception as e:
-            print(f"✗ FAILED to process: {timeline_id}")
-            print(f"Error: {str(e)}")
-            failed.append(timeline_id)
-
-        print("-" * 80)
+    successful = []
+    failed = []
+
+    if workers > 1:
+        ctx = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+            futures = {executor.submit(_run_timeline_job_captured, job): job for job in jobs}
+            results = {}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results[job['timeline_id']] = future.result()
+                except Exception as e:
+                    # Worker process died before it could report back
+                    log = (
+                        f"\n[{job['idx']}/{job['total']}] Processing: {job['timeline_id']}\n"
+                        f"✗ FAILED to process: {job['timeline_id']}\n"
+                        f"Error: {str(e)}\n"
+                    )
+                    results[job['timeline_id']] = (False, log)
+                print(f"Finished: {job['timeline_id']} ({len(results)}/{len(jobs)})")
+
+        # Print each job's log in config order so the output reads like a serial run
+        for job in jobs:
+            success, log = results[job['timeline_id']]
+            print(log, end='')
+            if success:
+                successful.append(job['timeline_id'])
+            else:
+                failed.append(job['timeline_id'])
+    else:
+        for job in jobs:
+            if _run_timeline_job(job):
+                successful.append(job['timeline_id'])
+            else:
+                failed.append(job['timeline_id'])
 
     # Print summary
     print("\n" + "=" * 80)
@@ -282,9 +553,59 @@ if __name__ == "__main__":
         required=True,
         help="Cohort name (e.g., mskimpact, mskimpact_heme, mskaccess, mskarcher)"
     )
+    parser.add_argument(
+        "--in_process",
+        action="store_true",
+        dest="in_process",
+        default=False,
+        help="Load demographics and anchor dates once and run every timeline in this process"
+    )
+    parser.add_argument(
+        "--workers",
+        action="store",
+        dest="workers",
+        type=int,
+        default=1,
+        help="Number of timelines to process concurrently; above 1 implies --in_process (default: 1)"
+    )
+    parser.add_argument(
+        "--cohort_filter",
+        action="store",
+        dest="cohort_filter",
+        default="none",
+        choices=COHORT_FILTER_MODES,
+        help="Restrict timeline queries to the cohort's patients: 'none' (default), 'in_list' or 'staged'"
+    )
+    parser.add_argument(
+        "--engine",
+        action="store",
+        dest="engine",
+        default="pandas",
+        choices=DEID_ENGINES,
+        help="Deidentify in 'pandas' (default) or in Databricks 'sql' (deidentified output only; no PHI file or table is written)"
+    )
+    parser.add_argument(
+        "--partitions",
+        action="store",
+        dest="partitions",
+        type=int,
+        default=1,
+        help="Process each timeline in this many MRN-hash partitions to bound memory, unless set in its YAML (pandas engine; default: 1)"
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
 
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     run_timeline_deidentification(
         config_dir=args.config_dir,
         production_or_test=args.production_or_test,
@@ -293,5 +614,10 @@ if __name__ == "__main__":
         fname_sample=args.fname_sample,
         volume_base_path=args.volume_base_path,
         gpfs_output_path=args.gpfs_output_path,
-        cohort_name=args.cohort_name
+        cohort_name=args.cohort_name,
+        in_process=args.in_process,
+        workers=args.workers,
+        cohort_filter=args.cohort_filter,
+        engine=args.engine,
+        partitions=args.partitions
     )
@@ -42,24 +42,70 @@ Sample-level timeline (e.g., sequencing data):
     --fname_output_gpfs=/gpfs/path/data_timeline_sequencing.txt \
     --columns_cbio="PATIENT_ID,SAMPLE_ID,START_DATE,EVENT_TYPE" \
     --merge_level=sample
+
+The deidentified version alone can be computed in Databricks SQL with --engine=sql
+and a cohort sample table staged by stage_cohort_samples. This engine does not write
+the PHI version, so --fname_output_volume and --table_name are refused with it:
+  python pipeline/timeline/cbioportal_timeline_deidentify.py \
+    --fname_dbx=/path/to/databricks_env.txt \
+    --fname_timeline=schema.table_timeline_labs \
+    --fname_sample=/path/to/data_clinical_sample.txt \
+    --fname_output_gpfs=/gpfs/path/data_timeline_lab_test.txt \
+    --columns_cbio="PATIENT_ID,START_DATE,STOP_DATE,EVENT_TYPE,TEST,RESULT" \
+    --engine=sql \
+    --sample_table=catalog.schema.timeline_cohort_samples_mskimpact
+
+Large timelines (e.g., labs) can be processed in MRN-hash partitions so that memory
+is bounded by partition size rather than table size (see deidentify_timeline_partitioned):
+  python pipeline/timeline/cbioportal_timeline_deidentify.py \
+    ... \
+    --partitions=16
 """
 
 import argparse
 import sys
 import os
+import shutil
+import tempfile
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+import numpy as np
 import pandas as pd
 
 from msk_cdm.databricks import DatabricksAPI
 from msk_cdm.data_processing import mrn_zero_pad
-from lib.utils import constants
+from lib.summary.final_file_writer import is_volume_mounted
+from lib.utils import constants, table_cache
+from lib.utils.anchor_date_index import AnchorDateIndex
+from lib.utils.cohort_filter import (
+    COHORT_FILTER_MODES,
+    build_partition_where,
+    get_cohort_mrns,
+    query_cohort_rows,
+    stage_cohort_table,
+    stage_sample_table
+)
+from lib.utils.date_parsing import coercion_stats, parse_dates
+from lib.utils.id_codec import IdCodec, take_codes
+from lib.utils.timeline_deid_sql import build_timeline_deid_sql, match_pandas_dtypes
+from lib.utils.vital_status import build_vital_status, load_vital_status
 
 COLS_ORDER_GENERAL = constants.COLS_ORDER_GENERAL
 COL_ANCHOR_DATE = constants.COL_ANCHOR_DATE
 COL_OS_DATE = 'OS_DATE'
 COL_ID = 'MRN'
 
+# Columns read from the reference tables
+COLS_DEMO = [COL_ID, 'PT_DEATH_DTE', 'PLA_LAST_CONTACT_DTE']
+COLS_ANCHOR = constants.COLS_ANCHOR_DATES
+# Columns derived during deidentification rather than read from the timeline table
+COLS_TIMELINE_DERIVED = ['PATIENT_ID']
+
+# Deidentification engines: merge and compute day offsets in pandas, or in Databricks SQL
+DEID_ENGINES = ['pandas', 'sql']
+# Rows per spilled chunk of a partitioned run (see deidentify_timeline_partitioned)
+PARTITION_CHUNK_ROWS = 500000
+
 # Fixed table names (configured upstream)
 FNAME_DEMO = 'cdsi_prod.cdm_impact_pipeline_prod.t01_epic_ddp_demographics'
 FNAME_DEID = 'cdsi_prod.cdm_idbw_impact_pipeline_prod.timeline_anchor_dates'
@@ -69,23 +115,29 @@ FNAME_DEID = 'cdsi_prod.cdm_idbw_impact_pipeline_prod.timeline_anchor_dates'
 # Utility Functions
 # =============================================================================
 
-def load_dbx_table(fname_dbx, table_name):
+def load_dbx_table(fname_dbx, table_name, columns=None, cached=False, where=None):
     """Load a table from Databricks.
 
     Args:
         fname_dbx: Path to Databricks environment file
         table_name: Full table name (e.g., 'schema.table')
+        columns: Columns to select (default: all columns)
+        cached: If True, serve the table from the local table cache when its
+            version is unchanged (reference tables shared across scripts)
+        where: Optional SQL filter
 
     Returns:
         DataFrame with table data
     """
     obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
 
-    sql = f"""
-    select * FROM {table_name}
-    """
-
-    df = obj_dbx.query_from_sql(sql=sql)
+    df = table_cache.query_table(
+        obj_db=obj_dbx,
+        table_name=table_name,
+        columns=columns,
+        where=where,
+        use_cache=None if cached else False
+    )
 
     return df
 
@@ -94,7 +146,8 @@ def compute_os_date(fname_dbx, fname_demo):
     """Compute overall survival date from demographics table.
 
     OS_DATE is the date of death if available, otherwise last contact date.
-    If death date is earlier than last contact, use death date.
+    Read from the vital status table shared with the other scripts of a run
+    (see lib/utils/vital_status.py).
 
     Args:
         fname_dbx: Path to Databricks environment file
@@ -103,29 +156,21 @@ def compute_os_date(fname_dbx, fname_demo):
     Returns:
         DataFrame with MRN and OS_DATE columns
     """
-    print(f'Loading {fname_demo}')
-    df_demo = load_dbx_table(
-        fname_dbx=fname_dbx,
-        table_name=fname_demo
-    )
+    obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
 
-    df_demo = mrn_zero_pad(df=df_demo, col_mrn=COL_ID)
-    df_demo['PLA_LAST_CONTACT_DTE'] = pd.to_datetime(df_demo['PLA_LAST_CONTACT_DTE'], errors='coerce', format='mixed')
-    df_demo['PT_DEATH_DTE'] = pd.to_datetime(df_demo['PT_DEATH_DTE'], errors='coerce', format='mixed')
+    return load_vital_status(obj_db=obj_dbx, table_demo=fname_demo)
 
-    # Remove timezone info to ensure dates are tz-naive
-    if isinstance(df_demo['PLA_LAST_CONTACT_DTE'].dtype, pd.DatetimeTZDtype):
-        df_demo['PLA_LAST_CONTACT_DTE'] = df_demo['PLA_LAST_CONTACT_DTE'].dt.tz_localize(None)
-    if isinstance(df_demo['PT_DEATH_DTE'].dtype, pd.DatetimeTZDtype):
-        df_demo['PT_DEATH_DTE'] = df_demo['PT_DEATH_DTE'].dt.tz_localize(None)
 
-    df_demo[COL_OS_DATE] = df_demo['PT_DEATH_DTE'].fillna(df_demo['PLA_LAST_CONTACT_DTE'])
+def os_dates_from_demographics(df_demo):
+    """Compute OS_DATE from a demographics frame (see compute_os_date).
 
-    # If death date is earlier than last contact, use death date
-    log_err = df_demo['PT_DEATH_DTE'] < df_demo['PLA_LAST_CONTACT_DTE']
-    df_demo.loc[log_err, COL_OS_DATE] = df_demo['PT_DEATH_DTE']
+    Args:
+        df_demo: Demographics with MRN, PT_DEATH_DTE and PLA_LAST_CONTACT_DTE columns
 
-    return df_demo
+    Returns:
+        DataFrame with zero-padded MRN, parsed dates and OS_DATE columns
+    """
+    return build_vital_status(df_demo=df_demo)
 
 
 def process_df_os(df, col_id=COL_ID, col_os_date=COL_OS_DATE):
@@ -161,19 +206,8 @@ def validate_date_parsing(df, start_col='START_DATE', stop_col='STOP_DATE',
         Dict with validation statistics
     """
     # Count rows that were NOT null originally but became null after conversion
-    coerced_to_null_start = ((df[start_col].notnull()) &
-                             (df[start_formatted].isnull())).sum()
-
-    coerced_to_null_stop = ((df[stop_col].notnull()) &
-                            (df[stop_formatted].isnull())).sum()
-
-    # Total non-null values in original columns
-    total_non_null_start = df[start_col].notnull().sum()
-    total_non_null_stop = df[stop_col].notnull().sum()
-
-    # Calculate percentage of non-null values that failed to parse
-    pct_coerced_start = coerced_to_null_start / total_non_null_start if total_non_null_start > 0 else 0
-    pct_coerced_stop = coerced_to_null_stop / total_non_null_stop if total_non_null_stop > 0 else 0
+    coerced_to_null_start, pct_coerced_start = coercion_stats(values=df[start_col], parsed=df[start_formatted])
+    coerced_to_null_stop, pct_coerced_stop = coercion_stats(values=df[stop_col], parsed=df[stop_formatted])
 
     print(f"START_DATE: {coerced_to_null_start} values coerced to null ({pct_coerced_start:.2%})")
     print(f"STOP_DATE: {coerced_to_null_stop} values coerced to null ({pct_coerced_stop:.2%})")
@@ -223,6 +257,48 @@ def days_to_readable_compact(days):
     return result
 
 
+def days_to_readable_compact_series(days):
+    """Vectorized days_to_readable_compact() for a whole column.
+
+    Day offsets repeat heavily across rows, so each distinct value is formatted
+    once with integer array ops and the strings are mapped back to the rows.
+
+    Args:
+        days: Series of day counts (int, float or nullable Int64; can be negative)
+
+    Returns:
+        Series of strings like "2y 3m 15d", with "" for missing values
+    """
+    days = pd.Series(days)
+    codes, uniques = pd.factorize(days)
+    if len(uniques) == 0:
+        return pd.Series("", index=days.index, dtype=object)
+
+    values = np.asarray(uniques, dtype='float64')
+    is_negative = values < 0
+    # abs(int(days)) truncates toward zero
+    days_abs = np.abs(np.trunc(values)).astype('int64')
+
+    years = days_abs // 365
+    remaining_days = days_abs % 365
+    months = remaining_days // 30
+    final_days = remaining_days % 30
+
+    str_years = np.where(years > 0, np.char.add(years.astype(str), 'y'), '')
+    str_months = np.where(months > 0, np.char.add(months.astype(str), 'm'), '')
+    str_days = np.where((final_days > 0) | ((years == 0) & (months == 0)), np.char.add(final_days.astype(str), 'd'), '')
+
+    sep_years = np.where((years > 0) & ((str_months != '') | (str_days != '')), ' ', '')
+    sep_months = np.where((months > 0) & (str_days != ''), ' ', '')
+    readable = np.char.add(np.char.add(np.char.add(np.char.add(str_years, sep_years), str_months), sep_months), str_days)
+    readable = np.where(is_negative, np.char.add('-', readable), readable).astype(object)
+
+    # factorize() codes missing values as -1
+    result = np.where(codes == -1, "", readable[codes])
+
+    return pd.Series(result, index=days.index, dtype=object)
+
+
 def report_deidentification_stats(df, anchor_col='ANCHOR_DATE', os_col=COL_OS_DATE):
     """Report statistics about the deidentification process.
 
@@ -244,134 +320,105 @@ def report_deidentification_stats(df, anchor_col='ANCHOR_DATE', os_col=COL_OS_DA
     print(f"Number of timepoints with de-id error: {len(timepoints_missing_start)}")
 
 
-# =============================================================================
-# Main Function
-# =============================================================================
+def get_timeline_source_columns(list_cols_cbio_timeline, merge_level, table_columns):
+    """Determine which columns to read from a timeline source table.
 
+    The cBioPortal output columns (from the YAML `columns` block) are read along with
+    the merge keys and raw dates, skipping columns that are derived during
+    deidentification or not present in the source table.
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Generic timeline deidentification for cBioPortal (medications, labs, diagnoses, etc.)"
-    )
-    parser.add_argument(
-        "--fname_dbx",
-        action="store",
-        dest="fname_dbx",
-        required=True,
-        help="Path to Databricks environment file"
-    )
-    parser.add_argument(
-        "--fname_deid",
-        action="store",
-        dest="fname_deid",
-        default=FNAME_DEID,
-        help=f"Databricks table name for anchor dates (default: {FNAME_DEID})"
-    )
-    parser.add_argument(
-        "--fname_timeline",
-        action="store",
-        dest="fname_timeline",
-        required=True,
-        help="Databricks table name for timeline data (e.g., 'schema.table_timeline_medications')"
-    )
-    parser.add_argument(
-        "--fname_sample",
-        action="store",
-        dest="fname_sample",
-        required=True,
-        help="Path to sample list file (data_clinical_sample.txt)"
-    )
-    parser.add_argument(
-        "--fname_output_volume",
-        action="store",
-        dest="fname_output_volume",
-        required=True,
-        help="Output path for PHI version in Databricks volume"
-    )
-    parser.add_argument(
-        "--fname_output_gpfs",
-        action="store",
-        dest="fname_output_gpfs",
-        required=True,
-        help="Output path for deidentified version on GPFS"
-    )
-    parser.add_argument(
-        "--columns_cbio",
-        action="store",
-        dest="columns_cbio",
-        required=True,
-        help="Comma-separated list of columns for final cBioPortal output"
-    )
-    parser.add_argument(
-        "--truncate_by_os_date",
-        action="store_true",
-        dest="truncate_by_os_date",
-        default=False,
-        help="If set, truncate START_DATE and STOP_DATE that exceed OS_DATE"
-    )
-    parser.add_argument(
-        "--merge_level",
-        action="store",
-        dest="merge_level",
-        default="patient",
-        choices=["patient", "sample"],
-        help="Level at which to merge timeline data: 'patient' (default) or 'sample'"
-    )
-    parser.add_argument(
-        "--catalog",
-        action="store",
-        dest="catalog",
-        default=None,
-        help="Databricks catalog for output table (optional)"
-    )
-    parser.add_argument(
-        "--schema",
-        action="store",
-        dest="schema",
-        default=None,
-        help="Databricks schema for output table (optional)"
-    )
-    parser.add_argument(
-        "--table_name",
-        action="store",
-        dest="table_name",
-        default=None,
-        help="Databricks table name for output table (optional)"
-    )
+    Args:
+        list_cols_cbio_timeline: Columns for final cBioPortal output
+        merge_level: 'patient' or 'sample'
+        table_columns: Columns available in the source table
 
-    args = parser.parse_args()
+    Returns:
+        List of columns to select from the source table
+    """
+    cols_required = [COL_ID, 'START_DATE', 'STOP_DATE']
+    if merge_level == 'sample':
+        cols_required.append('SAMPLE_ID')
 
-    # Parse comma-separated columns list
-    list_cols_cbio_timeline = [col.strip() for col in args.columns_cbio.split(',')]
+    cols_needed = cols_required + [col for col in list_cols_cbio_timeline if col not in COLS_TIMELINE_DERIVED]
+    table_columns = set(table_columns)
+    cols_select = [col for col in dict.fromkeys(cols_needed) if col in table_columns]
 
-    print("=" * 80)
-    print("TIMELINE DEIDENTIFICATION FOR CBIOPORTAL")
-    print("=" * 80)
-    print(f"Timeline table: {args.fname_timeline}")
-    print(f"Sample list: {args.fname_sample}")
-    print(f"Output volume (PHI): {args.fname_output_volume}")
-    print(f"Output GPFS (deid): {args.fname_output_gpfs}")
-    print(f"Merge level: {args.merge_level}")
-    print(f"Truncate by OS_DATE: {args.truncate_by_os_date}")
-    print(f"cBioPortal columns: {list_cols_cbio_timeline}")
-    print("=" * 80)
+    return cols_select
 
-    # =========================================================================
-    # 1. Load sample list and get patient/sample IDs
-    # =========================================================================
-    print(f'\nLoading sample list: {args.fname_sample}')
-    df_samples_used = pd.read_csv(args.fname_sample, sep='\t')
+
+def load_sample_list(fname_sample):
+    """Load the cohort sample list and report patient/sample counts.
+
+    Args:
+        fname_sample: Path to sample list file (data_clinical_sample.txt)
+
+    Returns:
+        DataFrame with PATIENT_ID and SAMPLE_ID columns
+    """
+    print(f'\nLoading sample list: {fname_sample}')
+    df_samples_used = pd.read_csv(fname_sample, sep='\t')
     list_dmp_ids = list(df_samples_used['PATIENT_ID'].drop_duplicates())
     list_sample_ids = list(df_samples_used['SAMPLE_ID'].drop_duplicates())
     print(f'Number of sample IDs: {len(list_sample_ids)}')
     print(f'Number of patient IDs: {len(list_dmp_ids)}')
 
-    # =========================================================================
-    # 2. Compute OS dates from demographics
-    # =========================================================================
+    return df_samples_used
+
+
+def load_anchor_dates(fname_dbx, fname_deid):
+    """Load anchor dates and normalize MRN and anchor date columns.
+
+    Args:
+        fname_dbx: Path to Databricks environment file
+        fname_deid: Databricks table name for anchor dates
+
+    Returns:
+        AnchorDateIndex with zero-padded MRN and tz-naive anchor dates, indexed
+        once for all timelines
+    """
+    print(f'\nLoading anchor dates: {fname_deid}')
+    df_anchor = load_dbx_table(
+        fname_dbx=fname_dbx,
+        table_name=fname_deid,
+        columns=COLS_ANCHOR,
+        cached=True
+    )
+
+    return AnchorDateIndex(normalize_anchor_dates(df_anchor=df_anchor), normalized=True)
+
+
+def normalize_anchor_dates(df_anchor):
+    """Zero-pad MRN and parse anchor dates as tz-naive datetimes.
+
+    Args:
+        df_anchor: Anchor dates with MRN, DMP_ID and DATE_TUMOR_SEQUENCING columns
+
+    Returns:
+        Normalized anchor dates
+    """
+    df_anchor = mrn_zero_pad(df=df_anchor, col_mrn='MRN')
+    df_anchor[COL_ANCHOR_DATE] = parse_dates(df_anchor[COL_ANCHOR_DATE])
+
+    return df_anchor
+
+
+def load_reference_frames(fname_dbx, fname_deid, fname_demo=FNAME_DEMO):
+    """Load the reference frames shared by every timeline.
+
+    OS dates and anchor dates do not depend on the timeline being processed,
+    so batch runs load them once and pass them to deidentify_timeline().
+
+    Args:
+        fname_dbx: Path to Databricks environment file
+        fname_deid: Databricks table name for anchor dates
+        fname_demo: Demographics table name
+
+    Returns:
+        Tuple of (df_os, df_anchor)
+    """
     df_patient_os_date = compute_os_date(
-        fname_dbx=args.fname_dbx,
-        fname_demo=FNAME_DEMO
+        fname_dbx=fname_dbx,
+        fname_demo=fname_demo
     )
 
     df_os = process_df_os(
@@ -380,23 +427,256 @@ def main():
         col_os_date=COL_OS_DATE
     )
 
-    # =========================================================================
-    # 3. Load anchor dates
-    # =========================================================================
-    print(f'\nLoading anchor dates: {args.fname_deid}')
-    df_anchor = load_dbx_table(fname_dbx=args.fname_dbx, table_name=args.fname_deid)
-    df_anchor = mrn_zero_pad(df=df_anchor, col_mrn='MRN')
-    df_anchor[COL_ANCHOR_DATE] = pd.to_datetime(df_anchor[COL_ANCHOR_DATE], errors='coerce', format='mixed')
+    df_anchor = load_anchor_dates(fname_dbx=fname_dbx, fname_deid=fname_deid)
+
+    return df_os, df_anchor
+
+
+def build_id_codec(df_samples_used, df_os, df_anchor):
+    """Build the IdCodec of a run's reference frames: sample list, anchor dates and OS dates.
+
+    The anchor table covers every patient, so the MRNs of timeline rows are in
+    the dictionary and joins on them do not fall back to DataFrame.merge.
+
+    Args:
+        df_samples_used: Sample list with PATIENT_ID and SAMPLE_ID columns
+        df_os: OS dates with MRN and OS_DATE columns
+        df_anchor: AnchorDateIndex later passed to deidentify_timeline_frames(),
+            so that the codes of its frame are reused in the joins
+
+    Returns:
+        IdCodec
+    """
+    return IdCodec([df_samples_used, AnchorDateIndex.frame_of(df_anchor), df_os])
+
+
+def stage_cohort_mrns(fname_dbx, df_anchor, df_samples_used, volume_path, catalog, schema, table):
+    """Stage the cohort's MRNs as a Databricks table for server-side filtering.
+
+    Args:
+        fname_dbx: Path to Databricks environment file
+        df_anchor: Anchor dates with MRN and DMP_ID columns
+        df_samples_used: Sample list with PATIENT_ID column
+        volume_path: Volume path for the staged TSV
+        catalog: Catalog for the staged table
+        schema: Schema for the staged table
+        table: Name of the staged table
+
+    Returns:
+        Full table name of the staged cohort table
+    """
+    obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
+    list_mrns = get_cohort_mrns(df_anchor=df_anchor, df_samples_used=df_samples_used)
+
+    return stage_cohort_table(
+        obj_db=obj_dbx,
+        list_mrns=list_mrns,
+        volume_path=volume_path,
+        catalog=catalog,
+        schema=schema,
+        table=table
+    )
+
+
+def stage_cohort_samples(fname_dbx, df_samples_used, volume_path, catalog, schema, table):
+    """Stage the cohort sample list as a Databricks table for the SQL engine.
+
+    Args:
+        fname_dbx: Path to Databricks environment file
+        df_samples_used: Sample list with PATIENT_ID and SAMPLE_ID columns
+        volume_path: Volume path for the staged TSV
+        catalog: Catalog for the staged table
+        schema: Schema for the staged table
+        table: Name of the staged table
+
+    Returns:
+        Full table name of the staged sample table
+    """
+    obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
+
+    return stage_sample_table(
+        obj_db=obj_dbx,
+        df_samples_used=df_samples_used,
+        volume_path=volume_path,
+        catalog=catalog,
+        schema=schema,
+        table=table
+    )
+
+
+# =============================================================================
+# Deidentification
+# =============================================================================
+
+
+def load_timeline_raw(
+        *,
+        fname_dbx,
+        fname_timeline,
+        list_cols_cbio_timeline,
+        merge_level='patient',
+        df_samples_used=None,
+        df_anchor=None,
+        cohort_filter='none',
+        cohort_table=None,
+        where=None
+):
+    """Load the source rows of a timeline table.
+
+    Args:
+        fname_dbx: Path to Databricks environment file
+        fname_timeline: Databricks table name for timeline data
+        list_cols_cbio_timeline: Columns for final cBioPortal output
+        merge_level: 'patient' or 'sample'
+        df_samples_used: Sample list with PATIENT_ID column (for cohort_filter='in_list')
+        df_anchor: Anchor dates with MRN and DMP_ID columns (for cohort_filter='in_list')
+        cohort_filter: How to restrict the timeline query to the cohort's patients:
+            'none' (read the full table), 'in_list' (chunked MRN IN lists) or
+            'staged' (join against cohort_table)
+        cohort_table: Staged cohort MRN table, required for cohort_filter='staged'
+        where: Optional SQL filter applied on top of the cohort filter (e.g. an
+            MRN-hash partition, see build_partition_where)
+
+    Returns:
+        DataFrame with the timeline source rows
+    """
+    print(f'\nLoading timeline data: {fname_timeline}')
+    obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
+    cols_timeline = get_timeline_source_columns(
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        merge_level=merge_level,
+        table_columns=table_cache.get_table_columns(obj_db=obj_dbx, table_name=fname_timeline)
+    )
+    if cohort_filter == 'none':
+        df_timeline_raw = load_dbx_table(
+            fname_dbx=fname_dbx,
+            table_name=fname_timeline,
+            columns=cols_timeline,
+            where=where
+        )
+    elif cohort_filter == 'in_list':
+        list_mrns = get_cohort_mrns(df_anchor=df_anchor, df_samples_used=df_samples_used)
+        print(f'Filtering timeline query to {len(list_mrns)} cohort MRNs')
+        df_timeline_raw = query_cohort_rows(
+            obj_db=obj_dbx,
+            table_name=fname_timeline,
+            columns=cols_timeline,
+            list_mrns=list_mrns,
+            where=where
+        )
+    elif cohort_filter == 'staged':
+        if cohort_table is None:
+            raise ValueError("cohort_filter='staged' requires cohort_table")
+        print(f'Filtering timeline query with staged cohort table: {cohort_table}')
+        df_timeline_raw = query_cohort_rows(
+            obj_db=obj_dbx,
+            table_name=fname_timeline,
+            columns=cols_timeline,
+            cohort_table=cohort_table,
+            where=where
+        )
+    else:
+        raise ValueError(f"Unknown cohort_filter: {cohort_filter}")
+    print(f'Timeline rows loaded: {df_timeline_raw.shape[0]}')
+
+    return df_timeline_raw
+
+
+def finalize_deidentified_timeline(df_deid, list_cols_cbio_timeline, source_columns=None, patient_codes=None):
+    """Select the cBioPortal columns, drop undated rows and sort the deidentified timeline.
+
+    The output is projected from df_deid in one pass: the kept rows and their
+    order are computed from the PATIENT_ID and START_DATE columns alone, then each
+    output column is gathered once. df_deid is neither copied nor modified, so the
+    PHI frame and the deidentified timeline share it.
+
+    Args:
+        df_deid: Timeline with START_DATE and STOP_DATE as days from anchor
+        list_cols_cbio_timeline: Columns for final cBioPortal output
+        source_columns: Optional mapping of output columns to the df_deid columns
+            holding them (e.g. {'START_DATE': 'START_DATE_DEID'})
+        patient_codes: Optional IdCodec codes of the PATIENT_ID of each df_deid
+            row. Rows are then sorted on the codes instead of the ID strings.
+
+    Returns:
+        Deidentified DataFrame in cBioPortal column order
+    """
+    source_columns = source_columns or {}
+
+    def source(col):
+        return source_columns.get(col, col)
+
+    # Select only requested columns
+    missing_cols = [col for col in list_cols_cbio_timeline if source(col) not in df_deid.columns]
+    if missing_cols:
+        print(f'WARNING: Missing columns in output: {missing_cols}')
+
+    available_cols = [col for col in list_cols_cbio_timeline if source(col) in df_deid.columns]
+
+    # Drop rows with null START_DATE or PATIENT_ID, then sort by PATIENT_ID and START_DATE
+    start_date = df_deid[source('START_DATE')]
+    patient_id = df_deid[source('PATIENT_ID')]
+    logic_keep = (start_date.notnull() & patient_id.notnull()).to_numpy()
+    sort_patient = patient_id.array[logic_keep]
+    if patient_codes is not None and (patient_codes[logic_keep] >= 0).all():
+        # The codec's dictionary is sorted, so codes sort like the IDs they encode
+        sort_patient = patient_codes[logic_keep]
+    df_keys = pd.DataFrame(
+        {'PATIENT_ID': sort_patient, 'START_DATE': start_date.array[logic_keep]},
+        index=np.flatnonzero(logic_keep)
+    )
+    positions = df_keys.sort_values(by=['PATIENT_ID', 'START_DATE']).index.to_numpy()
+
+    dict_cols = {}
+    for col in available_cols:
+        values = df_deid[source(col)].take(positions)
+        # Convert START_DATE and STOP_DATE to integers (use Int64 to handle NaN values)
+        if col in ('START_DATE', 'STOP_DATE'):
+            values = values.astype('Int64')
+        dict_cols[col] = values
+    df_deid_f = pd.DataFrame(dict_cols, index=df_deid.index.take(positions))
+
+    print(f'Final deidentified rows: {len(df_deid_f)}')
+
+    return df_deid_f
+
+
+def deidentify_timeline_frames(
+        *,
+        df_timeline_raw,
+        df_samples_used,
+        df_os,
+        df_anchor,
+        list_cols_cbio_timeline,
+        truncate_by_os_date=False,
+        merge_level='patient',
+        today=None,
+        codec=None
+):
+    """Deidentify timeline rows in pandas (reference implementation).
+
+    The MRN joins and the final sort run on IdCodec codes. The codec is built
+    from the reference frames here (see build_id_codec) unless a batch run
+    passes its shared one.
 
-    # Remove timezone info to ensure dates are tz-naive
-    if isinstance(df_anchor[COL_ANCHOR_DATE].dtype, pd.DatetimeTZDtype):
-        df_anchor[COL_ANCHOR_DATE] = df_anchor[COL_ANCHOR_DATE].dt.tz_localize(None)
+    Args:
+        df_timeline_raw: Timeline source rows with MRN, START_DATE and STOP_DATE
+        df_samples_used: Sample list with PATIENT_ID and SAMPLE_ID columns
+        df_os: OS dates with MRN and OS_DATE columns
+        df_anchor: AnchorDateIndex or normalized anchor dates with MRN, DMP_ID
+            and DATE_TUMOR_SEQUENCING columns
+        list_cols_cbio_timeline: Columns for final cBioPortal output
+        truncate_by_os_date: If True, truncate START_DATE and STOP_DATE that exceed OS_DATE
+        merge_level: 'patient' or 'sample'
+        today: Dates after this day are treated as invalid (default: today)
+        codec: IdCodec of the run's reference frames (optional)
 
+    Returns:
+        Tuple of (PHI DataFrame, deidentified DataFrame)
+    """
     # =========================================================================
-    # 4. Load timeline raw data
+    # 1. Parse and validate timeline dates
     # =========================================================================
-    print(f'\nLoading timeline data: {args.fname_timeline}')
-    df_timeline_raw = load_dbx_table(fname_dbx=args.fname_dbx, table_name=args.fname_timeline)
     df_timeline_raw = mrn_zero_pad(df=df_timeline_raw, col_mrn='MRN')
 
     # Ensure START_DATE and STOP_DATE columns exist
@@ -408,52 +688,59 @@ def main():
         print("WARNING: STOP_DATE column not found, creating empty column")
         df_timeline_raw['STOP_DATE'] = pd.NaT
 
-    # Parse dates and validate
-    df_timeline_raw['START_DATE_FORMATTED'] = pd.to_datetime(df_timeline_raw['START_DATE'], errors='coerce', format='mixed')
-    df_timeline_raw['STOP_DATE_FORMATTED'] = pd.to_datetime(df_timeline_raw['STOP_DATE'], errors='coerce', format='mixed')
-
-    # Remove timezone info to ensure all dates are tz-naive
-    if isinstance(df_timeline_raw['START_DATE_FORMATTED'].dtype, pd.DatetimeTZDtype):
-        df_timeline_raw['START_DATE_FORMATTED'] = df_timeline_raw['START_DATE_FORMATTED'].dt.tz_localize(None)
-    if isinstance(df_timeline_raw['STOP_DATE_FORMATTED'].dtype, pd.DatetimeTZDtype):
-        df_timeline_raw['STOP_DATE_FORMATTED'] = df_timeline_raw['STOP_DATE_FORMATTED'].dt.tz_localize(None)
+    # Parse dates (tz-naive) and validate
+    df_timeline_raw['START_DATE_FORMATTED'] = parse_dates(df_timeline_raw['START_DATE'])
+    df_timeline_raw['STOP_DATE_FORMATTED'] = parse_dates(df_timeline_raw['STOP_DATE'])
 
     validate_date_parsing(df_timeline_raw)
 
     # =========================================================================
-    # 5. Merge data and create timeline
+    # 2. Merge data and create timeline
     # =========================================================================
-    print(f'\nMerging data at {args.merge_level} level...')
+    print(f'\nMerging data at {merge_level} level...')
+    df_anchor = AnchorDateIndex.from_frame(df_anchor)
+    if codec is None:
+        codec = build_id_codec(df_samples_used=df_samples_used, df_os=df_os, df_anchor=df_anchor)
 
-    if args.merge_level == 'patient':
+    if merge_level == 'patient':
         # Patient-level merge: merge timeline data on MRN (patient level)
-        df_f = df_samples_used[['PATIENT_ID']].drop_duplicates()
-        df_f = df_f.merge(right=df_anchor, how='left', left_on='PATIENT_ID', right_on='DMP_ID')
-        df_f = df_f.merge(right=df_os, how='left', on='MRN')
-        df_f = df_f.merge(right=df_timeline_raw, how='left', on='MRN')
+        cols_samples = ['PATIENT_ID']
+        on_timeline = 'MRN'
     else:  # sample level
         # Sample-level merge: merge timeline data on SAMPLE_ID
-        df_f = df_samples_used[['SAMPLE_ID', 'PATIENT_ID']].drop_duplicates()
-        df_f = df_f.merge(right=df_anchor, how='left', left_on='PATIENT_ID', right_on='DMP_ID')
-        df_f = df_f.merge(right=df_os, how='left', on='MRN')
-        df_f = df_f.merge(right=df_timeline_raw, how='left', on=['SAMPLE_ID', 'MRN'])
+        cols_samples = ['SAMPLE_ID', 'PATIENT_ID']
+        on_timeline = ['SAMPLE_ID', 'MRN']
+
+    # The ID codes of df_f follow its rows through the joins, so df_f's IDs are
+    # never encoded again. The timeline's IDs are encoded once, in its join.
+    rows_samples = np.flatnonzero(~df_samples_used.duplicated(subset=cols_samples).to_numpy())
+    df_f = df_samples_used[cols_samples].iloc[rows_samples]
+    codes_f = {col: codec.codes(df_samples_used, col)[rows_samples] for col in cols_samples}
+    df_f, rows_anchor = df_anchor.join_on_dmp_id(df_f, left_on='PATIENT_ID', return_rows=True)
+    if rows_anchor is None:
+        codes_f = None
+    else:
+        codes_f['MRN'] = take_codes(codec.codes(AnchorDateIndex.frame_of(df_anchor), 'MRN'), rows_anchor)
+    for df_right, on in [(df_os, 'MRN'), (df_timeline_raw, on_timeline)]:
+        df_f, rows_left, _ = codec.left_join(df_f, df_right, on=on, return_rows=True, key_codes_left=codes_f)
+        if rows_left is None or codes_f is None:
+            codes_f = None
+        else:
+            codes_f = {col: codes[rows_left] for col, codes in codes_f.items()}
+    patient_codes = None if codes_f is None else codes_f['PATIENT_ID']
 
     # =========================================================================
-    # 6. Remove future dates (dates in the future are invalid)
+    # 3. Remove future dates (dates in the future are invalid)
     # =========================================================================
     print('\nChecking for future dates...')
-    today = pd.Timestamp.today().normalize()
-
+    if today is None:
+        today = pd.Timestamp.today().normalize()
     logic_future_start = df_f['START_DATE_FORMATTED'] > today
     logic_future_stop = df_f['STOP_DATE_FORMATTED'] > today
 
-    # Create copies of the formatted dates
-    df_f['START_DATE_FORMATTED_FIXED'] = df_f['START_DATE_FORMATTED'].copy()
-    df_f['STOP_DATE_FORMATTED_FIXED'] = df_f['STOP_DATE_FORMATTED'].copy()
-
-    # Null out future dates
-    df_f.loc[logic_future_start, 'START_DATE_FORMATTED_FIXED'] = pd.NaT
-    df_f.loc[logic_future_stop, 'STOP_DATE_FORMATTED_FIXED'] = pd.NaT
+    # Formatted dates with future dates nulled out
+    df_f['START_DATE_FORMATTED_FIXED'] = df_f['START_DATE_FORMATTED'].mask(logic_future_start)
+    df_f['STOP_DATE_FORMATTED_FIXED'] = df_f['STOP_DATE_FORMATTED'].mask(logic_future_stop)
 
     patients_future_dates = df_f.loc[logic_future_start | logic_future_stop, 'PATIENT_ID'].nunique()
     rows_future_start = logic_future_start.sum()
@@ -463,16 +750,16 @@ def main():
     print(f'Number of patients affected: {patients_future_dates}')
 
     # =========================================================================
-    # 7. Truncate dates by OS_DATE if requested
+    # 4. Truncate dates by OS_DATE if requested
     # =========================================================================
-    if args.truncate_by_os_date:
+    if truncate_by_os_date:
         print('\nTruncating dates by OS_DATE...')
         logic_fix_start = df_f['START_DATE_FORMATTED_FIXED'] > df_f['OS_DATE']
         logic_fix_stop = df_f['STOP_DATE_FORMATTED_FIXED'] > df_f['OS_DATE']
 
         # Truncate to OS_DATE (working on already FIXED columns from future date check)
-        df_f.loc[logic_fix_start, 'START_DATE_FORMATTED_FIXED'] = df_f['OS_DATE']
-        df_f.loc[logic_fix_stop, 'STOP_DATE_FORMATTED_FIXED'] = df_f['OS_DATE']
+        df_f['START_DATE_FORMATTED_FIXED'] = df_f['START_DATE_FORMATTED_FIXED'].mask(logic_fix_start, df_f['OS_DATE'])
+        df_f['STOP_DATE_FORMATTED_FIXED'] = df_f['STOP_DATE_FORMATTED_FIXED'].mask(logic_fix_stop, df_f['OS_DATE'])
 
         patients_dates_truncated = df_f.loc[logic_fix_start | logic_fix_stop, 'PATIENT_ID'].nunique()
         rows_truncated_start = logic_fix_start.sum()
@@ -484,7 +771,7 @@ def main():
         print('\nSkipping OS_DATE truncation (use --truncate_by_os_date to enable)')
 
     # =========================================================================
-    # 8. Calculate deidentified dates (days from anchor)
+    # 5. Calculate deidentified dates (days from anchor)
     # =========================================================================
     print('\nCalculating deidentified dates...')
     start_date = (df_f['START_DATE_FORMATTED_FIXED'] - df_f[COL_ANCHOR_DATE]).dt.days
@@ -494,69 +781,832 @@ def main():
     df_f['STOP_DATE_DEID'] = stop_date
 
     # Create readable date columns
-    df_f['START_DATE_READABLE'] = df_f['START_DATE_DEID'].apply(days_to_readable_compact)
-    df_f['STOP_DATE_READABLE'] = df_f['STOP_DATE_DEID'].apply(days_to_readable_compact)
+    df_f['START_DATE_READABLE'] = days_to_readable_compact_series(df_f['START_DATE_DEID'])
+    df_f['STOP_DATE_READABLE'] = days_to_readable_compact_series(df_f['STOP_DATE_DEID'])
 
     # Report statistics
     report_deidentification_stats(df_f)
 
     # =========================================================================
-    # 9. Save PHI version to Databricks volume
+    # 6. Create deidentified version
+    # =========================================================================
+    # Projected straight from df_f: the deidentified dates replace the raw ones
+    print('\nCreating deidentified version...')
+    df_deid_f = finalize_deidentified_timeline(
+        df_deid=df_f,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        source_columns={'START_DATE': 'START_DATE_DEID', 'STOP_DATE': 'STOP_DATE_DEID'},
+        patient_codes=patient_codes
+    )
+
+    return df_f, df_deid_f
+
+
+def deidentify_timeline(
+        *,
+        fname_dbx,
+        fname_timeline,
+        df_samples_used,
+        df_os,
+        df_anchor,
+        fname_output_volume,
+        fname_output_gpfs,
+        list_cols_cbio_timeline,
+        truncate_by_os_date=False,
+        merge_level='patient',
+        catalog=None,
+        schema=None,
+        table_name=None,
+        cohort_filter='none',
+        cohort_table=None,
+        partitions=1,
+        codec=None
+):
+    """Deidentify a single timeline table and save the PHI and deidentified outputs.
+
+    The sample list, OS dates and anchor dates are passed in already loaded so that
+    a batch run can reuse them across all timelines (see load_reference_frames).
+
+    Args:
+        fname_dbx: Path to Databricks environment file
+        fname_timeline: Databricks table name for timeline data
+        df_samples_used: Sample list with PATIENT_ID and SAMPLE_ID columns
+        df_os: OS dates with MRN and OS_DATE columns
+        df_anchor: Anchor dates with MRN, DMP_ID and DATE_TUMOR_SEQUENCING columns
+        fname_output_volume: Output path for PHI version in Databricks volume
+        fname_output_gpfs: Output path for deidentified version on GPFS
+        list_cols_cbio_timeline: Columns for final cBioPortal output
+        truncate_by_os_date: If True, truncate START_DATE and STOP_DATE that exceed OS_DATE
+        merge_level: 'patient' or 'sample'
+        catalog: Databricks catalog for output table (optional)
+        schema: Databricks schema for output table (optional)
+        table_name: Databricks table name for output table (optional)
+        cohort_filter: How to restrict the timeline query to the cohort's patients:
+            'none' (read the full table), 'in_list' (chunked MRN IN lists) or
+            'staged' (join against cohort_table)
+        cohort_table: Staged cohort MRN table, required for cohort_filter='staged'
+            (see stage_cohort_mrns)
+        partitions: Number of MRN-hash partitions. Values above 1 stream the
+            timeline through deidentify_timeline_partitioned() and return the
+            number of rows written instead of the DataFrame
+        codec: IdCodec of the reference frames, shared by the timelines of a
+            batch run (see deidentify_timeline_frames)
+
+    Returns:
+        Deidentified DataFrame written to GPFS
+    """
+    if partitions > 1:
+        return deidentify_timeline_partitioned(
+            fname_dbx=fname_dbx,
+            fname_timeline=fname_timeline,
+            df_samples_used=df_samples_used,
+            df_os=df_os,
+            df_anchor=df_anchor,
+            fname_output_volume=fname_output_volume,
+            fname_output_gpfs=fname_output_gpfs,
+            list_cols_cbio_timeline=list_cols_cbio_timeline,
+            partitions=partitions,
+            truncate_by_os_date=truncate_by_os_date,
+            merge_level=merge_level,
+            catalog=catalog,
+            schema=schema,
+            table_name=table_name,
+            cohort_filter=cohort_filter,
+            cohort_table=cohort_table,
+            codec=codec
+        )
+
+    # =========================================================================
+    # 1. Load timeline raw data
+    # =========================================================================
+    df_timeline_raw = load_timeline_raw(
+        fname_dbx=fname_dbx,
+        fname_timeline=fname_timeline,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        merge_level=merge_level,
+        df_samples_used=df_samples_used,
+        df_anchor=df_anchor,
+        cohort_filter=cohort_filter,
+        cohort_table=cohort_table
+    )
+
+    # =========================================================================
+    # 2-6. Merge, clean and deidentify dates
+    # =========================================================================
+    df_f, df_deid_f = deidentify_timeline_frames(
+        df_timeline_raw=df_timeline_raw,
+        df_samples_used=df_samples_used,
+        df_os=df_os,
+        df_anchor=df_anchor,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        truncate_by_os_date=truncate_by_os_date,
+        merge_level=merge_level,
+        codec=codec
+    )
+
+    # =========================================================================
+    # 7. Save PHI version to Databricks volume
     # =========================================================================
-    print(f'\nSaving PHI version to: {args.fname_output_volume}')
-    obj_dbx = DatabricksAPI(fname_databricks_env=args.fname_dbx)
+    print(f'\nSaving PHI version to: {fname_output_volume}')
+    obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
 
     # Build dict_database_table_info if catalog, schema, and table_name are provided
     dict_database_table_info = None
-    if args.catalog and args.schema and args.table_name:
+    if catalog and schema and table_name:
         dict_database_table_info = {
-            'catalog': args.catalog,
-            'schema': args.schema,
-            'table': args.table_name,
-            'volume_path': args.fname_output_volume,
+            'catalog': catalog,
+            'schema': schema,
+            'table': table_name,
+            'volume_path': fname_output_volume,
             'sep': '\t'
         }
-        print(f'Creating Databricks table: {args.catalog}.{args.schema}.{args.table_name}')
+        print(f'Creating Databricks table: {catalog}.{schema}.{table_name}')
 
     obj_dbx.write_db_obj(
         df=df_f,
-        volume_path=args.fname_output_volume,
+        volume_path=fname_output_volume,
         sep='\t',
         overwrite=True,
         dict_database_table_info=dict_database_table_info
     )
 
     # =========================================================================
-    # 10. Create deidentified version and save to GPFS
+    # 8. Save deidentified version to GPFS
     # =========================================================================
-    print('\nCreating deidentified version...')
-    df_deid = df_f.drop(columns=['START_DATE', 'STOP_DATE'])
-    df_deid = df_deid.rename(columns={'START_DATE_DEID': 'START_DATE', 'STOP_DATE_DEID': 'STOP_DATE'})
+    print(f'\nSaving deidentified version to: {fname_output_gpfs}')
+    df_deid_f.to_csv(fname_output_gpfs, sep='\t', index=False)
 
-    # Select only requested columns
-    missing_cols = [col for col in list_cols_cbio_timeline if col not in df_deid.columns]
-    if missing_cols:
-        print(f'WARNING: Missing columns in output: {missing_cols}')
+    print('\n' + '=' * 80)
+    print('DEIDENTIFICATION COMPLETE')
+    print('=' * 80)
 
-    available_cols = [col for col in list_cols_cbio_timeline if col in df_deid.columns]
-    df_deid = df_deid[available_cols].copy()
+    return df_deid_f
 
-    # Drop rows with null START_DATE or PATIENT_ID
-    df_deid_f = df_deid.dropna(subset=['START_DATE', 'PATIENT_ID'], how='any').sort_values(by=['PATIENT_ID', 'START_DATE'])
 
-    # Convert START_DATE and STOP_DATE to integers (use Int64 to handle NaN values)
-    df_deid_f['START_DATE'] = df_deid_f['START_DATE'].astype('Int64')
-    df_deid_f['STOP_DATE'] = df_deid_f['STOP_DATE'].astype('Int64')
+def merge_sorted_timeline_chunks(list_chunk_files, fname_output, df_header, dtypes=None):
+    """K-way merge of sorted deidentified partitions into one timeline file.
 
-    print(f'Final deidentified rows: {len(df_deid_f)}')
+    Each partition is a list of pickled chunks sorted by PATIENT_ID and START_DATE.
+    The merge holds one chunk per partition: rows up to the smallest last key
+    among the loaded chunks are sorted together and appended to the output, and
+    exhausted chunks are replaced by the next chunk of their partition. Ties keep
+    partition order, and rows of a partition keep their order.
+
+    Args:
+        list_chunk_files: Chunk files per partition, in order
+        fname_output: Output TSV path
+        df_header: Empty frame with the output columns
+        dtypes: Optional column dtypes applied to every chunk, so that values
+            are formatted alike in all partitions
+
+    Returns:
+        Number of rows written
+    """
+    def read_chunk(fname):
+        df = pd.read_pickle(fname)
+        return df.astype(dtypes) if dtypes else df
+
+    iters = [(read_chunk(fname) for fname in chunk_files) for chunk_files in list_chunk_files]
+    buffers = [next(it, None) for it in iters]
+    n_rows = 0
+
+    fname_tmp = f"{fname_output}.tmp"
+    with open(fname_tmp, 'w', newline='') as f:
+        df_header.to_csv(f, sep='\t', index=False)
+        while True:
+            active = [i for i, df in enumerate(buffers) if df is not None]
+            if not active:
+                break
+
+            # Rows up to the smallest last key are final: no later chunk can sort before them
+            bound = min(
+                (buffers[i]['PATIENT_ID'].iloc[-1], buffers[i]['START_DATE'].iloc[-1]) for i in active
+            )
+            list_df = []
+            for i in active:
+                df = buffers[i]
+                patient_id = df['PATIENT_ID']
+                logic_emit = (patient_id < bound[0]) | ((patient_id == bound[0]) & (df['START_DATE'] <= bound[1]))
+                n_emit = int(logic_emit.sum())
+                list_df.append(df.iloc[:n_emit])
+                buffers[i] = df.iloc[n_emit:] if n_emit < len(df) else next(iters[i], None)
+
+            df_emit = pd.concat(list_df, axis=0).sort_values(by=['PATIENT_ID', 'START_DATE'])
+            df_emit.to_csv(f, sep='\t', index=False, header=False)
+            n_rows += len(df_emit)
+
+    os.replace(fname_tmp, fname_output)
+
+    return n_rows
+
+
+def first_valid_rows(df):
+    """One row per column holding the column's first non-null value.
+
+    pd.concat resolves dtypes from the column dtypes and from which columns are
+    all-null, so concatenating these rows gives the dtypes of concatenating the
+    full frames.
+    """
+    dict_cols = {}
+    for col in df.columns:
+        positions = np.flatnonzero(df[col].notna().to_numpy())
+        position = positions[0] if len(positions) > 0 else 0
+        dict_cols[col] = df[col].iloc[position:position + 1].reset_index(drop=True)
+
+    return pd.DataFrame(dict_cols)
+
+
+def has_time_of_day(values):
+    """Return True if any non-null datetime value is not at midnight."""
+    values = values.dropna()
+    return bool((values != values.dt.normalize()).any())
+
+
+def format_phi_chunk(df, dtypes, cols_time_of_day):
+    """Give a chunk of PHI rows the dtypes and date format of an unpartitioned run.
+
+    pandas writes a datetime column as dates only when no value in it has a time
+    of day. Columns that have a time of day in any partition are written with
+    times in every chunk, as they are when the whole column is written at once.
+    """
+    df = df.drop(columns='_ORDER').astype(dtypes)
+    for col in cols_time_of_day:
+        if pd.api.types.is_datetime64_any_dtype(df[col]) and not has_time_of_day(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    return df
+
+
+def iter_phi_chunks_in_order(list_chunk_files):
+    """K-way merge of spilled PHI partitions into sample list order.
 
-    print(f'\nSaving deidentified version to: {args.fname_output_gpfs}')
-    df_deid_f.to_csv(args.fname_output_gpfs, sep='\t', index=False)
+    Each partition is a list of pickled chunks sorted by _ORDER, the position of
+    each row's key in the sample list. A patient's rows all come from one
+    partition, so merging on _ORDER gives the row order of an unpartitioned run.
+    One chunk per partition is held at a time.
+
+    Args:
+        list_chunk_files: Chunk files per partition, in order
+
+    Yields:
+        Chunks of PHI rows in sample list order, with the _ORDER column
+    """
+    iters = [(pd.read_pickle(fname) for fname in chunk_files) for chunk_files in list_chunk_files]
+    buffers = [next(it, None) for it in iters]
+
+    while True:
+        active = [i for i, df in enumerate(buffers) if df is not None]
+        if not active:
+            break
+
+        # Rows up to the smallest last position are final
+        bound = min(buffers[i]['_ORDER'].iloc[-1] for i in active)
+        list_df = []
+        for i in active:
+            df = buffers[i]
+            n_emit = int((df['_ORDER'] <= bound).sum())
+            if n_emit > 0:
+                list_df.append(df.iloc[:n_emit])
+            buffers[i] = df.iloc[n_emit:] if n_emit < len(df) else next(iters[i], None)
+
+        df_emit = pd.concat(list_df, axis=0)
+        yield df_emit.take(np.argsort(df_emit['_ORDER'].to_numpy(), kind='stable'))
+
+
+def deidentify_timeline_partitioned(
+        *,
+        fname_dbx,
+        fname_timeline,
+        df_samples_used,
+        df_os,
+        df_anchor,
+        fname_output_volume,
+        fname_output_gpfs,
+        list_cols_cbio_timeline,
+        partitions,
+        truncate_by_os_date=False,
+        merge_level='patient',
+        catalog=None,
+        schema=None,
+        table_name=None,
+        cohort_filter='none',
+        cohort_table=None,
+        chunk_rows=PARTITION_CHUNK_ROWS,
+        codec=None
+):
+    """Deidentify a timeline table in MRN-hash partitions, with memory bounded by partition size.
+
+    Each partition is read with a pmod(hash(MRN), partitions) filter (see
+    build_partition_where), joined with the cohort patients whose MRNs it holds
+    and deidentified as in deidentify_timeline(). Cohort patients without timeline
+    rows are processed in one final pass.
+
+    The deidentified partitions are spilled as sorted chunks next to the GPFS
+    output and k-way merged into it (see merge_sorted_timeline_chunks), giving
+    the same file as an unpartitioned run.
+
+    The PHI rows of each pass are spilled in sample list order to a private
+    directory under the table cache (see table_cache.get_cache_dir), which
+    already holds the cached PHI source tables. When the volume is mounted on
+    this machine, the partitions are k-way merged into fname_output_volume (see
+    iter_phi_chunks_in_order), giving the same file as an unpartitioned run.
+    Otherwise write_db_obj() needs a DataFrame, so each pass is written as a part
+    file in <fname_output_volume stem>_parts/ and fname_output_volume is not
+    updated. The optional Databricks table is then created from the volume file
+    or the part files with create_table_from_volume().
+
+    Args:
+        See deidentify_timeline(); partitions is the number of MRN-hash partitions
+        and chunk_rows the number of rows per spilled chunk.
+
+    Returns:
+        Number of deidentified rows written to GPFS
+    """
+    obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
+    df_anchor = AnchorDateIndex.from_frame(df_anchor)
+    df_anchor_frame = AnchorDateIndex.frame_of(df_anchor)
+
+    dir_spill = tempfile.mkdtemp(
+        prefix=f".{os.path.basename(fname_output_gpfs)}.",
+        dir=os.path.dirname(os.path.abspath(fname_output_gpfs))
+    )
+    # mkdtemp creates the directory readable by the owner only
+    dir_spill_phi = tempfile.mkdtemp(
+        prefix=f"{os.path.basename(fname_output_volume)}.",
+        dir=table_cache.get_cache_dir()
+    )
+
+    kwargs_deid = dict(
+        df_os=df_os,
+        df_anchor=df_anchor,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        truncate_by_os_date=truncate_by_os_date,
+        merge_level=merge_level,
+        # One codec for all passes
+        codec=codec if codec is not None else build_id_codec(
+            df_samples_used=df_samples_used,
+            df_os=df_os,
+            df_anchor=df_anchor
+        )
+    )
+    kwargs_load = dict(
+        fname_dbx=fname_dbx,
+        fname_timeline=fname_timeline,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        merge_level=merge_level,
+        df_samples_used=df_samples_used,
+        df_anchor=df_anchor,
+        cohort_filter=cohort_filter,
+        cohort_table=cohort_table
+    )
+
+    # Position of each PHI row's sample list key, to restore the unpartitioned row order
+    cols_order = ['PATIENT_ID'] if merge_level == 'patient' else ['SAMPLE_ID', 'PATIENT_ID']
+    index_order = pd.MultiIndex.from_frame(df_samples_used[cols_order].drop_duplicates())
+
+    try:
+        list_chunk_files = []
+        list_phi_files = []
+        patients_done = set()
+        df_header = None
+        # First non-null values of each pass: the dtypes of an unpartitioned run are
+        # the common dtypes of all passes (e.g. int columns become float where rows are missing)
+        list_df_dtypes = []
+        cols_time_of_day = set()
+        # Partitions 0..N-1, then one pass for cohort patients without timeline rows
+        for partition in range(partitions + 1):
+            if partition < partitions:
+                print(f'\n{"-" * 80}\nPartition {partition + 1}/{partitions}\n{"-" * 80}')
+                df_timeline_raw = load_timeline_raw(
+                    where=build_partition_where(partition=partition, partitions=partitions),
+                    **kwargs_load
+                )
+                df_timeline_raw = mrn_zero_pad(df=df_timeline_raw, col_mrn='MRN')
+                df_timeline_empty = df_timeline_raw.iloc[:0]
+                # Patients whose MRNs have rows in this partition
+                logic_patients = df_anchor_frame['MRN'].isin(df_timeline_raw['MRN'])
+                patients = set(df_anchor_frame.loc[logic_patients, 'DMP_ID'])
+                df_samples_part = df_samples_used[df_samples_used['PATIENT_ID'].isin(patients)]
+                patients_done.update(patients)
+            else:
+                print(f'\n{"-" * 80}\nCohort patients without timeline rows\n{"-" * 80}')
+                # No rows to read: the projected columns (and dtypes) of the partition queries
+                df_timeline_raw = df_timeline_empty
+                df_samples_part = df_samples_used[~df_samples_used['PATIENT_ID'].isin(patients_done)]
+
+            df_f, df_deid_f = deidentify_timeline_frames(
+                df_timeline_raw=df_timeline_raw,
+                df_samples_used=df_samples_part,
+                **kwargs_deid
+            )
+            del df_timeline_raw
+            if len(df_f) > 0:
+                list_df_dtypes.append(first_valid_rows(df_f))
+                cols_time_of_day.update(
+                    col for col in df_f.select_dtypes(include='datetime64').columns
+                    if has_time_of_day(df_f[col])
+                )
+
+            # PHI rows of this pass in sample list order, spilled in chunks
+            order = index_order.get_indexer(pd.MultiIndex.from_frame(df_f[cols_order]))
+            positions = np.argsort(order, kind='stable')
+            phi_files = []
+            for i_chunk, start in enumerate(range(0, len(df_f), chunk_rows)):
+                fname_phi = os.path.join(dir_spill_phi, f"part-{partition:05d}-{i_chunk:05d}.pkl")
+                rows = positions[start:start + chunk_rows]
+                df_f.take(rows).assign(_ORDER=order[rows]).to_pickle(fname_phi)
+                phi_files.append(fname_phi)
+            list_phi_files.append(phi_files)
+            df_phi_header = df_f.iloc[:0].assign(_ORDER=order[:0])
+            del df_f
+
+            # Sorted deidentified rows, spilled in chunks for the merge
+            chunk_files = []
+            for i_chunk, start in enumerate(range(0, len(df_deid_f), chunk_rows)):
+                fname_chunk = os.path.join(dir_spill, f"part-{partition:05d}-{i_chunk:05d}.pkl")
+                df_deid_f.iloc[start:start + chunk_rows].to_pickle(fname_chunk)
+                chunk_files.append(fname_chunk)
+            list_chunk_files.append(chunk_files)
+            df_header = df_deid_f.iloc[:0]
+            del df_deid_f
+
+        dtypes_all = pd.concat(list_df_dtypes, axis=0).dtypes if list_df_dtypes else pd.Series(dtype=object)
+
+        # =====================================================================
+        # Save PHI version (and table)
+        # =====================================================================
+        dtypes_phi = {col: dtypes_all[col] for col in df_phi_header.columns if col in dtypes_all.index}
+        df_phi_columns = df_phi_header.drop(columns='_ORDER').astype(dtypes_phi)
+
+        if is_volume_mounted(fname_output_volume):
+            print(f'\nMerging PHI version of {partitions} partitions to: {fname_output_volume}')
+            volume_path_table = fname_output_volume
+            with open(fname_output_volume, 'w', newline='') as f:
+                df_phi_columns.to_csv(f, sep='\t', index=False)
+                for df_chunk in iter_phi_chunks_in_order(list_phi_files):
+                    df_chunk = format_phi_chunk(df_chunk, dtypes=dtypes_phi, cols_time_of_day=cols_time_of_day)
+                    df_chunk.to_csv(f, sep='\t', index=False, header=False)
+        else:
+            # write_db_obj() needs a DataFrame: one part file per pass, at most one partition in memory
+            volume_path_table = f"{os.path.splitext(fname_output_volume)[0]}_parts"
+            print(f'\n⚠ Volume not mounted: saving PHI version as part files in: {volume_path_table}')
+            print(f'  {fname_output_volume} is not updated')
+            for partition, phi_files in enumerate(list_phi_files):
+                if phi_files:
+                    df_part = pd.concat([pd.read_pickle(fname) for fname in phi_files], axis=0)
+                    df_part = format_phi_chunk(df_part, dtypes=dtypes_phi, cols_time_of_day=cols_time_of_day)
+                else:
+                    # Every pass gets a part, so reruns overwrite the same part files
+                    df_part = df_phi_columns
+                obj_dbx.write_db_obj(
+                    df=df_part,
+                    volume_path=os.path.join(volume_path_table, f"part-{partition:05d}.tsv"),
+                    sep='\t',
+                    overwrite=True
+                )
+                del df_part
+
+        if catalog and schema and table_name:
+            print(f'Creating Databricks table: {catalog}.{schema}.{table_name}')
+            obj_dbx.create_table_from_volume(
+                dict_database_table_info={
+                    'catalog': catalog,
+                    'schema': schema,
+                    'table': table_name,
+                    'volume_path': volume_path_table,
+                    'sep': '\t'
+                }
+            )
+
+        # =====================================================================
+        # Save the merged deidentified version
+        # =====================================================================
+        # START_DATE and STOP_DATE are always Int64
+        dtypes = {
+            col: dtypes_all[col] for col in df_header.columns
+            if col not in ('START_DATE', 'STOP_DATE') and col in dtypes_all.index
+        }
+
+        print(f'\nMerging {partitions} partitions to: {fname_output_gpfs}')
+        n_rows = merge_sorted_timeline_chunks(
+            list_chunk_files=list_chunk_files,
+            fname_output=fname_output_gpfs,
+            df_header=df_header.astype(dtypes),
+            dtypes=dtypes
+        )
+        print(f'Final deidentified rows: {n_rows}')
+    finally:
+        shutil.rmtree(dir_spill, ignore_errors=True)
+        shutil.rmtree(dir_spill_phi, ignore_errors=True)
+
+    print('\n' + '=' * 80)
+    print('DEIDENTIFICATION COMPLETE')
+    print('=' * 80)
+
+    return n_rows
+
+
+def deidentify_timeline_sql(
+        *,
+        fname_dbx,
+        fname_timeline,
+        sample_table,
+        fname_output_gpfs,
+        list_cols_cbio_timeline,
+        truncate_by_os_date=False,
+        merge_level='patient',
+        fname_deid=FNAME_DEID,
+        fname_demo=FNAME_DEMO
+):
+    """Deidentify a single timeline table in Databricks SQL and save it to GPFS.
+
+    The joins, date cleanup and day offsets run in the warehouse (see
+    lib.utils.timeline_deid_sql), so only the cBioPortal output columns are
+    transferred. The PHI version is not produced by this engine, so callers
+    must not configure a PHI file or table for it.
+
+    Args:
+        fname_dbx: Path to Databricks environment file
+        fname_timeline: Databricks table name for timeline data
+        sample_table: Staged cohort sample table (see stage_cohort_samples)
+        fname_output_gpfs: Output path for deidentified version on GPFS
+        list_cols_cbio_timeline: Columns for final cBioPortal output
+        truncate_by_os_date: If True, truncate START_DATE and STOP_DATE that exceed OS_DATE
+        merge_level: 'patient' or 'sample'
+        fname_deid: Databricks table name for anchor dates
+        fname_demo: Demographics table name
+
+    Returns:
+        Deidentified DataFrame written to GPFS
+    """
+    print(f'\nDeidentifying timeline in Databricks SQL: {fname_timeline}')
+    obj_dbx = DatabricksAPI(fname_databricks_env=fname_dbx)
+    timeline_columns = table_cache.get_table_columns(obj_db=obj_dbx, table_name=fname_timeline)
+    missing_dates = [col for col in ['START_DATE', 'STOP_DATE'] if col not in timeline_columns]
+    if missing_dates:
+        print(f"WARNING: {missing_dates} not found, treating as empty")
+
+    sql = build_timeline_deid_sql(
+        table_timeline=fname_timeline,
+        table_samples=sample_table,
+        table_anchor=fname_deid,
+        table_demo=fname_demo,
+        timeline_columns=timeline_columns,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        merge_level=merge_level,
+        truncate_by_os_date=truncate_by_os_date,
+        dialect='databricks'
+    )
+    df_deid = match_pandas_dtypes(df=obj_dbx.query_from_sql(sql=sql))
+    print(f'Rows returned: {df_deid.shape[0]}')
+
+    df_deid_f = finalize_deidentified_timeline(
+        df_deid=df_deid,
+        list_cols_cbio_timeline=list_cols_cbio_timeline
+    )
+
+    print(f'\nSaving deidentified version to: {fname_output_gpfs}')
+    df_deid_f.to_csv(fname_output_gpfs, sep='\t', index=False)
 
     print('\n' + '=' * 80)
     print('DEIDENTIFICATION COMPLETE')
     print('=' * 80)
 
+    return df_deid_f
+
+
+# =============================================================================
+# Main Function
+# =============================================================================
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generic timeline deidentification for cBioPortal (medications, labs, diagnoses, etc.)"
+    )
+    parser.add_argument(
+        "--fname_dbx",
+        action="store",
+        dest="fname_dbx",
+        required=True,
+        help="Path to Databricks environment file"
+    )
+    parser.add_argument(
+        "--fname_deid",
+        action="store",
+        dest="fname_deid",
+        default=FNAME_DEID,
+        help=f"Databricks table name for anchor dates (default: {FNAME_DEID})"
+    )
+    parser.add_argument(
+        "--fname_timeline",
+        action="store",
+        dest="fname_timeline",
+        required=True,
+        help="Databricks table name for timeline data (e.g., 'schema.table_timeline_medications')"
+    )
+    parser.add_argument(
+        "--fname_sample",
+        action="store",
+        dest="fname_sample",
+        required=True,
+        help="Path to sample list file (data_clinical_sample.txt)"
+    )
+    parser.add_argument(
+        "--fname_output_volume",
+        action="store",
+        dest="fname_output_volume",
+        default=None,
+        help="Output path for PHI version in Databricks volume (required with --engine=pandas, refused with --engine=sql)"
+    )
+    parser.add_argument(
+        "--fname_output_gpfs",
+        action="store",
+        dest="fname_output_gpfs",
+        required=True,
+        help="Output path for deidentified version on GPFS"
+    )
+    parser.add_argument(
+        "--columns_cbio",
+        action="store",
+        dest="columns_cbio",
+        required=True,
+        help="Comma-separated list of columns for final cBioPortal output"
+    )
+    parser.add_argument(
+        "--truncate_by_os_date",
+        action="store_true",
+        dest="truncate_by_os_date",
+        default=False,
+        help="If set, truncate START_DATE and STOP_DATE that exceed OS_DATE"
+    )
+    parser.add_argument(
+        "--merge_level",
+        action="store",
+        dest="merge_level",
+        default="patient",
+        choices=["patient", "sample"],
+        help="Level at which to merge timeline data: 'patient' (default) or 'sample'"
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store",
+        dest="catalog",
+        default=None,
+        help="Databricks catalog for output table (optional)"
+    )
+    parser.add_argument(
+        "--schema",
+        action="store",
+        dest="schema",
+        default=None,
+        help="Databricks schema for output table (optional)"
+    )
+    parser.add_argument(
+        "--table_name",
+        action="store",
+        dest="table_name",
+        default=None,
+        help="Databricks table name for output table (optional; refused with --engine=sql)"
+    )
+    parser.add_argument(
+        "--cohort_filter",
+        action="store",
+        dest="cohort_filter",
+        default="none",
+        choices=COHORT_FILTER_MODES,
+        help="Restrict the timeline query to the cohort's patients: 'none' (default), 'in_list' or 'staged'"
+    )
+    parser.add_argument(
+        "--cohort_table",
+        action="store",
+        dest="cohort_table",
+        default=None,
+        help="Existing staged cohort MRN table for --cohort_filter=staged (optional; staged from the sample list if omitted)"
+    )
+    parser.add_argument(
+        "--engine",
+        action="store",
+        dest="engine",
+        default="pandas",
+        choices=DEID_ENGINES,
+        help="Deidentify in 'pandas' (default) or in Databricks 'sql' (deidentified output only; no PHI file or table is written)"
+    )
+    parser.add_argument(
+        "--sample_table",
+        action="store",
+        dest="sample_table",
+        default=None,
+        help="Staged cohort sample table for --engine=sql (required with it; see stage_cohort_samples)"
+    )
+    parser.add_argument(
+        "--partitions",
+        action="store",
+        dest="partitions",
+        type=int,
+        default=1,
+        help="Process the timeline in this many MRN-hash partitions to bound memory (pandas engine; default: 1)"
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
+
+    args = parser.parse_args()
+
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+    if args.partitions < 1:
+        parser.error("--partitions must be at least 1")
+    if args.engine == 'sql':
+        # The SQL engine has no PHI output; refuse rather than silently skip it
+        if args.fname_output_volume is not None or args.table_name is not None:
+            parser.error("--engine=sql does not write the PHI version: drop --fname_output_volume and --table_name, or use --engine=pandas")
+        if args.sample_table is None:
+            parser.error("--engine=sql requires --sample_table")
+    elif args.fname_output_volume is None:
+        parser.error("--fname_output_volume is required with --engine=pandas")
+
+    # Parse comma-separated columns list
+    list_cols_cbio_timeline = [col.strip() for col in args.columns_cbio.split(',')]
+
+    print("=" * 80)
+    print("TIMELINE DEIDENTIFICATION FOR CBIOPORTAL")
+    print("=" * 80)
+    print(f"Timeline table: {args.fname_timeline}")
+    print(f"Sample list: {args.fname_sample}")
+    print(f"Output volume (PHI): {args.fname_output_volume or 'not written (--engine=sql)'}")
+    print(f"Output GPFS (deid): {args.fname_output_gpfs}")
+    print(f"Merge level: {args.merge_level}")
+    print(f"Truncate by OS_DATE: {args.truncate_by_os_date}")
+    print(f"Cohort filter: {args.cohort_filter}")
+    print(f"Engine: {args.engine}")
+    print(f"Partitions: {args.partitions}")
+    print(f"cBioPortal columns: {list_cols_cbio_timeline}")
+    print("=" * 80)
+
+    if args.engine == 'sql':
+        deidentify_timeline_sql(
+            fname_dbx=args.fname_dbx,
+            fname_timeline=args.fname_timeline,
+            sample_table=args.sample_table,
+            fname_output_gpfs=args.fname_output_gpfs,
+            list_cols_cbio_timeline=list_cols_cbio_timeline,
+            truncate_by_os_date=args.truncate_by_os_date,
+            merge_level=args.merge_level,
+            fname_deid=args.fname_deid
+        )
+        return
+
+    # =========================================================================
+    # Load sample list, OS dates and anchor dates
+    # =========================================================================
+    df_samples_used = load_sample_list(fname_sample=args.fname_sample)
+    df_os, df_anchor = load_reference_frames(
+        fname_dbx=args.fname_dbx,
+        fname_deid=args.fname_deid
+    )
+
+    cohort_table = args.cohort_table
+    if args.cohort_filter == 'staged' and cohort_table is None:
+        if not (args.catalog and args.schema and args.table_name):
+            parser.error("--cohort_filter=staged requires --cohort_table or --catalog, --schema and --table_name")
+        cohort_table = stage_cohort_mrns(
+            fname_dbx=args.fname_dbx,
+            df_anchor=df_anchor,
+            df_samples_used=df_samples_used,
+            volume_path=f"{os.path.dirname(args.fname_output_volume)}/{args.table_name}_cohort_mrns.tsv",
+            catalog=args.catalog,
+            schema=args.schema,
+            table=f"{args.table_name}_cohort_mrns"
+        )
+
+    # =========================================================================
+    # Deidentify timeline
+    # =========================================================================
+    deidentify_timeline(
+        fname_dbx=args.fname_dbx,
+        fname_timeline=args.fname_timeline,
+        df_samples_used=df_samples_used,
+        df_os=df_os,
+        df_anchor=df_anchor,
+        fname_output_volume=args.fname_output_volume,
+        fname_output_gpfs=args.fname_output_gpfs,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        truncate_by_os_date=args.truncate_by_os_date,
+        merge_level=args.merge_level,
+        catalog=args.catalog,
+        schema=args.schema,
+        table_name=args.table_name,
+        cohort_filter=args.cohort_filter,
+        cohort_table=cohort_table,
+        partitions=args.partitions
+    )
+
 
 if __name__ == '__main__':
     main()
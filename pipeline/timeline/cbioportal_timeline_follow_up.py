@@ -6,7 +6,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 import numpy as np
 import pandas as pd
 
-from lib.utils import cbioportal_update_config
+from lib.utils import cbioportal_update_config, table_cache, load_vital_status
 from msk_cdm.databricks import DatabricksAPI
 
 
@@ -36,37 +36,9 @@ def cbioportal_timeline_follow_up(
     obj_db = DatabricksAPI(fname_databricks_env=fname_databricks_env)
 
     ## Create timeline file for follow-up
-    ### Load data from Databricks table
-    print('Loading demographics table: %s' % table_demo)
-    cols_str = ', '.join(col_keep)
-    sql = f"SELECT {cols_str} FROM {table_demo}"
-    df_demo = obj_db.query_from_sql(sql=sql)
-
-    df_demo_f = df_demo.copy()
-
-    def convert_datetime(df, col_name, format='mixed'):
-        df[col_name] = pd.to_datetime(df[col_name], errors='coerce', format=format)
-        if isinstance(df[col_name].dtype, pd.DatetimeTZDtype):
-            df[col_name] = df[col_name].dt.tz_localize(None)
-        return df
-
-    df_demo_f = convert_datetime(
-        df=df_demo_f,
-        col_name='MRN_CREATE_DTE',
-        format='mixed'
-    )
-
-    df_demo_f = convert_datetime(
-        df=df_demo_f,
-        col_name='PT_DEATH_DTE',
-        format='mixed'
-    )
-
-    df_demo_f = convert_datetime(
-        df=df_demo_f,
-        col_name='PLA_LAST_CONTACT_DTE',
-        format='mixed'
-    )
+    ### Load demographics dates (vital status table, shared with the other scripts of a run)
+    print('Loading vital status from demographics table: %s' % table_demo)
+    df_demo_f = load_vital_status(obj_db=obj_db, table_demo=table_demo)[col_keep]
 
     # Remove last contact date if patient is deceased
     logic_deceased = df_demo_f['PT_DEATH_DTE'].notnull()
@@ -140,8 +112,19 @@ if __name__ == "__main__":
         required=True,
         help="--location of Databricks environment file",
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     # Get configuration
     obj_yaml = cbioportal_update_config(fname_yaml_config=args.config_yaml)
     databricks_config = obj_yaml.config_dict.get('inputs_databricks', {})
@@ -11,7 +11,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 import pandas as pd
 
 from msk_cdm.databricks import DatabricksAPI
-from lib.utils import cbioportal_update_config
+from lib.utils import cbioportal_update_config, table_cache
+from lib.utils.pathology_snapshot import PathologySnapshot
 
 
 # Table and column constants
@@ -33,30 +34,19 @@ def sequencing_timeline(
         volume_path_save,
         catalog=None,
         schema=None,
-        table_name=None
+        table_name=None,
+        snapshot=None
 ):
     obj_db = DatabricksAPI(fname_databricks_env=fname_databricks_env)
 
-    print('Loading ID mapping table: %s' % table_id_map)
-    sql = f"SELECT MRN, DMP_ID, SAMPLE_ID, {COL_DTE_SEQ} FROM {table_id_map}"
-    df_path = obj_db.query_from_sql(sql=sql)
-    print('After loading')
-    print(df_path.head())
-
-    df_path = df_path.dropna().copy()
-    df_path[COL_DTE_SEQ] = pd.to_datetime(
-        df_path[COL_DTE_SEQ],
-        errors='coerce'
-    )
-    if isinstance(df_path[COL_DTE_SEQ].dtype, pd.DatetimeTZDtype):
-        df_path[COL_DTE_SEQ] = df_path[COL_DTE_SEQ].dt.tz_localize(None)
-    print('After datetime')
-    print(df_path.head())
-    log1 = df_path['SAMPLE_ID'].notnull()
-    log2 = df_path['SAMPLE_ID'].str.contains('T')
-    log3 = df_path[COL_DTE_SEQ].notnull()  # Drop samples without sequencing date
-    log = log1 & log2 & log3
-    df_path_filt = df_path[log].copy()
+    # Tumor samples with a sequencing date, shared with the other pathology derivations
+    if snapshot is None:
+        snapshot = PathologySnapshot(obj_db=obj_db, table_pathology=table_id_map)
+    df_path_filt = snapshot.tumor_samples().copy()
+    if isinstance(df_path_filt[COL_DTE_SEQ].dtype, pd.DatetimeTZDtype):
+        df_path_filt[COL_DTE_SEQ] = df_path_filt[COL_DTE_SEQ].dt.tz_localize(None)
+    print('After cleaning tumor samples')
+    print(df_path_filt.head())
 
     df_path_filt = df_path_filt.rename(columns={COL_DTE_SEQ: 'START_DATE'})
     df_path_filt = df_path_filt.assign(STOP_DATE='')
@@ -109,8 +99,19 @@ def main():
         dest="config_yaml",
         help="Yaml file containing run parameters and necessary file locations.",
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     # Get configuration
     obj_yaml = cbioportal_update_config(fname_yaml_config=args.config_yaml)
     databricks_config = obj_yaml.config_dict.get('inputs_databricks', {})
@@ -0,0 +1,333 @@
+"""
+compare_timeline_deid_engines.py
+
+Check that the SQL deidentification engine matches the pandas engine.
+
+Runs the pandas deidentification (deidentify_timeline_frames) and the query from
+lib.utils.timeline_deid_sql on the same local extracts, using DuckDB as a local
+stand-in for Databricks, and reports any rows that differ. Inputs are TSV or
+Parquet extracts of the timeline, demographics and anchor dates tables.
+
+With --date_fixtures, timeline rows are also rewritten with their dates in each
+of DATE_FIXTURES (non-ISO and UTC offset spellings) and both engines are compared
+on every form. Forms the SQL engine does not parse are reported but only fail the
+run when they are marked as supported.
+
+Requires duckdb (pip install duckdb); it is only used by this script.
+
+Usage:
+  python pipeline/timeline/compare_timeline_deid_engines.py \
+    --timeline=/path/to/table_timeline_labs.parquet \
+    --demographics=/path/to/demographics.parquet \
+    --anchor_dates=/path/to/timeline_anchor_dates.parquet \
+    --fname_sample=/path/to/data_clinical_sample.txt \
+    --columns_cbio="PATIENT_ID,START_DATE,STOP_DATE,EVENT_TYPE,TEST,RESULT"
+"""
+import argparse
+import sys
+import os
+import io
+from contextlib import redirect_stdout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+from lib.utils.date_parsing import parse_dates
+from lib.utils.timeline_deid_sql import build_timeline_deid_sql, match_pandas_dtypes
+from cbioportal_timeline_deidentify import (
+    COLS_ANCHOR,
+    COLS_DEMO,
+    deidentify_timeline_frames,
+    finalize_deidentified_timeline,
+    get_timeline_source_columns,
+    load_sample_list,
+    normalize_anchor_dates,
+    os_dates_from_demographics,
+    process_df_os
+)
+
+# Date spellings for --date_fixtures: (name, formatter, parsed by the SQL engine)
+DATE_FIXTURES = [
+    ('YYYY-MM-DD', lambda t: f"{t:%Y-%m-%d}", True),
+    ('YYYY-MM-DDTHH:MM:SS+05:00', lambda t: f"{t:%Y-%m-%dT%H:%M:%S}+05:00", True),
+    ('YYYY-MM-DD HH:MM:SSZ', lambda t: f"{t:%Y-%m-%d %H:%M:%S}Z", True),
+    ('YYYY/MM/DD', lambda t: f"{t:%Y/%m/%d}", True),
+    ('M/D/YYYY', lambda t: f"{t.month}/{t.day}/{t.year}", True),
+    ('MM/DD/YYYY HH:MM:SS', lambda t: f"{t:%m/%d/%Y %H:%M:%S}", True),
+    ('M/D/YYYY H:MM', lambda t: f"{t.month}/{t.day}/{t.year} {t.hour}:{t.minute:02d}", True),
+    ('YYYYMMDD', lambda t: f"{t:%Y%m%d}", True),
+    ('Mon DD, YYYY', lambda t: f"{t:%b %d, %Y}", False),
+    ('DD.MM.YYYY', lambda t: f"{t:%d.%m.%Y}", False)
+]
+N_FIXTURE_ROWS = 1000
+
+
+def read_extract(fname, columns=None):
+    """Read a local Parquet or TSV table extract."""
+    if fname.endswith('.parquet'):
+        return pd.read_parquet(fname, columns=columns)
+    return pd.read_csv(fname, sep='\t', usecols=columns)
+
+
+def run_pandas_engine(df_timeline, df_demo, df_anchor, df_samples_used, list_cols_cbio_timeline, merge_level, truncate_by_os_date, today):
+    """Deidentify with the pandas engine, as cbioportal_timeline_deidentify.py does."""
+    df_os = process_df_os(df=os_dates_from_demographics(df_demo=df_demo.copy()))
+    df_anchor = normalize_anchor_dates(df_anchor=df_anchor.copy())
+    cols_timeline = get_timeline_source_columns(
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        merge_level=merge_level,
+        table_columns=df_timeline.columns
+    )
+    _, df_deid_f = deidentify_timeline_frames(
+        df_timeline_raw=df_timeline[cols_timeline].copy(),
+        df_samples_used=df_samples_used,
+        df_os=df_os,
+        df_anchor=df_anchor,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        truncate_by_os_date=truncate_by_os_date,
+        merge_level=merge_level,
+        today=today
+    )
+
+    return df_deid_f
+
+
+def run_sql_engine(df_timeline, df_demo, df_anchor, df_samples_used, list_cols_cbio_timeline, merge_level, truncate_by_os_date, today):
+    """Deidentify with the SQL engine, running the query in DuckDB."""
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("compare_timeline_deid_engines.py requires duckdb (pip install duckdb)")
+
+    con = duckdb.connect()
+    con.register('timeline', df_timeline)
+    con.register('demographics', df_demo)
+    con.register('anchor_dates', df_anchor)
+    con.register('samples', df_samples_used[['PATIENT_ID', 'SAMPLE_ID']].drop_duplicates())
+
+    sql = build_timeline_deid_sql(
+        table_timeline='timeline',
+        table_samples='samples',
+        table_anchor='anchor_dates',
+        table_demo='demographics',
+        timeline_columns=list(df_timeline.columns),
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        merge_level=merge_level,
+        truncate_by_os_date=truncate_by_os_date,
+        today=today,
+        dialect='duckdb'
+    )
+    df_deid = match_pandas_dtypes(df=con.execute(sql).df())
+
+    return finalize_deidentified_timeline(
+        df_deid=df_deid,
+        list_cols_cbio_timeline=list_cols_cbio_timeline
+    )
+
+
+def compare_outputs(df_pandas, df_sql):
+    """
+    Compare the two engines' outputs as written to GPFS.
+
+    Rows are compared as TSV lines, so dtype differences that change the written
+    file (e.g. 1 vs 1.0) count as mismatches. Ordering within equal
+    (PATIENT_ID, START_DATE) keys is not compared.
+
+    Returns:
+        True if both outputs contain the same rows
+    """
+    if list(df_pandas.columns) != list(df_sql.columns):
+        print(f'Column mismatch:\n  pandas: {list(df_pandas.columns)}\n  sql:    {list(df_sql.columns)}')
+        return False
+
+    lines_pandas = pd.Series(df_pandas.to_csv(sep='\t', index=False).splitlines()[1:], dtype=object)
+    lines_sql = pd.Series(df_sql.to_csv(sep='\t', index=False).splitlines()[1:], dtype=object)
+    counts = pd.concat(
+        [lines_pandas.value_counts().rename('pandas'), lines_sql.value_counts().rename('sql')],
+        axis=1
+    ).fillna(0)
+    df_diff = counts[counts['pandas'] != counts['sql']]
+
+    print(f'Rows (pandas): {len(lines_pandas)}')
+    print(f'Rows (sql): {len(lines_sql)}')
+    if df_diff.empty:
+        return True
+
+    print(f'Rows that differ: {len(df_diff)}')
+    print(df_diff.head(20).to_string())
+    return False
+
+
+def compare_date_fixtures(df_timeline, n_rows=N_FIXTURE_ROWS, **kwargs):
+    """
+    Compare both engines on timeline rows with their dates rewritten in each of
+    DATE_FIXTURES.
+
+    The first n_rows timeline rows with a parseable START_DATE are used. Engine
+    output is suppressed; one line per date form is printed.
+
+    Returns:
+        True if every form marked as parsed by the SQL engine matches
+    """
+    df_base = df_timeline.copy()
+    dict_dates = {}
+    for col in ['START_DATE', 'STOP_DATE']:
+        if col in df_base.columns:
+            dict_dates[col] = parse_dates(df_base[col])
+    df_base = df_base[dict_dates['START_DATE'].notnull().to_numpy()].head(n_rows)
+
+    all_supported_match = True
+    for name, formatter, sql_supported in DATE_FIXTURES:
+        df_fixture = df_base.copy()
+        for col, dates in dict_dates.items():
+            dates = dates.loc[df_fixture.index].dropna()
+            text = pd.Series(None, index=df_fixture.index, dtype=object)
+            text.loc[dates.index] = dates.map(formatter)
+            df_fixture[col] = text
+        with redirect_stdout(io.StringIO()):
+            df_pandas = run_pandas_engine(df_timeline=df_fixture, **kwargs)
+            df_sql = run_sql_engine(df_timeline=df_fixture, **kwargs)
+            match = compare_outputs(df_pandas=df_pandas, df_sql=df_sql)
+        if match:
+            status = '✓'
+        elif sql_supported:
+            status = '✗'
+            all_supported_match = False
+        else:
+            status = '⚠ (not parsed by the SQL engine)'
+        print(f'{name:<28} rows pandas: {len(df_pandas):>7}  rows sql: {len(df_sql):>7}  {status}')
+
+    return all_supported_match
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the pandas and SQL timeline deidentification engines on local extracts"
+    )
+    parser.add_argument(
+        "--timeline",
+        action="store",
+        dest="timeline",
+        required=True,
+        help="Timeline table extract (.parquet or TSV)"
+    )
+    parser.add_argument(
+        "--demographics",
+        action="store",
+        dest="demographics",
+        required=True,
+        help="Demographics table extract (.parquet or TSV)"
+    )
+    parser.add_argument(
+        "--anchor_dates",
+        action="store",
+        dest="anchor_dates",
+        required=True,
+        help="Anchor dates table extract (.parquet or TSV)"
+    )
+    parser.add_argument(
+        "--fname_sample",
+        action="store",
+        dest="fname_sample",
+        required=True,
+        help="Path to sample list file (data_clinical_sample.txt)"
+    )
+    parser.add_argument(
+        "--columns_cbio",
+        action="store",
+        dest="columns_cbio",
+        required=True,
+        help="Comma-separated list of columns for final cBioPortal output"
+    )
+    parser.add_argument(
+        "--merge_level",
+        action="store",
+        dest="merge_level",
+        default="patient",
+        choices=["patient", "sample"],
+        help="Level at which to merge timeline data: 'patient' (default) or 'sample'"
+    )
+    parser.add_argument(
+        "--truncate_by_os_date",
+        action="store_true",
+        dest="truncate_by_os_date",
+        default=False,
+        help="If set, truncate START_DATE and STOP_DATE that exceed OS_DATE"
+    )
+    parser.add_argument(
+        "--today",
+        action="store",
+        dest="today",
+        default=None,
+        help="Date after which timeline dates are treated as invalid, YYYY-MM-DD (default: today)"
+    )
+    parser.add_argument(
+        "--date_fixtures",
+        action="store_true",
+        dest="date_fixtures",
+        default=False,
+        help="Also compare the engines on timeline rows rewritten with non-ISO date formats"
+    )
+
+    args = parser.parse_args()
+
+    list_cols_cbio_timeline = [col.strip() for col in args.columns_cbio.split(',')]
+    today = pd.Timestamp(args.today) if args.today else pd.Timestamp.today().normalize()
+
+    print("=" * 80)
+    print("TIMELINE DEIDENTIFICATION ENGINE COMPARISON")
+    print("=" * 80)
+
+    df_timeline = read_extract(args.timeline)
+    df_demo = read_extract(args.demographics, columns=COLS_DEMO)
+    df_anchor = read_extract(args.anchor_dates, columns=COLS_ANCHOR)
+    df_samples_used = load_sample_list(fname_sample=args.fname_sample)
+
+    kwargs = dict(
+        df_timeline=df_timeline,
+        df_demo=df_demo,
+        df_anchor=df_anchor,
+        df_samples_used=df_samples_used,
+        list_cols_cbio_timeline=list_cols_cbio_timeline,
+        merge_level=args.merge_level,
+        truncate_by_os_date=args.truncate_by_os_date,
+        today=today
+    )
+
+    print('\n' + '=' * 80)
+    print('PANDAS ENGINE')
+    print('=' * 80)
+    df_pandas = run_pandas_engine(**kwargs)
+
+    print('\n' + '=' * 80)
+    print('SQL ENGINE (DuckDB)')
+    print('=' * 80)
+    df_sql = run_sql_engine(**kwargs)
+
+    print('\n' + '=' * 80)
+    print('COMPARISON')
+    print('=' * 80)
+    identical = compare_outputs(df_pandas=df_pandas, df_sql=df_sql)
+    if identical:
+        print('✓ Engines produce identical output')
+    else:
+        print('✗ Engines differ')
+
+    fixtures_match = True
+    if args.date_fixtures:
+        print('\n' + '=' * 80)
+        print('DATE FORMAT FIXTURES')
+        print('=' * 80)
+        kwargs.pop('df_timeline')
+        fixtures_match = compare_date_fixtures(df_timeline=df_timeline, **kwargs)
+        if fixtures_match:
+            print('✓ Engines match on all date formats parsed by the SQL engine')
+        else:
+            print('✗ Engines differ on date formats parsed by the SQL engine')
+
+    if not (identical and fixtures_match):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from lib.utils import compute_age_at_sequencing
+from lib.utils import compute_age_at_sequencing, table_cache
 
 # Table names
 TABLE_DEMO = 'cdsi_prod.cdm_impact_pipeline_prod.t01_epic_ddp_demographics'
@@ -23,8 +23,19 @@ if __name__ == "__main__":
         required=True,
         help="--location of Databricks environment file",
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     # Construct volume path
     table_name = 'age_at_sequencing'
     volume_path_save = f'/Volumes/{CATALOG}/{SCHEMA}/{VOLUME}/cbioportal/{table_name}.tsv'
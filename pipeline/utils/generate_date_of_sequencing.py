@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from lib.utils import date_of_sequencing
+from lib.utils import date_of_sequencing, table_cache
 
 # Table names
 TABLE_SAMPLES = 'cdsi_prod.cdm_impact_pipeline_prod.t03_id_mapping_pathology_sample_xml_parsed'
@@ -28,8 +28,19 @@ if __name__ == "__main__":
         required=True,
         help="--location of Databricks environment file",
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     # Construct volume path
     table_name = 'date_of_sequencing'
     volume_path_save = f'/Volumes/{CATALOG}/{SCHEMA}/{VOLUME}/cbioportal/{table_name}.tsv'
@@ -0,0 +1,156 @@
+"""
+generate_pathology_outputs.py
+
+Produces every output derived from the pathology sample mapping table in one run,
+reading the table once (see lib/utils/pathology_snapshot.py):
+- anchor dates (save_anchor_dates.py)
+- age at sequencing (generate_age_at_sequencing.py)
+- date of sequencing (generate_date_of_sequencing.py)
+- sequencing timeline (timeline/cbioportal_timeline_sequencing.py)
+
+Outputs are written to the same volume paths and tables as the individual scripts.
+
+Usage:
+    python generate_pathology_outputs.py \
+        --databricks_env /path/to/databricks.env \
+        --config_yaml /path/to/config.yaml \
+        --outputs anchor_dates age_at_sequencing
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'timeline'))
+
+from msk_cdm.databricks import DatabricksAPI
+
+from lib.utils import (
+    compute_age_at_sequencing,
+    date_of_sequencing,
+    cbioportal_update_config,
+    table_cache
+)
+from lib.utils.pathology_snapshot import PathologySnapshot, TABLE_PATHOLOGY
+from save_anchor_dates import save_anchor_dates
+from generate_age_at_sequencing import TABLE_DEMO, CATALOG, SCHEMA, VOLUME
+from cbioportal_timeline_sequencing import sequencing_timeline
+
+OUTPUTS = ['anchor_dates', 'age_at_sequencing', 'date_of_sequencing', 'timeline_sequencing']
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create all outputs derived from the pathology table from one read of the table"
+    )
+    parser.add_argument(
+        "--databricks_env",
+        action="store",
+        dest="databricks_env",
+        required=True,
+        help="--location of Databricks environment file",
+    )
+    parser.add_argument(
+        "--config_yaml",
+        action="store",
+        dest="config_yaml",
+        help="Yaml file containing run parameters and necessary file locations (anchor dates and sequencing timeline).",
+    )
+    parser.add_argument(
+        "--outputs",
+        action="store",
+        dest="outputs",
+        nargs="+",
+        choices=OUTPUTS,
+        default=OUTPUTS,
+        help=f"Outputs to create (default: all of {', '.join(OUTPUTS)})"
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
+    args = parser.parse_args()
+
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
+    # Volume configuration of the anchor dates and sequencing timeline (as in their scripts)
+    obj_yaml = cbioportal_update_config(fname_yaml_config=args.config_yaml)
+    databricks_config = obj_yaml.config_dict.get('inputs_databricks', {})
+    catalog = databricks_config.get('catalog', 'cdsi_prod')
+    schema = databricks_config.get('schema', 'cdsi_data_deid')
+    volume = databricks_config.get('volume', 'cdsi_data_deid_volume')
+    volume_path_intermediate = databricks_config.get('volume_path_intermediate', 'cbioportal/intermediate_files/')
+
+    print('=' * 80)
+    print('PATHOLOGY TABLE OUTPUTS')
+    print('=' * 80)
+    print(f"Outputs: {', '.join(args.outputs)}")
+
+    # Read the pathology table once for all outputs
+    obj_db = DatabricksAPI(fname_databricks_env=args.databricks_env)
+    snapshot = PathologySnapshot(obj_db=obj_db, table_pathology=TABLE_PATHOLOGY)
+
+    df_anchor_dates = None
+    if 'anchor_dates' in args.outputs:
+        print(f"\n{'-' * 80}\nAnchor dates\n{'-' * 80}")
+        df_anchor_dates = save_anchor_dates(
+            fname_databricks_env=args.databricks_env,
+            volume_path_save=f"/Volumes/{catalog}/{schema}/{volume}/{volume_path_intermediate}timeline_anchor_dates.tsv",
+            catalog=catalog,
+            schema=schema,
+            table_name="timeline_anchor_dates",
+            snapshot=snapshot
+        )
+
+    if 'age_at_sequencing' in args.outputs:
+        print(f"\n{'-' * 80}\nAge at sequencing\n{'-' * 80}")
+        table_name = 'age_at_sequencing'
+        compute_age_at_sequencing(
+            databricks_env=args.databricks_env,
+            table_demo=TABLE_DEMO,
+            table_samples=TABLE_PATHOLOGY,
+            volume_path_save_age_at_seq=f'/Volumes/{CATALOG}/{SCHEMA}/{VOLUME}/cbioportal/{table_name}.tsv',
+            table_save_age_at_seq=table_name,
+            catalog=CATALOG,
+            schema=SCHEMA,
+            snapshot=snapshot,
+            df_anchor_dates=df_anchor_dates
+        )
+
+    if 'date_of_sequencing' in args.outputs:
+        print(f"\n{'-' * 80}\nDate of sequencing\n{'-' * 80}")
+        table_name = 'date_of_sequencing'
+        date_of_sequencing(
+            databricks_env=args.databricks_env,
+            table_samples=TABLE_PATHOLOGY,
+            volume_path_save_date_of_seq=f'/Volumes/{CATALOG}/{SCHEMA}/{VOLUME}/cbioportal/{table_name}.tsv',
+            table_save_date_of_seq=table_name,
+            catalog=CATALOG,
+            schema=SCHEMA,
+            snapshot=snapshot
+        )
+
+    if 'timeline_sequencing' in args.outputs:
+        print(f"\n{'-' * 80}\nSequencing timeline\n{'-' * 80}")
+        table_name = 'table_timeline_sequencing'
+        sequencing_timeline(
+            fname_databricks_env=args.databricks_env,
+            table_id_map=TABLE_PATHOLOGY,
+            volume_path_save=f"/Volumes/{catalog}/{schema}/{volume}/{volume_path_intermediate}{table_name}.tsv",
+            catalog=catalog,
+            schema=schema,
+            table_name=table_name,
+            snapshot=snapshot
+        )
+
+    print(f"\n{'=' * 80}")
+    print('✓ Complete')
+    print('=' * 80)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,12 +12,12 @@ import pandas as pd
 from msk_cdm.databricks import DatabricksAPI
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from lib.utils import get_anchor_dates, cbioportal_update_config
+from lib.utils import get_anchor_dates, cbioportal_update_config, table_cache
 
 
-def save_anchor_dates(fname_databricks_env, volume_path_save, catalog, schema, table_name):
-    # Compute anchor dates
-    df_path_g = get_anchor_dates(fname_databricks_env)
+def save_anchor_dates(fname_databricks_env, volume_path_save, catalog, schema, table_name, snapshot=None):
+    # Compute anchor dates (from a PathologySnapshot shared with other outputs, if given)
+    df_path_g = get_anchor_dates(fname_databricks_env, snapshot=snapshot)
 
     # Create dictionary for table info
     dict_database_table_info = {
@@ -43,6 +43,8 @@ def save_anchor_dates(fname_databricks_env, volume_path_save, catalog, schema, t
 
     print('Done!')
 
+    return df_path_g
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Anchor dates used in the cBioPortal timeline files to deidentify")
@@ -59,8 +61,19 @@ if __name__ == "__main__":
         required=True,
         help="--location of Databricks environment file",
     )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="Bypass the local table cache and read reference tables from Databricks"
+    )
     args = parser.parse_args()
 
+    if args.no_cache:
+        table_cache.set_cache_enabled(False)
+
     obj_yaml = cbioportal_update_config(fname_yaml_config=args.config_yaml)
     databricks_config = obj_yaml.config_dict.get('inputs_databricks', {})
     catalog = databricks_config.get('catalog', 'cdsi_prod')